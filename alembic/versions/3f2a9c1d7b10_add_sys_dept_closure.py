@@ -0,0 +1,51 @@
+"""add sys_dept_closure
+
+Revision ID: 3f2a9c1d7b10
+Revises:
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f2a9c1d7b10"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    closure = op.create_table(
+        "sys_dept_closure",
+        sa.Column("ancestor", sa.BigInteger(), nullable=False),
+        sa.Column("descendant", sa.BigInteger(), nullable=False),
+        sa.Column("depth", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("ancestor", "descendant"),
+    )
+    op.create_index("idx_dept_closure_descendant", "sys_dept_closure", ["descendant"])
+
+    # Backfill from parent_id (the ancestors strings are derived data)
+    rows = op.get_bind().execute(
+        sa.text("SELECT dept_id, parent_id FROM sys_dept WHERE del_flag = '0'")
+    ).all()
+    parents = {dept_id: parent_id for dept_id, parent_id in rows}
+    paths = []
+    for dept_id in parents:
+        ancestor, depth, seen = dept_id, 0, set()
+        while ancestor in parents and ancestor not in seen:
+            paths.append({"ancestor": ancestor, "descendant": dept_id, "depth": depth})
+            seen.add(ancestor)
+            ancestor, depth = parents[ancestor], depth + 1
+    if paths:
+        op.bulk_insert(closure, paths)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("idx_dept_closure_descendant", table_name="sys_dept_closure")
+    op.drop_table("sys_dept_closure")
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
+import redis.asyncio as aioredis
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.constants import SUPER_ADMIN
 from app.core.deps import get_current_user
+from app.core.etag import etag_matches, etag_response, make_etag, not_modified
+from app.core.redis import get_redis
 from app.core.response import AjaxResult
 from app.db.session import get_db
 from app.services import auth_service, menu_service
@@ -12,25 +14,35 @@ router = APIRouter(tags=["认证管理"])
 
 @router.get("/getInfo")
 async def get_info(
+    request: Request,
     current_user: dict = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    redis_client: aioredis.Redis = Depends(get_redis),
 ):
     """Get current user info, roles, and permissions."""
-    info = await auth_service.get_user_info(current_user, db)
-    return AjaxResult.success(
+    etag = await auth_service.user_info_etag(current_user, redis_client)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    row = await auth_service.get_user_info_row(current_user, db)
+    info = auth_service.build_user_info(current_user, row)
+    return etag_response(AjaxResult.success(
         user=info["user"],
         roles=info["roles"],
         permissions=info["permissions"],
-    )
+    ), etag)
 
 
 @router.get("/getRouters")
 async def get_routers(
+    request: Request,
     current_user: dict = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    redis_client: aioredis.Redis = Depends(get_redis),
 ):
     """Get Vue router tree for the current user."""
-    user_id = current_user["user_id"]
-    is_admin = SUPER_ADMIN in current_user.get("roles", [])
-    routers = await menu_service.get_routers(user_id, is_admin, db)
-    return AjaxResult.success(data=routers)
+    key = await menu_service.get_routers_key(current_user, redis_client)
+    etag = make_etag(key)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    routers = await menu_service.get_routers(current_user, db, redis_client, key)
+    return etag_response(AjaxResult.success(data=routers), etag)
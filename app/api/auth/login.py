@@ -5,13 +5,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
 from app.core.constants import CAPTCHA_CODE_KEY
 from app.core.deps import get_current_user
-from app.core.redis import get_redis
+from app.core.redis import get_redis, get_session_redis
 from app.core.response import AjaxResult
-from app.core.security import parse_token
+from app.core.security import generate_uuid, parse_token
 from app.db.session import get_db
 from app.schemas.auth import LoginBody
 from app.services import auth_service
-from app.utils.captcha import generate_captcha
+from app.services.captcha_service import captcha_pool
 
 router = APIRouter(tags=["认证管理"])
 
@@ -25,7 +25,8 @@ async def get_captcha(redis: aioredis.Redis = Depends(get_redis)):
             captchaEnabled=False,
         )
 
-    captcha_uuid, code, img = generate_captcha()
+    captcha_uuid = generate_uuid()
+    code, img = await captcha_pool.get()
 
     # Store code in Redis
     await redis.setex(
@@ -58,6 +59,7 @@ async def login(
         login_ip=login_ip,
         db=db,
         redis=redis,
+        user_agent=request.headers.get("User-Agent", ""),
     )
     return AjaxResult.success(token=token)
 
@@ -65,7 +67,7 @@ async def login(
 @router.post("/logout")
 async def logout(
     request: Request,
-    redis: aioredis.Redis = Depends(get_redis),
+    redis: aioredis.Redis = Depends(get_session_redis),
 ):
     """User logout. Does not require a valid token — gracefully handles expired sessions."""
     from app.core.deps import http_bearer
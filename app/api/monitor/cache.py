@@ -1,20 +1,30 @@
+import json
+
 from fastapi import APIRouter, Depends, Path
 import redis.asyncio as aioredis
 
+from app.core.constants import LOGIN_TOKEN_KEY, LOGIN_USER_TOKENS_KEY
 from app.core.deps import has_permi
-from app.core.redis import get_redis
+from app.core.redis import get_redis, get_session_redis
 from app.core.response import AjaxResult
+from app.core.session_cache import session_cache
+from app.core.session_codec import decode_session
+from app.core.stateless_auth import stateless_auth
+from app.services.captcha_service import captcha_pool
+from app.services.dept_service import dept_tree_cache
 
 router = APIRouter()
 
 # Predefined cache names (matching RuoYi frontend expectations)
 CACHE_NAMES = [
     {"cacheName": "login_tokens", "remark": "用户信息"},
+    {"cacheName": "login_user_tokens", "remark": "用户会话索引"},
     {"cacheName": "sys_config", "remark": "配置信息"},
     {"cacheName": "sys_dict", "remark": "数据字典"},
     {"cacheName": "captcha_codes", "remark": "验证码"},
     {"cacheName": "repeat_submit", "remark": "防重提交"},
     {"cacheName": "pwd_err_cnt", "remark": "密码错误次数"},
+    {"cacheName": "role_perms", "remark": "角色权限"},
 ]
 
 
@@ -41,6 +51,10 @@ async def get_cache_info(
         "info": info,
         "dbSize": db_size,
         "commandStats": command_stats,
+        "sessionCache": session_cache.stats(),
+        "captchaPool": captcha_pool.stats(),
+        "statelessAuth": stateless_auth.stats(),
+        "deptTree": dept_tree_cache.stats(),
     })
 
 
@@ -69,8 +83,17 @@ async def get_cache_value(
     cache_key: str,
     current_user: dict = Depends(has_permi("monitor:cache:list")),
     redis_client: aioredis.Redis = Depends(get_redis),
+    session_redis: aioredis.Redis = Depends(get_session_redis),
 ):
-    value = await redis_client.get(cache_key)
+    if cache_key.startswith(LOGIN_TOKEN_KEY):
+        # Sessions are stored in a binary format; show them as JSON
+        raw = await session_redis.get(cache_key)
+        user = await decode_session(session_redis, raw) if raw is not None else None
+        value = json.dumps(user, ensure_ascii=False) if user is not None else None
+    elif cache_key.startswith(LOGIN_USER_TOKENS_KEY):
+        value = ",".join(sorted(await redis_client.smembers(cache_key)))
+    else:
+        value = await redis_client.get(cache_key)
     return AjaxResult.success(data={
         "cacheName": cache_name,
         "cacheKey": cache_key,
@@ -30,17 +30,25 @@ async def list_job_logs(
     db: AsyncSession = Depends(get_db),
     pageNum: int = Query(1, ge=1),
     pageSize: int = Query(10, ge=1, le=100),
+    # Keyset mode: nextCursor of the previous page ("" for the first); pageNum is ignored
+    cursor: str | None = Query(None),
     jobName: str | None = Query(None),
     jobGroup: str | None = Query(None),
     status: str | None = Query(None),
     beginTime: str | None = Query(None, alias="params[beginTime]"),
     endTime: str | None = Query(None, alias="params[endTime]"),
 ):
-    items, total = await crud_job_log.get_job_log_list(
-        db, page_num=pageNum, page_size=pageSize,
+    filters = dict(
         job_name=jobName, job_group=jobGroup, status=status,
         begin_time=beginTime, end_time=endTime,
     )
+    if cursor is not None:
+        items, next_cursor = await crud_job_log.get_job_log_page(
+            db, cursor=cursor, page_size=pageSize, **filters,
+        )
+        rows = [_log_to_dict(i) for i in items]
+        return TableDataInfo(total=-1, rows=rows, nextCursor=next_cursor).model_dump()
+    items, total = await crud_job_log.get_job_log_list(db, page_num=pageNum, page_size=pageSize, **filters)
     return TableDataInfo(total=total, rows=[_log_to_dict(i) for i in items]).model_dump()
 
 
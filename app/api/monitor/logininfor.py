@@ -33,17 +33,25 @@ async def list_logininfor(
     db: AsyncSession = Depends(get_db),
     pageNum: int = Query(1, ge=1),
     pageSize: int = Query(10, ge=1, le=100),
+    # Keyset mode: nextCursor of the previous page ("" for the first); pageNum is ignored
+    cursor: str | None = Query(None),
     userName: str | None = Query(None),
     ipaddr: str | None = Query(None),
     status: str | None = Query(None),
     beginTime: str | None = Query(None, alias="params[beginTime]"),
     endTime: str | None = Query(None, alias="params[endTime]"),
 ):
-    items, total = await crud_logininfor.get_logininfor_list(
-        db, page_num=pageNum, page_size=pageSize,
+    filters = dict(
         user_name=userName, ipaddr=ipaddr, status=status,
         begin_time=beginTime, end_time=endTime,
     )
+    if cursor is not None:
+        items, next_cursor = await crud_logininfor.get_logininfor_page(
+            db, cursor=cursor, page_size=pageSize, **filters,
+        )
+        rows = [_log_to_dict(i) for i in items]
+        return TableDataInfo(total=-1, rows=rows, nextCursor=next_cursor).model_dump()
+    items, total = await crud_logininfor.get_logininfor_list(db, page_num=pageNum, page_size=pageSize, **filters)
     return TableDataInfo(total=total, rows=[_log_to_dict(i) for i in items]).model_dump()
 
 
@@ -39,6 +39,8 @@ async def list_oper_logs(
     db: AsyncSession = Depends(get_db),
     pageNum: int = Query(1, ge=1),
     pageSize: int = Query(10, ge=1, le=100),
+    # Keyset mode: nextCursor of the previous page ("" for the first); pageNum is ignored
+    cursor: str | None = Query(None),
     title: str | None = Query(None),
     businessType: int | None = Query(None),
     operName: str | None = Query(None),
@@ -46,12 +48,18 @@ async def list_oper_logs(
     beginTime: str | None = Query(None, alias="params[beginTime]"),
     endTime: str | None = Query(None, alias="params[endTime]"),
 ):
-    items, total = await crud_oper_log.get_oper_log_list(
-        db, page_num=pageNum, page_size=pageSize,
+    filters = dict(
         title=title, business_type=businessType,
         oper_name=operName, status=status,
         begin_time=beginTime, end_time=endTime,
     )
+    if cursor is not None:
+        items, next_cursor = await crud_oper_log.get_oper_log_page(
+            db, cursor=cursor, page_size=pageSize, **filters,
+        )
+        rows = [_log_to_dict(i) for i in items]
+        return TableDataInfo(total=-1, rows=rows, nextCursor=next_cursor).model_dump()
+    items, total = await crud_oper_log.get_oper_log_list(db, page_num=pageNum, page_size=pageSize, **filters)
     return TableDataInfo(total=total, rows=[_log_to_dict(i) for i in items]).model_dump()
 
 
@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.constants import SYS_CONFIG_KEY, BusinessType
 from app.core.decorators import log_operation
 from app.core.deps import get_current_user, has_permi
+from app.core.etag import etag_matches, etag_response, make_etag, not_modified
 from app.core.redis import get_redis
 from app.core.response import AjaxResult, TableDataInfo
 from app.crud.crud_config import crud_config
@@ -71,19 +72,22 @@ async def export_configs(
 @router.get("/configKey/{config_key:path}")
 async def get_config_by_key(
     config_key: str,
+    request: Request,
     redis_client: aioredis.Redis = Depends(get_redis),
     db: AsyncSession = Depends(get_db),
 ):
-    """Public endpoint: get config value by key (with Redis cache)."""
-    cached = await redis_client.get(f"{SYS_CONFIG_KEY}{config_key}")
-    if cached:
-        return AjaxResult.success(msg=cached)
+    """Public endpoint: get config value by key (with Redis cache and ETag)."""
+    value = await redis_client.get(f"{SYS_CONFIG_KEY}{config_key}")
+    if not value:
+        cfg = await crud_config.get_by_key(db, config_key)
+        value = cfg.config_value if cfg else ""
+        if cfg:
+            await redis_client.set(f"{SYS_CONFIG_KEY}{config_key}", cfg.config_value)
 
-    cfg = await crud_config.get_by_key(db, config_key)
-    if cfg:
-        await redis_client.set(f"{SYS_CONFIG_KEY}{config_key}", cfg.config_value)
-        return AjaxResult.success(msg=cfg.config_value)
-    return AjaxResult.success(msg="")
+    etag = make_etag(value)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return etag_response(AjaxResult.success(msg=value), etag)
 
 
 @router.get("/{config_id}")
@@ -140,10 +144,9 @@ async def delete_configs(
     redis_client: aioredis.Redis = Depends(get_redis),
 ):
     ids = [int(i) for i in config_ids.split(",") if i.strip()]
-    for cid in ids:
-        cfg = await crud_config.get(db, cid)
-        if cfg:
-            await redis_client.delete(f"{SYS_CONFIG_KEY}{cfg.config_key}")
+    keys = {f"{SYS_CONFIG_KEY}{cfg.config_key}" for cfg in await crud_config.get_by_ids(db, ids)}
+    if keys:
+        await redis_client.delete(*keys)
     await crud_config.delete_by_ids(db, ids)
     return AjaxResult.success()
 
@@ -1,13 +1,17 @@
 from fastapi import APIRouter, Depends, Query, Request
+import redis.asyncio as aioredis
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.constants import BusinessType
 from app.core.decorators import log_operation
-from app.core.deps import get_current_user, has_permi
+from app.core.data_scope import DataScopeFilter
+from app.core.deps import get_current_user, get_data_scope, has_permi
+from app.core.redis import get_redis
 from app.core.response import AjaxResult
 from app.crud.crud_dept import crud_dept
 from app.db.session import get_db
 from app.schemas.sys_dept import DeptCreate, DeptUpdate
+from app.services import dept_service
 
 router = APIRouter()
 
@@ -32,11 +36,15 @@ def _dept_to_dict(d) -> dict:
 @router.get("/list")
 async def list_depts(
     current_user: dict = Depends(has_permi("system:dept:list")),
+    data_scope: DataScopeFilter = Depends(get_data_scope),
     db: AsyncSession = Depends(get_db),
+    redis_client: aioredis.Redis = Depends(get_redis),
     deptName: str | None = Query(None),
     status: str | None = Query(None),
 ):
-    depts = await crud_dept.get_all_depts(db, dept_name=deptName, status=status)
+    depts = await dept_service.list_depts(
+        db, redis_client, dept_name=deptName, status=status, data_scope=data_scope,
+    )
     return AjaxResult.success(data=[_dept_to_dict(d) for d in depts])
 
 
@@ -45,8 +53,9 @@ async def list_exclude(
     dept_id: int,
     current_user: dict = Depends(has_permi("system:dept:list")),
     db: AsyncSession = Depends(get_db),
+    redis_client: aioredis.Redis = Depends(get_redis),
 ):
-    depts = await crud_dept.get_exclude_child(db, dept_id)
+    depts = await dept_service.list_depts_excluding(db, redis_client, dept_id)
     return AjaxResult.success(data=[_dept_to_dict(d) for d in depts])
 
 
@@ -84,8 +93,10 @@ async def update_dept(
 ):
     if body.dept_id == body.parent_id:
         return AjaxResult.error(msg="修改部门失败，上级部门不能是自己")
-    await crud_dept.update_dept(db, body, current_user["user_name"])
-    return AjaxResult.success()
+    if body.parent_id and await crud_dept.is_in_subtree(db, body.parent_id, body.dept_id):
+        return AjaxResult.error(msg="修改部门失败，上级部门不能是自己的下级部门")
+    _, moved = await crud_dept.update_dept(db, body, current_user["user_name"])
+    return AjaxResult.success(data={"movedDescendants": moved})
 
 
 @router.delete("/{dept_id}")
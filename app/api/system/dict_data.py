@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.constants import SYS_DICT_KEY, BusinessType
 from app.core.decorators import log_operation
 from app.core.deps import get_current_user, has_permi
+from app.core.etag import etag_matches, etag_response, make_etag, not_modified
 from app.core.redis import get_redis
 from app.core.response import AjaxResult, TableDataInfo
 from app.crud.crud_dict_data import crud_dict_data
@@ -72,22 +73,22 @@ async def export_dict_data(
 @router.get("/type/{dict_type}")
 async def get_dict_data_by_type(
     dict_type: str,
+    request: Request,
     redis_client: aioredis.Redis = Depends(get_redis),
     db: AsyncSession = Depends(get_db),
 ):
-    """Public endpoint: get dict data by type (with Redis cache)."""
+    """Public endpoint: get dict data by type (with Redis cache and ETag)."""
     cached = await redis_client.get(f"{SYS_DICT_KEY}{dict_type}")
-    if cached:
-        return AjaxResult.success(data=json.loads(cached))
+    if not cached:
+        items = await crud_dict_data.get_by_dict_type(db, dict_type)
+        cached = json.dumps([_dict_data_to_dict(i) for i in items], ensure_ascii=False)
+        # Cache result
+        await redis_client.set(f"{SYS_DICT_KEY}{dict_type}", cached)
 
-    items = await crud_dict_data.get_by_dict_type(db, dict_type)
-    data = [_dict_data_to_dict(i) for i in items]
-    # Cache result
-    await redis_client.set(
-        f"{SYS_DICT_KEY}{dict_type}",
-        json.dumps(data, ensure_ascii=False),
-    )
-    return AjaxResult.success(data=data)
+    etag = make_etag(cached)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return etag_response(AjaxResult.success_json(cached), etag)
 
 
 @router.get("/{dict_code}")
@@ -142,9 +143,8 @@ async def delete_dict_data(
 ):
     codes = [int(i) for i in dict_codes.split(",") if i.strip()]
     # Clear cache for affected types
-    for code in codes:
-        dd = await crud_dict_data.get(db, code)
-        if dd:
-            await redis_client.delete(f"{SYS_DICT_KEY}{dd.dict_type}")
+    keys = {f"{SYS_DICT_KEY}{dd.dict_type}" for dd in await crud_dict_data.get_by_ids(db, codes)}
+    if keys:
+        await redis_client.delete(*keys)
     await crud_dict_data.delete_by_ids(db, codes)
     return AjaxResult.success()
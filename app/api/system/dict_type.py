@@ -131,10 +131,9 @@ async def delete_dict_types(
 ):
     ids = [int(i) for i in dict_ids.split(",") if i.strip()]
     # Clear cache for each type before deleting
-    for did in ids:
-        dt = await crud_dict_type.get(db, did)
-        if dt:
-            await redis_client.delete(f"{SYS_DICT_KEY}{dt.dict_type}")
+    keys = {f"{SYS_DICT_KEY}{dt.dict_type}" for dt in await crud_dict_type.get_by_ids(db, ids)}
+    if keys:
+        await redis_client.delete(*keys)
     await crud_dict_type.delete_by_ids(db, ids)
     return AjaxResult.success()
 
@@ -1,3 +1,5 @@
+from operator import attrgetter
+
 from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -10,6 +12,7 @@ from app.crud.crud_menu import crud_menu
 from app.db.session import get_db
 from app.models.associations import sys_role_menu
 from app.schemas.sys_menu import MenuCreate, MenuUpdate
+from app.utils.tree_utils import build_tree
 
 router = APIRouter()
 
@@ -54,7 +57,7 @@ async def treeselect(
     db: AsyncSession = Depends(get_db),
 ):
     menus = await crud_menu.get_menu_list(db)
-    tree = _build_menu_tree(menus, 0)
+    tree = _build_menu_tree(menus)
     return AjaxResult.success(data=tree)
 
 
@@ -65,7 +68,7 @@ async def role_menu_treeselect(
     db: AsyncSession = Depends(get_db),
 ):
     menus = await crud_menu.get_menu_list(db)
-    tree = _build_menu_tree(menus, 0)
+    tree = _build_menu_tree(menus)
 
     # Get checked menu IDs for this role
     result = await db.execute(
@@ -128,14 +131,10 @@ async def delete_menu(
     return AjaxResult.success()
 
 
-def _build_menu_tree(menus, parent_id: int) -> list[dict]:
-    tree = []
-    for m in menus:
-        if m.parent_id == parent_id:
-            node = {
-                "id": m.menu_id,
-                "label": m.menu_name,
-                "children": _build_menu_tree(menus, m.menu_id),
-            }
-            tree.append(node)
-    return tree
+def _build_menu_tree(menus) -> list[dict]:
+    return build_tree(
+        menus,
+        key=attrgetter("menu_id"),
+        parent_key=attrgetter("parent_id"),
+        node=lambda m, children: {"id": m.menu_id, "label": m.menu_name, "children": children},
+    )
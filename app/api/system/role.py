@@ -1,15 +1,20 @@
 from fastapi import APIRouter, Depends, Path, Query, Request
+import redis.asyncio as aioredis
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.constants import BusinessType
 from app.core.decorators import log_operation
-from app.core.deps import get_current_user, has_permi
+from app.core.data_scope import DataScopeFilter
+from app.core.deps import get_current_user, get_data_scope, has_permi
+from app.core.redis import get_redis
 from app.core.response import AjaxResult, TableDataInfo
+from app.core.session_cache import publish_invalidation
 from app.crud.crud_role import crud_role
-from app.db.session import get_db
+from app.db.session import get_db, run_after_commit
 from app.schemas.sys_role import (
     AuthUserBody, RoleChangeStatus, RoleCreate, RoleDataScope, RoleUpdate,
 )
+from app.services import dept_service
 
 router = APIRouter()
 
@@ -129,6 +134,7 @@ async def update_role(
     current_user: dict = Depends(has_permi("system:role:edit")),
     db: AsyncSession = Depends(get_db),
 ):
+    # Key/status/menu changes bump the role's version, which refreshes its users' sessions
     await crud_role.update_role(db, body, current_user["user_name"])
     return AjaxResult.success()
 
@@ -180,11 +186,12 @@ async def allocated_list(
     userName: str | None = Query(None),
     phonenumber: str | None = Query(None),
     current_user: dict = Depends(has_permi("system:role:list")),
+    data_scope: DataScopeFilter = Depends(get_data_scope),
     db: AsyncSession = Depends(get_db),
 ):
     users, total = await crud_role.get_allocated_users(
         db, roleId, page_num=pageNum, page_size=pageSize,
-        user_name=userName, phonenumber=phonenumber,
+        user_name=userName, phonenumber=phonenumber, data_scope=data_scope,
     )
     return TableDataInfo(total=total, rows=[_user_to_dict(u) for u in users]).model_dump()
 
@@ -197,11 +204,12 @@ async def unallocated_list(
     userName: str | None = Query(None),
     phonenumber: str | None = Query(None),
     current_user: dict = Depends(has_permi("system:role:list")),
+    data_scope: DataScopeFilter = Depends(get_data_scope),
     db: AsyncSession = Depends(get_db),
 ):
     users, total = await crud_role.get_unallocated_users(
         db, roleId, page_num=pageNum, page_size=pageSize,
-        user_name=userName, phonenumber=phonenumber,
+        user_name=userName, phonenumber=phonenumber, data_scope=data_scope,
     )
     return TableDataInfo(total=total, rows=[_user_to_dict(u) for u in users]).model_dump()
 
@@ -213,8 +221,10 @@ async def cancel_auth(
     request: Request,
     current_user: dict = Depends(has_permi("system:role:edit")),
     db: AsyncSession = Depends(get_db),
+    redis_client: aioredis.Redis = Depends(get_redis),
 ):
     await crud_role.cancel_auth_user(db, body.user_id, body.role_id)
+    run_after_commit(db, lambda: publish_invalidation(redis_client, user_ids=[body.user_id]))
     return AjaxResult.success()
 
 
@@ -226,9 +236,11 @@ async def cancel_all_auth(
     userIds: str = Query(""),
     current_user: dict = Depends(has_permi("system:role:edit")),
     db: AsyncSession = Depends(get_db),
+    redis_client: aioredis.Redis = Depends(get_redis),
 ):
     ids = [int(i) for i in userIds.split(",") if i.strip()]
-    await crud_role.cancel_auth_users(db, roleId, ids)
+    if await crud_role.cancel_auth_users(db, roleId, ids):
+        run_after_commit(db, lambda: publish_invalidation(redis_client, user_ids=ids))
     return AjaxResult.success()
 
 
@@ -240,9 +252,11 @@ async def select_all_auth(
     userIds: str = Query(""),
     current_user: dict = Depends(has_permi("system:role:edit")),
     db: AsyncSession = Depends(get_db),
+    redis_client: aioredis.Redis = Depends(get_redis),
 ):
     ids = [int(i) for i in userIds.split(",") if i.strip()]
-    await crud_role.select_auth_users(db, roleId, ids)
+    if await crud_role.select_auth_users(db, roleId, ids):
+        run_after_commit(db, lambda: publish_invalidation(redis_client, user_ids=ids))
     return AjaxResult.success()
 
 
@@ -250,28 +264,19 @@ async def select_all_auth(
 async def role_dept_tree(
     role_id: int,
     current_user: dict = Depends(has_permi("system:role:query")),
+    data_scope: DataScopeFilter = Depends(get_data_scope),
     db: AsyncSession = Depends(get_db),
+    redis_client: aioredis.Redis = Depends(get_redis),
 ):
-    from app.crud.crud_dept import crud_dept
     from sqlalchemy import select
     from app.models.associations import sys_role_dept
 
-    depts = await crud_dept.get_all_depts(db)
+    tree = await dept_service.dept_tree_select(db, redis_client, data_scope)
 
     # Get checked dept IDs for this role
     result = await db.execute(
         select(sys_role_dept.c.dept_id).where(sys_role_dept.c.role_id == role_id)
     )
     checked_keys = [row[0] for row in result.fetchall()]
-
-    tree = _build_dept_tree_select(depts, 0)
     return AjaxResult.success(checkedKeys=checked_keys, depts=tree)
 
-
-def _build_dept_tree_select(depts, parent_id: int) -> list[dict]:
-    tree = []
-    for d in depts:
-        if d.parent_id == parent_id:
-            node = {"id": d.dept_id, "label": d.dept_name, "children": _build_dept_tree_select(depts, d.dept_id)}
-            tree.append(node)
-    return tree
@@ -1,25 +1,34 @@
 from fastapi import APIRouter, Depends, Path, Query, Request, UploadFile, File
+import redis.asyncio as aioredis
+from sqlalchemy import inspect
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
-from app.core.constants import BusinessType
+from app.core.constants import BusinessType, LoadProfile
 from app.core.decorators import log_operation
-from app.core.deps import get_current_user, has_permi
+from app.core.data_scope import DataScopeFilter
+from app.core.deps import get_current_user, get_data_scope, has_permi
 from app.core.exceptions import ServiceException
+from app.core.redis import get_redis
 from app.core.response import AjaxResult, TableDataInfo
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash_async, verify_password_async
+from app.core.session_cache import publish_invalidation
 from app.crud.crud_role import crud_role
 from app.crud.crud_user import crud_user
-from app.db.session import get_db
+from app.db.session import get_db, run_after_commit
 from app.schemas.sys_user import (
     ChangeStatusBody, ResetPwdBody, UpdatePwdQuery, UserCreate, UserProfileUpdate, UserUpdate,
 )
+from app.services import dept_service
 
 router = APIRouter()
 
 
 def _user_to_dict(user) -> dict:
-    """Convert SysUser model to dict for JSON serialization."""
+    """Convert SysUser model to dict for JSON serialization.
+
+    ``dept`` and ``roles`` are included only if the query's load profile loaded them.
+    """
     d = {
         "userId": user.user_id,
         "deptId": user.dept_id,
@@ -39,7 +48,8 @@ def _user_to_dict(user) -> dict:
         "updateTime": user.update_time.strftime("%Y-%m-%d %H:%M:%S") if user.update_time else None,
         "remark": user.remark,
     }
-    if user.dept:
+    unloaded = inspect(user).unloaded
+    if "dept" not in unloaded and user.dept:
         d["dept"] = {
             "deptId": user.dept.dept_id,
             "parentId": user.dept.parent_id,
@@ -48,7 +58,7 @@ def _user_to_dict(user) -> dict:
             "leader": user.dept.leader,
             "status": user.dept.status,
         }
-    if hasattr(user, "roles") and user.roles:
+    if "roles" not in unloaded and user.roles:
         d["roles"] = [
             {
                 "roleId": r.role_id,
@@ -68,6 +78,7 @@ def _user_to_dict(user) -> dict:
 @router.get("/list")
 async def list_users(
     current_user: dict = Depends(has_permi("system:user:list")),
+    data_scope: DataScopeFilter = Depends(get_data_scope),
     db: AsyncSession = Depends(get_db),
     pageNum: int = Query(1, ge=1),
     pageSize: int = Query(10, ge=1, le=100),
@@ -88,6 +99,7 @@ async def list_users(
         dept_id=deptId,
         begin_time=beginTime,
         end_time=endTime,
+        data_scope=data_scope,
     )
     rows = [_user_to_dict(u) for u in users]
     return TableDataInfo(total=total, rows=rows).model_dump()
@@ -98,11 +110,14 @@ async def list_users(
 async def export_users(
     request: Request,
     current_user: dict = Depends(has_permi("system:user:export")),
+    data_scope: DataScopeFilter = Depends(get_data_scope),
     db: AsyncSession = Depends(get_db),
 ):
     """Export user list to Excel."""
     from app.utils.excel_utils import export_to_excel
-    users, _ = await crud_user.get_user_list(db, page_num=1, page_size=99999)
+    users, _ = await crud_user.get_user_list(
+        db, page_num=1, page_size=99999, data_scope=data_scope,
+    )
     data = [_user_to_dict(u) for u in users]
     return export_to_excel(
         headers=["用户编号", "登录名称", "用户昵称", "邮箱", "手机号码", "性别", "状态"],
@@ -115,11 +130,11 @@ async def export_users(
 @router.get("/deptTree")
 async def dept_tree(
     current_user: dict = Depends(get_current_user),
+    data_scope: DataScopeFilter = Depends(get_data_scope),
     db: AsyncSession = Depends(get_db),
+    redis_client: aioredis.Redis = Depends(get_redis),
 ):
-    from app.crud.crud_dept import crud_dept
-    depts = await crud_dept.get_all_depts(db)
-    tree = _build_dept_tree(depts, 0)
+    tree = await dept_service.dept_tree_select(db, redis_client, data_scope)
     return AjaxResult.success(data=tree)
 
 
@@ -128,7 +143,7 @@ async def get_profile(
     current_user: dict = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    user = await crud_user.get(db, current_user["user_id"])
+    user = await crud_user.get(db, current_user["user_id"], load=LoadProfile.DETAIL)
     if not user:
         return AjaxResult.error(msg="用户不存在")
     role_group = ",".join(r.role_name for r in user.roles) if user.roles else ""
@@ -146,14 +161,8 @@ async def update_profile(
     current_user: dict = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    user = await crud_user.get(db, current_user["user_id"])
-    if not user:
+    if not await crud_user.update_profile(db, current_user["user_id"], body.model_dump(exclude_unset=True)):
         return AjaxResult.error(msg="用户不存在")
-
-    update_data = body.model_dump(exclude_unset=True)
-    for k, v in update_data.items():
-        setattr(user, k, v)
-    await db.flush()
     return AjaxResult.success()
 
 
@@ -163,16 +172,18 @@ async def update_pwd(
     newPassword: str = Query(""),
     current_user: dict = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    redis_client: aioredis.Redis = Depends(get_redis),
 ):
     user = await crud_user.get(db, current_user["user_id"])
     if not user:
         return AjaxResult.error(msg="用户不存在")
-    if not verify_password(oldPassword, user.password):
+    if not await verify_password_async(oldPassword, user.password):
         return AjaxResult.error(msg="修改密码失败，旧密码错误")
-    if verify_password(newPassword, user.password):
+    if await verify_password_async(newPassword, user.password):
         return AjaxResult.error(msg="新密码不能与旧密码相同")
-    user.password = get_password_hash(newPassword)
+    user.password = await get_password_hash_async(newPassword)
     await db.flush()
+    run_after_commit(db, lambda: publish_invalidation(redis_client, user_ids=[user.user_id]))
     return AjaxResult.success()
 
 
@@ -205,7 +216,7 @@ async def auth_role(
     current_user: dict = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    user = await crud_user.get(db, user_id)
+    user = await crud_user.get(db, user_id, load=LoadProfile.DETAIL)
     if not user:
         return AjaxResult.error(msg="用户不存在")
     roles = await crud_role.get_all_roles(db)
@@ -231,17 +242,11 @@ async def update_auth_role(
     roleIds: str = Query(""),
     current_user: dict = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    redis_client: aioredis.Redis = Depends(get_redis),
 ):
-    from sqlalchemy import delete as sa_delete, insert as sa_insert
-    from app.models.associations import sys_user_role
-
     role_ids = [int(i) for i in roleIds.split(",") if i.strip()]
-    await db.execute(sa_delete(sys_user_role).where(sys_user_role.c.user_id == userId))
-    if role_ids:
-        await db.execute(
-            sa_insert(sys_user_role),
-            [{"user_id": userId, "role_id": rid} for rid in role_ids],
-        )
+    if await crud_user.update_user_roles(db, userId, role_ids):
+        run_after_commit(db, lambda: publish_invalidation(redis_client, user_ids=[userId]))
     return AjaxResult.success()
 
 
@@ -253,7 +258,7 @@ async def reset_pwd(
     current_user: dict = Depends(has_permi("system:user:resetPwd")),
     db: AsyncSession = Depends(get_db),
 ):
-    password_hash = get_password_hash(body.password)
+    password_hash = await get_password_hash_async(body.password)
     await crud_user.reset_password(db, body.user_id, password_hash, current_user["user_name"])
     return AjaxResult.success()
 
@@ -294,7 +299,7 @@ async def get_user(
     db: AsyncSession = Depends(get_db),
 ):
     from app.crud.crud_post import crud_post
-    user = await crud_user.get(db, user_id)
+    user = await crud_user.get(db, user_id, load=LoadProfile.DETAIL)
     if not user:
         return AjaxResult.error(msg="用户不存在")
 
@@ -325,7 +330,7 @@ async def add_user(
         return AjaxResult.error(msg=f"新增用户'{body.user_name}'失败，登录账号已存在")
 
     password = body.password or "123456"
-    password_hash = get_password_hash(password)
+    password_hash = await get_password_hash_async(password)
     await crud_user.create_user(db, body, password_hash, current_user["user_name"])
     return AjaxResult.success()
 
@@ -337,8 +342,11 @@ async def update_user(
     request: Request,
     current_user: dict = Depends(has_permi("system:user:edit")),
     db: AsyncSession = Depends(get_db),
+    redis_client: aioredis.Redis = Depends(get_redis),
 ):
-    await crud_user.update_user(db, body, current_user["user_name"])
+    _, session_changed = await crud_user.update_user(db, body, current_user["user_name"])
+    if session_changed:
+        run_after_commit(db, lambda: publish_invalidation(redis_client, user_ids=[body.user_id]))
     return AjaxResult.success()
 
 
@@ -356,11 +364,3 @@ async def delete_users(
     await crud_user.soft_delete(db, ids)
     return AjaxResult.success()
 
-
-def _build_dept_tree(depts, parent_id: int) -> list[dict]:
-    tree = []
-    for d in depts:
-        if d.parent_id == parent_id:
-            node = {"id": d.dept_id, "label": d.dept_name, "children": _build_dept_tree(depts, d.dept_id)}
-            tree.append(node)
-    return tree
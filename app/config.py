@@ -15,15 +15,47 @@ class Settings(BaseSettings):
 
     # JWT
     JWT_SECRET: str = "your-secret-key-change-in-production"
+    # "hs256" (stdlib, default) or "jose" (python-jose); both accept the same tokens
+    JWT_BACKEND: str = "hs256"
+    # Verified tokens are remembered so a hot token is not re-verified on every request
+    TOKEN_MEMO_MAX_SIZE: int = 10000
+    TOKEN_MEMO_TTL_SECONDS: int = 60
     TOKEN_EXPIRE_MINUTES: int = 30
+    # Only slide the session TTL in Redis once less than this much remains
+    TOKEN_REFRESH_WINDOW_MINUTES: int = 20
+    # Embed user id, dept, role ids and permission versions in the token so a
+    # worker can authenticate without reading the session from Redis
+    STATELESS_TOKEN_ENABLED: bool = False
+
+    # Per-worker L1 cache of login sessions (in front of Redis login_tokens)
+    SESSION_CACHE_ENABLED: bool = True
+    SESSION_CACHE_MAX_SIZE: int = 10000
+    SESSION_CACHE_TTL_SECONDS: int = 10
 
     # Captcha
     CAPTCHA_ENABLED: bool = True
     CAPTCHA_EXPIRE_SECONDS: int = 120
+    # Pre-rendered captcha pool; refilled in the background once it drops to
+    # the threshold. Size 0 renders every captcha on demand.
+    CAPTCHA_POOL_SIZE: int = 200
+    CAPTCHA_POOL_REFILL_THRESHOLD: int = 50
+    CAPTCHA_POOL_WORKERS: int = 2
+
+    # List totals: "window" lists fetch rows and COUNT(*) OVER() in one query,
+    # which needs MySQL 8+ (off by default so MySQL 5.7 keeps working); when
+    # disabled they fall back to a separate count
+    PAGINATION_WINDOW_COUNT: bool = False
+    # How long "cached" / "estimated" list totals are reused (seconds)
+    PAGINATION_TOTAL_CACHE_SECONDS: int = 10
 
     # File Upload
     UPLOAD_PATH: str = "./uploads"
 
+    # bcrypt runs on a bounded thread pool; requests beyond MAX_PENDING
+    # (running + queued) are rejected immediately with a "busy" error
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
     # Account lock after failed login attempts
     MAX_RETRY_COUNT: int = 5
     LOCK_TIME_MINUTES: int = 10
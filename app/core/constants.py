@@ -72,13 +72,42 @@ class NoticeType:
     BULLETIN = "2"  # Bulletin
 
 
+# How CRUDBase.get_list obtains the total of a paginated list
+class CountMode:
+    EXACT = "exact"  # Separate COUNT(*) over the filtered query
+    WINDOW = "window"  # COUNT(*) OVER() in the page query (MySQL 8+)
+    CACHED = "cached"  # Exact count, reused for a few seconds per filter set
+    ESTIMATED = "estimated"  # Table statistics when unfiltered, else as CACHED
+
+
+# Named relationship loader-option sets of a CRUD class (CRUDBase.load_profiles)
+class LoadProfile:
+    LIST = "list"  # List pages and exports
+    DETAIL = "detail"  # Single-record views
+
+
 # Redis key prefixes
 LOGIN_TOKEN_KEY = "login_tokens:"
+LOGIN_USER_TOKENS_KEY = "login_user_tokens:"  # Set of token keys per user ID
+LOGIN_ONLINE_KEY = "login_online"  # Sorted set of token keys scored by session expiry time
 CAPTCHA_CODE_KEY = "captcha_codes:"
 SYS_DICT_KEY = "sys_dict:"
 SYS_CONFIG_KEY = "sys_config:"
 PWD_ERR_CNT_KEY = "pwd_err_cnt:"
 REPEAT_SUBMIT_KEY = "repeat_submit:"
+ROLE_PERMS_KEY = "role_perms:"  # Permission set per role / role versions
+PERM_DICT_KEY = "sys_perm_dict"  # Hash interning permission strings to small ids
+REVOKED_TOKENS_KEY = "revoked_tokens"  # Sorted set of revoked token keys scored by expiry
+REVOKED_USERS_KEY = "revoked_users"  # Sorted set of user IDs scored by last invalidation time
+ROLE_VERSIONS_KEY = "role_versions"  # Hash of role ID (and "all") -> permission version
+DEPT_VERSION_KEY = "dept_version"  # Counter bumped on every department change
+USER_INFO_VERSION_KEY = "user_info_version:"  # Counter per user ID bumped when /getInfo columns change
+DATA_SCOPE_KEY = "data_scope:"  # Resolved data scope per dept / role set / versions
+ROUTERS_KEY = "sys_routers:"  # getRouters tree per role set / versions
+PAGE_TOTAL_KEY = "page_total:"  # Cached list totals per table / query hash
+
+# Redis pub/sub channels
+SESSION_INVALIDATE_CHANNEL = "session_invalidate"
 
 # Super admin role key
 SUPER_ADMIN = "admin"
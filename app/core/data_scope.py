@@ -1,71 +1,148 @@
-"""Data scope filtering for role-based data permissions."""
+"""Data scope filtering for role-based data permissions.
 
-from sqlalchemy import Select, or_, select
+A user's visible departments are the union over their active roles:
 
-from app.core.constants import DataScope
-from app.models.associations import sys_role_dept
+* ``ALL`` -- no restriction;
+* ``CUSTOM`` -- the role's ``sys_role_dept`` rows;
+* ``DEPT`` -- the user's own department;
+* ``DEPT_AND_CHILD`` -- the user's department subtree (``sys_dept_closure``);
+* ``SELF`` -- no departments, only rows belonging to the user.
+
+The result depends only on the user's dept, role ids, those roles' versions
+(``role_versions``) and the department version (``dept_version``), so it is
+cached in Redis and in-process under a key built from all of them. Any
+change to a role or the department tree bumps a version and therefore a new
+key; stale keys simply expire.
+"""
+import json
+from collections import OrderedDict
+
+import redis.asyncio as aioredis
+from sqlalchemy import Select, false, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.constants import (
+    DATA_SCOPE_KEY, DEPT_VERSION_KEY, ROLE_VERSIONS_KEY, SUPER_ADMIN, DataScope,
+)
+from app.models.associations import sys_dept_closure, sys_role_dept
 from app.models.sys_dept import SysDept
+from app.models.sys_role import SysRole
 from app.models.sys_user import SysUser
 
+# Resolved scopes are versioned, so a day is only a bound on Redis garbage
+DATA_SCOPE_TTL_SECONDS = 24 * 3600
+_MAX_LOCAL = 1024
+
+
+class DataScopeFilter:
+    """Resolved data scope of one user."""
+
+    __slots__ = ("all", "dept_ids", "user_id")
 
-def apply_data_scope(
-    query: Select,
-    user: dict,
-    dept_alias=None,
-    user_alias=None,
-) -> Select:
-    """Apply data permission filter based on user's role data_scope.
-
-    Args:
-        query: The base SQLAlchemy select query
-        user: The current user dict (from Redis LoginUser)
-        dept_alias: Optional dept model alias for filtering
-        user_alias: Optional user model alias for filtering
-    """
-    roles = user.get("roles_info", [])
-    if not roles:
-        # If no roles_info, check if user is admin
-        if "admin" in user.get("roles", []):
+    def __init__(
+        self, all: bool = False, dept_ids: list[int] | None = None, user_id: int | None = None,
+    ):
+        self.all = all
+        self.dept_ids = dept_ids or []
+        # Set when a SELF role lets the user see their own rows
+        self.user_id = user_id
+
+    def apply_to_users(self, query: Select, user_col=SysUser) -> Select:
+        if self.all:
+            return query
+        conditions = []
+        if self.dept_ids:
+            conditions.append(user_col.dept_id.in_(self.dept_ids))
+        if self.user_id is not None:
+            conditions.append(user_col.user_id == self.user_id)
+        return query.where(or_(*conditions) if conditions else false())
+
+    def apply_to_depts(self, query: Select, dept_col=SysDept) -> Select:
+        if self.all:
             return query
-        # Default: self only
-        user_col = user_alias or SysUser
-        return query.where(user_col.user_id == user["user_id"])
-
-    conditions = []
-    for role in roles:
-        scope = role.get("data_scope", DataScope.SELF)
-
-        if scope == DataScope.ALL:
-            return query  # No filter needed
-
-        dept_col = dept_alias or SysDept
-        user_col = user_alias or SysUser
-        user_dept_id = user.get("dept_id")
-
-        if scope == DataScope.CUSTOM:
-            conditions.append(
-                dept_col.dept_id.in_(
-                    select(sys_role_dept.c.dept_id).where(
-                        sys_role_dept.c.role_id == role["role_id"]
-                    )
-                )
-            )
-        elif scope == DataScope.DEPT:
-            if user_dept_id:
-                conditions.append(dept_col.dept_id == user_dept_id)
-        elif scope == DataScope.DEPT_AND_CHILD:
-            if user_dept_id:
-                conditions.append(
-                    or_(
-                        dept_col.dept_id == user_dept_id,
-                        dept_col.ancestors.like(f"%,{user_dept_id},%"),
-                        dept_col.ancestors.like(f"%,{user_dept_id}"),
-                    )
-                )
-        elif scope == DataScope.SELF:
-            conditions.append(user_col.user_id == user["user_id"])
-
-    if conditions:
-        query = query.where(or_(*conditions))
-
-    return query
+        if not self.dept_ids:
+            return query.where(false())
+        return query.where(dept_col.dept_id.in_(self.dept_ids))
+
+
+# Cached per role set as (all, dept_ids, self_rows); the user id is filled in per request
+_local: OrderedDict[str, tuple[bool, list[int], bool]] = OrderedDict()
+
+
+async def resolve_data_scope(
+    user: dict, db: AsyncSession, redis: aioredis.Redis,
+) -> DataScopeFilter:
+    """Resolve the data scope of the current user (a LoginUser dict)."""
+    if SUPER_ADMIN in user.get("roles", []):
+        return DataScopeFilter(all=True)
+
+    role_ids = sorted(user.get("role_ids", []))
+    dept_id = user.get("dept_id") or 0
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.get(DEPT_VERSION_KEY)
+        if role_ids:
+            pipe.hmget(ROLE_VERSIONS_KEY, [str(rid) for rid in role_ids])
+        dept_version, *role_versions = await pipe.execute()
+    versions = ".".join(_text(v) for v in role_versions[0]) if role_versions else ""
+    key = (
+        f"{DATA_SCOPE_KEY}{dept_id}:{','.join(map(str, role_ids))}:"
+        f"{versions}:{_text(dept_version)}"
+    )
+
+    entry = _local.get(key)
+    if entry is not None:
+        _local.move_to_end(key)
+    else:
+        cached = await redis.get(key)
+        if cached is not None:
+            data = json.loads(cached)
+            entry = (data["all"], data["depts"], data["self"])
+        else:
+            entry = await _compute(dept_id, role_ids, db)
+            await redis.setex(key, DATA_SCOPE_TTL_SECONDS, json.dumps(
+                {"all": entry[0], "depts": entry[1], "self": entry[2]}
+            ))
+        _local[key] = entry
+        if len(_local) > _MAX_LOCAL:
+            _local.popitem(last=False)
+
+    all_, dept_ids, self_rows = entry
+    return DataScopeFilter(all_, dept_ids, user["user_id"] if self_rows else None)
+
+
+def _text(value: bytes | str | None) -> str:
+    if value is None:
+        return "0"
+    return value.decode() if isinstance(value, bytes) else value
+
+
+async def _compute(
+    user_dept_id: int, role_ids: list[int], db: AsyncSession,
+) -> tuple[bool, list[int], bool]:
+    result = await db.execute(
+        select(SysRole.role_id, SysRole.data_scope).where(
+            SysRole.role_id.in_(role_ids),
+            SysRole.status == "0",
+            SysRole.del_flag == "0",
+        )
+    )
+    scopes = result.all()
+    if any(scope == DataScope.ALL for _, scope in scopes):
+        return True, [], False
+
+    custom_roles = [rid for rid, scope in scopes if scope == DataScope.CUSTOM]
+    kinds = {scope for _, scope in scopes}
+    dept_ids: set[int] = set()
+    if custom_roles:
+        result = await db.execute(
+            select(sys_role_dept.c.dept_id).where(sys_role_dept.c.role_id.in_(custom_roles))
+        )
+        dept_ids.update(result.scalars().all())
+    if user_dept_id and DataScope.DEPT_AND_CHILD in kinds:
+        result = await db.execute(
+            select(sys_dept_closure.c.descendant).where(sys_dept_closure.c.ancestor == user_dept_id)
+        )
+        dept_ids.update(result.scalars().all())
+    elif user_dept_id and DataScope.DEPT in kinds:
+        dept_ids.add(user_dept_id)
+    return False, sorted(dept_ids), DataScope.SELF in kinds
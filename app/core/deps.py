@@ -1,16 +1,21 @@
-import json
 from typing import Any
 
 from fastapi import Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import redis.asyncio as aioredis
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
-from app.core.constants import LOGIN_TOKEN_KEY, SUPER_ADMIN
+from app.core.constants import SUPER_ADMIN
+from app.core.data_scope import DataScopeFilter, resolve_data_scope
 from app.core.exceptions import AuthException, ForbiddenException
-from app.core.redis import get_redis
-from app.core.security import parse_token
+from app.core.redis import get_redis, get_session_redis
+from app.core.security import decode_token
+from app.core.session_cache import session_cache
+from app.core.session_store import load_session, needs_refresh
+from app.core.stateless_auth import stateless_auth
 from app.db.session import get_db
+from app.services import permission_service
 
 http_bearer = HTTPBearer(auto_error=False)
 
@@ -18,49 +23,93 @@ http_bearer = HTTPBearer(auto_error=False)
 async def get_current_user(
     request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(http_bearer),
-    redis: aioredis.Redis = Depends(get_redis),
+    redis: aioredis.Redis = Depends(get_session_redis),
 ) -> dict:
     """Extract and validate token, load user info from Redis.
 
-    Returns the LoginUser dict stored in Redis.
+    Returns the LoginUser dict stored in Redis. Hot sessions are served from
+    the per-worker L1 cache; Redis is only consulted on a cache miss or once
+    the session enters the refresh window, in which case the TTL is slid in
+    the same round trip. With STATELESS_TOKEN_ENABLED a cache miss is first
+    tried against the token's own claims. Permissions of a reloaded session
+    are resolved from its role ids at the current role versions.
     """
     if not credentials:
         raise AuthException("未提供认证令牌")
 
     token = credentials.credentials
-    user_key = parse_token(token)
+    claims = decode_token(token)
+    user_key = claims.get("login_user_key") if claims else None
     if not user_key:
         raise AuthException("令牌无效或已过期")
 
-    user_json = await redis.get(f"{LOGIN_TOKEN_KEY}{user_key}")
-    if not user_json:
-        raise AuthException("登录已过期，请重新登录")
-
-    # Refresh TTL
-    await redis.expire(
-        f"{LOGIN_TOKEN_KEY}{user_key}",
-        settings.TOKEN_EXPIRE_MINUTES * 60,
-    )
-
-    return json.loads(user_json)
+    session = session_cache.get(user_key)
+    if session is None and settings.STATELESS_TOKEN_ENABLED and "uid" in claims:
+        resolved = await stateless_auth.authenticate(redis, claims)
+        if resolved is not None:
+            session = session_cache.put(user_key, *resolved)
+    if session is None or needs_refresh(session.user):
+        current_user = await load_session(redis, user_key)
+        if current_user is None:
+            session_cache.invalidate(user_key)
+            raise AuthException("登录已过期，请重新登录")
+        resolved = await permission_service.session_permissions(current_user, redis)
+        if resolved is None:
+            session = session_cache.put(user_key, current_user)
+        else:
+            current_user["permissions"], index = resolved
+            session = session_cache.put(user_key, current_user, index)
+
+    # Compiled permission index, consumed by has_permi / has_any_permi / has_all_permi
+    request.state.permissions = session.permissions
+    return session.user
 
 
 def has_permi(permission: str):
-    """Permission check dependency factory."""
+    """Permission check dependency factory.
+
+    Supports wildcard grants such as ``system:user:*`` and ``system:*``.
+    """
 
     async def check_permission(
+        request: Request,
         current_user: dict = Depends(get_current_user),
     ) -> dict:
-        permissions = current_user.get("permissions", [])
-        if "*:*:*" in permissions:
-            return current_user
-        if permission not in permissions:
+        if not request.state.permissions.has(permission):
             raise ForbiddenException(f"没有权限访问: {permission}")
         return current_user
 
     return check_permission
 
 
+def has_any_permi(*permissions: str):
+    """Passes if the user holds at least one of the permissions (RuoYi hasAnyPermi)."""
+
+    async def check_permission(
+        request: Request,
+        current_user: dict = Depends(get_current_user),
+    ) -> dict:
+        if not request.state.permissions.has_any(permissions):
+            raise ForbiddenException(f"没有权限访问: {','.join(permissions)}")
+        return current_user
+
+    return check_permission
+
+
+def has_all_permi(*permissions: str):
+    """Passes only if the user holds every one of the permissions."""
+
+    async def check_permission(
+        request: Request,
+        current_user: dict = Depends(get_current_user),
+    ) -> dict:
+        if not request.state.permissions.has_all(permissions):
+            raise ForbiddenException(f"没有权限访问: {','.join(permissions)}")
+        return current_user
+
+    return check_permission
+
+
 def has_role(role_key: str):
     """Role check dependency factory."""
 
@@ -75,3 +124,12 @@ def has_role(role_key: str):
         return current_user
 
     return check_role
+
+
+async def get_data_scope(
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    redis: aioredis.Redis = Depends(get_redis),
+) -> DataScopeFilter:
+    """The current user's data scope (RuoYi @DataScope), for list queries."""
+    return await resolve_data_scope(current_user, db, redis)
@@ -0,0 +1,65 @@
+"""Strong ETags and conditional GET for frequently polled endpoints.
+
+An endpoint derives its ETag from something it already has cheaply -- a
+versioned cache key, the cached payload, the handful of columns the response
+is built from -- and checks ``If-None-Match`` before building the body:
+
+    etag = make_etag(cache_key)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    ...
+    return etag_response(AjaxResult.success(data=data), etag)
+
+The responses are per user, so they are marked ``private, no-cache``: the
+browser keeps them but revalidates on every use.
+"""
+import hashlib
+import json
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag over ``parts`` (str/bytes, or anything with a stable repr)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode()
+        elif not isinstance(part, bytes):
+            part = repr(part).encode()
+        digest.update(len(part).to_bytes(4, "big"))
+        digest.update(part)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's ``If-None-Match`` lists ``etag`` (or is ``*``)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        # If-None-Match uses weak comparison, so a W/ prefix added by a proxy still matches
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def etag_response(content, etag: str) -> Response:
+    """JSON response carrying ``etag``; ``content`` may be pre-serialized bytes."""
+    if not isinstance(content, bytes):
+        content = json.dumps(
+            jsonable_encoder(content), ensure_ascii=False, separators=(",", ":"),
+        ).encode()
+    return Response(
+        content,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+    )
@@ -1,6 +1,9 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.config import settings
+from app.db.session import sql_statement_count
+
 
 def setup_middleware(app: FastAPI):
     """Configure application middleware."""
@@ -10,5 +13,18 @@ def setup_middleware(app: FastAPI):
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
-        expose_headers=["Content-Disposition"],
+        expose_headers=["Content-Disposition", "X-SQL-Count"],
     )
+
+    if settings.DEBUG:
+        @app.middleware("http")
+        async def count_sql_statements(request: Request, call_next):
+            """Report the number of SQL statements a request ran in ``X-SQL-Count``."""
+            counter = [0]
+            token = sql_statement_count.set(counter)
+            try:
+                response = await call_next(request)
+            finally:
+                sql_statement_count.reset(token)
+            response.headers["X-SQL-Count"] = str(counter[0])
+            return response
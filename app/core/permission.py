@@ -0,0 +1,76 @@
+"""Compiled permission index for RuoYi-style permission strings.
+
+Permissions look like ``system:user:list``. A granted permission may use
+``*`` for any single segment; a trailing ``*`` also covers every deeper
+segment, so ``system:*`` grants ``system:user:list`` and ``*:*:*`` grants
+everything. A ``*`` always stands for at least one segment: ``system:user:*``
+does not grant ``system:user``.
+"""
+from typing import Iterable
+
+ALL_PERMISSION = "*:*:*"
+WILDCARD = "*"
+
+_END = ""  # Marks a trie node where a granted pattern ends
+
+
+class PermissionIndex:
+    """Immutable permission set compiled once per session.
+
+    Exact grants are looked up in a frozenset (O(1)); wildcard grants live in
+    a prefix trie walked segment by segment (O(depth)). Results for wildcard
+    lookups are memoised, and required permissions are a fixed set of route
+    constants, so steady-state checks do not allocate.
+    """
+
+    __slots__ = ("_exact", "_trie", "_all", "_memo")
+
+    def __init__(self, permissions: Iterable[str]):
+        exact = frozenset(p.strip() for p in permissions if p and p.strip())
+        trie: dict = {}
+        for perm in exact:
+            if WILDCARD not in perm:
+                continue
+            node = trie
+            for segment in perm.split(":"):
+                node = node.setdefault(segment, {})
+            node[_END] = True
+        self._exact = exact
+        self._trie = trie
+        self._all = ALL_PERMISSION in exact or WILDCARD in exact
+        self._memo: dict[str, bool] = {}
+
+    def __contains__(self, permission: str) -> bool:
+        return self.has(permission)
+
+    def has(self, permission: str) -> bool:
+        if self._all or permission in self._exact:
+            return True
+        if not self._trie:
+            return False
+        granted = self._memo.get(permission)
+        if granted is None:
+            granted = _match(self._trie, permission.split(":"), 0)
+            self._memo[permission] = granted
+        return granted
+
+    def has_any(self, permissions: Iterable[str]) -> bool:
+        return any(self.has(p) for p in permissions)
+
+    def has_all(self, permissions: Iterable[str]) -> bool:
+        return all(self.has(p) for p in permissions)
+
+
+def _match(node: dict, segments: list[str], i: int) -> bool:
+    if i == len(segments):
+        return _END in node
+    child = node.get(segments[i])
+    if child is not None and _match(child, segments, i + 1):
+        return True
+    star = node.get(WILDCARD)
+    if star is not None:
+        # A trailing "*" covers this segment and everything below it
+        if _END in star or _match(star, segments, i + 1):
+            return True
+    return False
+
@@ -3,25 +3,31 @@ import redis.asyncio as aioredis
 from app.config import settings
 
 redis_client: aioredis.Redis | None = None
+# Separate pool without response decoding, for binary values (login sessions)
+session_redis_client: aioredis.Redis | None = None
 
 
 async def init_redis() -> aioredis.Redis:
     """Initialize async Redis connection."""
-    global redis_client
+    global redis_client, session_redis_client
     redis_client = aioredis.from_url(
         settings.REDIS_URL,
         encoding="utf-8",
         decode_responses=True,
     )
+    session_redis_client = aioredis.from_url(settings.REDIS_URL)
     return redis_client
 
 
 async def close_redis():
     """Close Redis connection."""
-    global redis_client
+    global redis_client, session_redis_client
     if redis_client:
         await redis_client.close()
         redis_client = None
+    if session_redis_client:
+        await session_redis_client.close()
+        session_redis_client = None
 
 
 def get_redis() -> aioredis.Redis:
@@ -29,3 +35,10 @@ def get_redis() -> aioredis.Redis:
     if redis_client is None:
         raise RuntimeError("Redis client not initialized")
     return redis_client
+
+
+def get_session_redis() -> aioredis.Redis:
+    """FastAPI dependency that provides the raw-bytes Redis client used for sessions."""
+    if session_redis_client is None:
+        raise RuntimeError("Redis client not initialized")
+    return session_redis_client
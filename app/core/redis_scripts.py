@@ -0,0 +1,123 @@
+"""Server-side Lua scripts.
+
+Scripts are registered once per client and invoked by SHA (``EVALSHA``);
+redis-py falls back to ``EVAL`` transparently if the script cache was flushed.
+"""
+import redis.asyncio as aioredis
+from redis.commands.core import AsyncScript
+
+# GET a login session and slide its TTL only when it is about to expire,
+# moving its online-index score (the expiry time) along with it.
+# KEYS[1] = session key, KEYS[2] = global online zset
+# ARGV[1] = refresh window (seconds), ARGV[2] = full session TTL (seconds),
+# ARGV[3] = token key, ARGV[4] = new expiry timestamp
+# Returns {value, remaining_ttl} or nil when the session does not exist.
+GET_AND_REFRESH_SESSION = """
+local value = redis.call('GET', KEYS[1])
+if not value then
+    return nil
+end
+local ttl = redis.call('TTL', KEYS[1])
+if ttl >= 0 and ttl < tonumber(ARGV[1]) then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    redis.call('ZADD', KEYS[2], 'XX', ARGV[4], ARGV[3])
+    ttl = tonumber(ARGV[2])
+end
+return {value, ttl}
+"""
+
+# The index scripts below touch login_tokens:* keys derived from set members
+# rather than passed in KEYS, which is fine on a standalone Redis (not Cluster).
+
+# Index a new session and prune the user's already-expired sessions.
+# KEYS[1] = per-user token set, KEYS[2] = global online zset
+# ARGV[1] = token key, ARGV[2] = session expiry timestamp, ARGV[3] = session key prefix
+INDEX_SESSION = """
+for _, token in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+    if redis.call('EXISTS', ARGV[3] .. token) == 0 then
+        redis.call('SREM', KEYS[1], token)
+        redis.call('ZREM', KEYS[2], token)
+    end
+end
+redis.call('SADD', KEYS[1], ARGV[1])
+redis.call('ZADD', KEYS[2], ARGV[2], ARGV[1])
+return 1
+"""
+
+# Delete every session of the given users and drop them from the index.
+# KEYS = per-user token sets
+# ARGV[1] = session key prefix, ARGV[2] = global online zset
+# Returns the revoked token keys.
+REVOKE_USER_SESSIONS = """
+local revoked = {}
+for _, user_key in ipairs(KEYS) do
+    for _, token in ipairs(redis.call('SMEMBERS', user_key)) do
+        redis.call('DEL', ARGV[1] .. token)
+        redis.call('ZREM', ARGV[2], token)
+        revoked[#revoked + 1] = token
+    end
+    redis.call('DEL', user_key)
+end
+return revoked
+"""
+
+# Login pre-check: consume the captcha and check the account lock atomically.
+# KEYS[1] = captcha key, KEYS[2] = password error counter key
+# ARGV[1] = "1" if captcha is enabled, ARGV[2] = submitted code (lower case),
+# ARGV[3] = max retry count
+# Returns {status, error_count}: status 0 = ok, 1 = bad captcha, 2 = locked.
+LOGIN_PRECHECK = """
+if ARGV[1] == '1' then
+    local cached = redis.call('GET', KEYS[1])
+    redis.call('DEL', KEYS[1])
+    if not cached or string.lower(cached) ~= ARGV[2] then
+        return {1, 0}
+    end
+end
+local count = tonumber(redis.call('GET', KEYS[2]) or '0')
+if count >= tonumber(ARGV[3]) then
+    return {2, count}
+end
+return {0, count}
+"""
+
+# Record a failed login attempt; the counter expires LOCK_TIME after the first failure.
+# KEYS[1] = password error counter key, ARGV[1] = lock time (seconds)
+LOGIN_FAILURE = """
+local count = redis.call('INCR', KEYS[1])
+if count == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return count
+"""
+
+# Map permission strings to small stable ids in the shared permission dictionary.
+# The hash holds "p:<perm>" -> id, "i:<id>" -> perm, a "seq" counter and an
+# "epoch" tag that is set when the dictionary is first created.
+# KEYS[1] = dictionary hash
+# ARGV[1] = candidate epoch (used only for a new dictionary), ARGV[2..] = permissions
+# Returns {epoch, id1, id2, ...}.
+INTERN_PERMISSIONS = """
+redis.call('HSETNX', KEYS[1], 'epoch', ARGV[1])
+local result = {redis.call('HGET', KEYS[1], 'epoch')}
+for i = 2, #ARGV do
+    local id = redis.call('HGET', KEYS[1], 'p:' .. ARGV[i])
+    if not id then
+        id = redis.call('HINCRBY', KEYS[1], 'seq', 1)
+        redis.call('HSET', KEYS[1], 'p:' .. ARGV[i], id, 'i:' .. id, ARGV[i])
+    end
+    result[i] = tonumber(id)
+end
+return result
+"""
+
+_registered: dict[str, AsyncScript] = {}
+
+
+def get_script(redis: aioredis.Redis, source: str) -> AsyncScript:
+    """Return the script registered on ``redis``, registering it on first use."""
+    script = _registered.get(source)
+    if script is None or script.registered_client is not redis:
+        script = redis.register_script(source)
+        _registered[source] = script
+    return script
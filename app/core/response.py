@@ -1,3 +1,4 @@
+import json
 from typing import Any
 
 from pydantic import BaseModel
@@ -23,15 +24,28 @@ class AjaxResult(BaseModel):
         result.update(kwargs)
         return result
 
+    @classmethod
+    def success_json(cls, data: str | bytes, msg: str = "操作成功") -> bytes:
+        """Serialized ``success(data=...)`` body around already-serialized JSON ``data``."""
+        if isinstance(data, str):
+            data = data.encode()
+        head = json.dumps({"code": 200, "msg": msg}, ensure_ascii=False, separators=(",", ":"))
+        return head[:-1].encode() + b',"data":' + data + b"}"
+
     @classmethod
     def error(cls, msg: str = "操作失败", code: int = 500) -> dict:
         return {"code": code, "msg": msg}
 
 
 class TableDataInfo(BaseModel):
-    """Paginated list response compatible with RuoYi frontend."""
+    """Paginated list response compatible with RuoYi frontend.
+
+    Keyset-paginated lists add ``nextCursor`` and report ``total`` as -1 (not counted).
+    """
 
     code: int = 200
     msg: str = "查询成功"
     total: int = 0
     rows: list[Any] = []
+
+    model_config = {"extra": "allow"}
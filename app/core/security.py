@@ -1,13 +1,30 @@
+import asyncio
+import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta, timezone
 
-from jose import jwt, JWTError
 from passlib.context import CryptContext
 
 from app.config import settings
+from app.core.exceptions import ServiceException
+from app.core.jwt_backend import InvalidTokenError, create_backend
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+_hash_pending = 0
+# The task holding a slot from hash_pool_slot(); tasks it spawns inherit the
+# variable but not the slot, hence the identity check
+_hash_slot_holder: ContextVar[asyncio.Task | None] = ContextVar("hash_slot_holder", default=None)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -17,23 +34,98 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def create_token(user_key: str) -> str:
-    """Create a JWT token containing only the user's Redis key UUID."""
+@contextmanager
+def hash_pool_slot():
+    """Hold a hash pool queue slot, raising ServiceException when the queue is full.
+
+    Lets a caller fail fast before work it cannot undo (login consumes the
+    captcha before verifying the password); hashing inside reuses the slot.
+    """
+    global _hash_pending
+    task = asyncio.current_task()
+    if task is not None and _hash_slot_holder.get() is task:
+        yield
+        return
+    if _hash_pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise ServiceException("系统繁忙，请稍后重试")
+    _hash_pending += 1
+    token = _hash_slot_holder.set(task)
+    try:
+        yield
+    finally:
+        _hash_slot_holder.reset(token)
+        _hash_pending -= 1
+
+
+async def _run_in_hash_pool(func, *args):
+    """Run a bcrypt call on the hash pool, failing fast when the queue is full."""
+    with hash_pool_slot():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Non-blocking verify_password for use inside request handlers."""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Non-blocking get_password_hash for use inside request handlers."""
+    return await _run_in_hash_pool(get_password_hash, password)
+
+
+jwt_backend = create_backend(settings.JWT_BACKEND, settings.JWT_SECRET)
+
+# Verified token -> (claims, memo expiry). Tokens are immutable, so a hot
+# token only needs its signature checked once per TOKEN_MEMO_TTL_SECONDS.
+_token_memo: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+
+
+def create_token(user_key: str, claims: dict | None = None) -> str:
+    """Create a JWT token containing the user's Redis key UUID.
+
+    ``claims`` adds the stateless-auth claims (see ``stateless_auth``).
+    """
     payload = {
         "login_user_key": user_key,
         "iat": datetime.now(timezone.utc),
     }
-    return jwt.encode(payload, settings.JWT_SECRET, algorithm="HS256")
+    if claims:
+        payload.update(claims)
+    return jwt_backend.encode(payload)
 
 
-def parse_token(token: str) -> str | None:
-    """Extract login_user_key from JWT token. Returns None if invalid."""
+def decode_token(token: str) -> dict | None:
+    """Verify a JWT token and return its claims. Returns None if invalid.
+
+    The returned dict may be shared with other requests and must not be
+    modified.
+    """
+    now = time.monotonic()
+    memo = _token_memo.get(token)
+    if memo is not None:
+        if memo[1] > now:
+            _token_memo.move_to_end(token)
+            return memo[0]
+        del _token_memo[token]
+
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
-        return payload.get("login_user_key")
-    except JWTError:
+        claims = jwt_backend.decode(token)
+    except InvalidTokenError:
         return None
 
+    if settings.TOKEN_MEMO_MAX_SIZE > 0:
+        _token_memo[token] = (claims, now + settings.TOKEN_MEMO_TTL_SECONDS)
+        if len(_token_memo) > settings.TOKEN_MEMO_MAX_SIZE:
+            _token_memo.popitem(last=False)
+    return claims
+
+
+def parse_token(token: str) -> str | None:
+    """Extract login_user_key from JWT token. Returns None if invalid."""
+    payload = decode_token(token)
+    return payload.get("login_user_key") if payload else None
+
 
 def generate_uuid() -> str:
     return str(uuid.uuid4()).replace("-", "")
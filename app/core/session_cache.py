@@ -0,0 +1,224 @@
+"""Per-worker L1 cache for authenticated login sessions.
+
+Sits in front of the Redis ``login_tokens:*`` lookup in ``get_current_user``.
+Entries are bounded (LRU) and expire after a short TTL; logout, force-logout
+and password/role changes are propagated to every worker over Redis pub/sub.
+A role version bump drops the entries of that role's users (all entries for
+a menu change), which then re-resolve their permissions on reload.
+The same channel keeps the stateless-token state (``stateless_auth``) in sync.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+from app.core.constants import SESSION_INVALIDATE_CHANNEL
+from app.core.permission import PermissionIndex
+from app.core.stateless_auth import ALL_ROLES, stateless_auth
+
+logger = logging.getLogger(__name__)
+
+
+class CachedSession:
+    """A LoginUser dict together with its compiled permission index."""
+
+    __slots__ = ("user", "permissions", "expires_at")
+
+    def __init__(
+        self, user: dict, expires_at: float = 0.0, permissions: PermissionIndex | None = None,
+    ):
+        self.user = user
+        if permissions is None:
+            permissions = PermissionIndex(user.get("permissions", []))
+        self.permissions = permissions
+        self.expires_at = expires_at
+
+
+class SessionCache:
+    """Bounded, TTL-evicting LRU cache of sessions keyed by token key."""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, CachedSession] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    def get(self, token_key: str) -> CachedSession | None:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(token_key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[token_key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token_key)
+        self.hits += 1
+        return entry
+
+    def put(
+        self, token_key: str, user: dict, permissions: PermissionIndex | None = None,
+    ) -> CachedSession:
+        """Wrap ``user`` in a CachedSession and store it (if the cache is enabled).
+
+        ``permissions`` may pass an already compiled index for ``user``.
+        """
+        entry = CachedSession(user, time.monotonic() + self.ttl_seconds, permissions)
+        if not self.enabled:
+            return entry
+        self._entries[token_key] = entry
+        self._entries.move_to_end(token_key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def invalidate(self, token_key: str):
+        if self._entries.pop(token_key, None) is not None:
+            self.invalidations += 1
+
+    def invalidate_users(self, user_ids: set[int]):
+        """Drop every cached session belonging to the given users."""
+        stale = [k for k, e in self._entries.items() if e.user.get("user_id") in user_ids]
+        for k in stale:
+            del self._entries[k]
+        self.invalidations += len(stale)
+
+    def invalidate_roles(self, role_ids: set[int]):
+        """Drop every cached session holding one of the given roles."""
+        stale = [
+            k for k, e in self._entries.items()
+            if not role_ids.isdisjoint(e.user.get("role_ids", ()))
+        ]
+        for k in stale:
+            del self._entries[k]
+        self.invalidations += len(stale)
+
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "maxSize": self.max_size,
+            "ttlSeconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+session_cache = SessionCache(
+    max_size=settings.SESSION_CACHE_MAX_SIZE if settings.SESSION_CACHE_ENABLED else 0,
+    ttl_seconds=settings.SESSION_CACHE_TTL_SECONDS,
+)
+
+_listener_task: asyncio.Task | None = None
+
+
+def _apply_invalidation(message: dict):
+    stateless_auth.apply(message)
+    if message.get("all"):
+        session_cache.clear()
+        return
+    role_versions = message.get("role_versions")
+    if role_versions:
+        # Sessions re-resolve their permissions at the new versions on reload
+        if ALL_ROLES in role_versions:
+            session_cache.clear()
+            return
+        session_cache.invalidate_roles({int(rid) for rid in role_versions})
+    for token_key in message.get("token_keys", []):
+        session_cache.invalidate(token_key)
+    user_ids = message.get("user_ids")
+    if user_ids:
+        session_cache.invalidate_users(set(user_ids))
+
+
+async def publish_invalidation(
+    redis: aioredis.Redis,
+    *,
+    token_keys: list[str] | None = None,
+    user_ids: list[int] | None = None,
+    clear_all: bool = False,
+):
+    """Invalidate cached sessions in this worker and broadcast to the others.
+
+    Token keys passed here are treated as revoked; user ids as changed.
+    """
+    message = {
+        "token_keys": token_keys or [],
+        "user_ids": user_ids or [],
+        "all": clear_all,
+        "ts": time.time(),
+    }
+    _apply_invalidation(message)
+    try:
+        await stateless_auth.record(redis, message["token_keys"], message["user_ids"], message["ts"])
+        await redis.publish(SESSION_INVALIDATE_CHANNEL, json.dumps(message))
+    except Exception:
+        logger.exception("Failed to publish session invalidation")
+
+
+async def _listen(redis: aioredis.Redis):
+    while True:
+        pubsub = redis.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(SESSION_INVALIDATE_CHANNEL)
+            # Catch up on anything published before (re)subscribing
+            await stateless_auth.sync(redis)
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    _apply_invalidation(json.loads(message["data"]))
+                except (TypeError, ValueError):
+                    logger.warning("Ignoring malformed session invalidation: %r", message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Messages may have been missed while disconnected; drop everything.
+            logger.exception("Session invalidation listener disconnected, retrying")
+            stateless_auth.synced = False
+            session_cache.clear()
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.reset()
+
+
+def start_invalidation_listener(redis: aioredis.Redis):
+    """Start the background pub/sub subscriber for this worker."""
+    global _listener_task
+    needed = session_cache.enabled or settings.STATELESS_TOKEN_ENABLED
+    if needed and _listener_task is None:
+        _listener_task = asyncio.create_task(_listen(redis))
+
+
+async def stop_invalidation_listener():
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
+        stateless_auth.synced = False
@@ -0,0 +1,142 @@
+"""Compact binary encoding of login sessions stored in Redis.
+
+Sessions used to be written as ``LoginUser.model_dump_json()``; with a few
+hundred permission strings that is several KB per session, re-parsed on
+every L1 cache miss. Format 2 is a version byte followed by a msgpack array::
+
+    0x02 + msgpack([dict_epoch, [field values in SESSION_FIELDS order], [permission ids]])
+
+Field names are not stored, and permission strings are interned into the
+shared ``sys_perm_dict`` hash and referenced by small integer ids. The
+dictionary carries a random epoch that every session records: if the
+dictionary is ever lost and rebuilt, sessions referring to the old one fail
+to decode (the user logs in again) instead of resolving to the wrong
+permissions.
+
+Values starting with ``{`` are sessions written before format 2 and are
+still read as JSON, unless they predate ``role_ids`` / ``expire_time``:
+data scope, the router cache and TTL refresh rely on those, so such a
+session is treated as expired and the user logs in again.
+"""
+import json
+import secrets
+
+import msgpack
+import redis.asyncio as aioredis
+
+from app.core.constants import PERM_DICT_KEY
+from app.core.redis_scripts import INTERN_PERMISSIONS, get_script
+from app.schemas.auth import LoginUser
+
+SESSION_FORMAT_VERSION = 2
+_VERSION_PREFIX = bytes([SESSION_FORMAT_VERSION])
+
+# Positional layout of format 2. Append-only: new fields go at the end, and
+# sessions written before a field existed decode it with its model default.
+SESSION_FIELDS = (
+    "user_id", "dept_id", "user_name", "nick_name", "user_type", "email",
+    "phonenumber", "sex", "avatar", "status", "login_ip", "login_location",
+    "browser", "os", "login_time", "token_key", "expire_time", "roles",
+    "role_ids", "dept_name",
+)
+
+
+class PermissionDictionary:
+    """Process-local view of the shared permission-string dictionary."""
+
+    def __init__(self):
+        self.epoch: str | None = None
+        self._names: dict[int, str] = {}
+
+    async def intern(self, redis: aioredis.Redis, permissions: list[str]) -> tuple[str, list[int]]:
+        """Return ``(epoch, ids)`` for the given permissions, assigning new ids as needed."""
+        result = await get_script(redis, INTERN_PERMISSIONS)(
+            keys=[PERM_DICT_KEY], args=[secrets.token_hex(4), *permissions],
+        )
+        epoch = _text(result[0])
+        ids = [int(i) for i in result[1:]]
+        self._switch_epoch(epoch)
+        self._names.update(zip(ids, permissions))
+        return epoch, ids
+
+    async def resolve(self, redis: aioredis.Redis, epoch: str, ids: list[int]) -> list[str] | None:
+        """Map ids back to permission strings; None if the session's dictionary is gone."""
+        names = self._names
+        if epoch == self.epoch:
+            missing = [i for i in ids if i not in names]
+            if not missing:
+                return [names[i] for i in ids]
+        else:
+            missing = list(ids)
+
+        values = await redis.hmget(PERM_DICT_KEY, ["epoch", *(f"i:{i}" for i in missing)])
+        current = _text(values[0]) if values[0] is not None else None
+        self._switch_epoch(current)
+        if current != epoch:
+            return None
+        for i, value in zip(missing, values[1:]):
+            if value is None:
+                return None
+            names[i] = _text(value)
+        return [names[i] for i in ids]
+
+    def _switch_epoch(self, epoch: str | None):
+        if epoch != self.epoch:
+            self.epoch = epoch
+            self._names = {}
+
+
+permission_dictionary = PermissionDictionary()
+
+
+def _text(value: bytes | str) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _defaults() -> dict:
+    fields = LoginUser.model_fields
+    return {name: fields[name].get_default(call_default_factory=True) for name in SESSION_FIELDS}
+
+
+_FIELD_DEFAULTS = _defaults()
+
+# Fields a JSON (pre-format-2) session must have to still be usable
+_LEGACY_REQUIRED = ("role_ids", "expire_time")
+
+
+async def encode_session(redis: aioredis.Redis, login_user: LoginUser) -> bytes:
+    epoch, perm_ids = await permission_dictionary.intern(redis, login_user.permissions)
+    fields = [getattr(login_user, name) for name in SESSION_FIELDS]
+    return _VERSION_PREFIX + msgpack.packb([epoch, fields, perm_ids])
+
+
+async def decode_session(
+    redis: aioredis.Redis, value: bytes, *, with_permissions: bool = True,
+) -> dict | None:
+    """Decode a stored session into a LoginUser dict.
+
+    Returns None for sessions that can no longer be decoded. With
+    ``with_permissions=False`` the permission list is left empty, which
+    avoids dictionary lookups when only profile fields are needed.
+    """
+    if value[:1] == b"{":
+        user = json.loads(value)
+        if any(name not in user for name in _LEGACY_REQUIRED):
+            return None
+        return user
+    if value[:1] != _VERSION_PREFIX:
+        return None
+
+    epoch, fields, perm_ids = msgpack.unpackb(value[1:])
+    user = dict(zip(SESSION_FIELDS, fields))
+    for name in SESSION_FIELDS[len(fields):]:
+        default = _FIELD_DEFAULTS[name]
+        user[name] = list(default) if isinstance(default, list) else default
+    if with_permissions:
+        permissions = await permission_dictionary.resolve(redis, epoch, perm_ids)
+        if permissions is None:
+            return None
+        user["permissions"] = permissions
+    else:
+        user["permissions"] = []
+    return user
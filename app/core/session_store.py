@@ -0,0 +1,190 @@
+"""Redis persistence for login sessions (``login_tokens:<token_key>``).
+
+Besides the session values themselves, two index structures are maintained:
+
+* ``login_user_tokens:<user_id>`` -- set of a user's token keys, used to
+  revoke all of a user's sessions at once;
+* ``login_online`` -- sorted set of all token keys scored by session expiry
+  time, used to count and page online users without scanning the keyspace.
+  The score moves whenever the session TTL slides.
+
+Index entries of expired sessions are pruned lazily: the per-user set on the
+user's next login, the online index by score before it is counted or paged.
+
+Session values are binary (see ``session_codec``), so every function here
+takes the raw-bytes client from ``get_session_redis``.
+"""
+import time
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+from app.core.constants import LOGIN_ONLINE_KEY, LOGIN_TOKEN_KEY, LOGIN_USER_TOKENS_KEY
+from app.core.redis_scripts import (
+    GET_AND_REFRESH_SESSION, INDEX_SESSION, REVOKE_USER_SESSIONS, get_script,
+)
+from app.core.session_cache import publish_invalidation
+from app.core.session_codec import decode_session, encode_session
+from app.schemas.auth import LoginUser
+
+
+# Number of sessions fetched per ZREVRANGE/MGET batch when filtering the online list
+ONLINE_SCAN_CHUNK = 500
+
+
+def _session_ttl() -> int:
+    return settings.TOKEN_EXPIRE_MINUTES * 60
+
+
+def needs_refresh(user: dict) -> bool:
+    """True when the session's remaining lifetime has dropped into the refresh window."""
+    remaining = user.get("expire_time", 0) - time.time()
+    return remaining < settings.TOKEN_REFRESH_WINDOW_MINUTES * 60
+
+
+async def save_session(redis: aioredis.Redis, login_user: LoginUser):
+    """Write a new session with a full TTL and add it to the session index."""
+    ttl = _session_ttl()
+    login_user.expire_time = int(time.time()) + ttl
+    value = await encode_session(redis, login_user)
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.setex(
+            f"{LOGIN_TOKEN_KEY}{login_user.token_key}",
+            ttl,
+            value,
+        )
+        await get_script(redis, INDEX_SESSION)(
+            keys=[f"{LOGIN_USER_TOKENS_KEY}{login_user.user_id}", LOGIN_ONLINE_KEY],
+            args=[login_user.token_key, login_user.expire_time, LOGIN_TOKEN_KEY],
+            client=pipe,
+        )
+        await pipe.execute()
+
+
+async def load_session(redis: aioredis.Redis, token_key: str) -> dict | None:
+    """Load a session, sliding its TTL in the same round trip if it is close to expiry.
+
+    Redis is only written to when the remaining TTL is below
+    ``TOKEN_REFRESH_WINDOW_MINUTES``; the returned dict carries the
+    resulting ``expire_time`` so callers can skip Redis until then.
+    """
+    script = get_script(redis, GET_AND_REFRESH_SESSION)
+    ttl = _session_ttl()
+    result = await script(
+        keys=[f"{LOGIN_TOKEN_KEY}{token_key}", LOGIN_ONLINE_KEY],
+        args=[settings.TOKEN_REFRESH_WINDOW_MINUTES * 60, ttl, token_key, int(time.time()) + ttl],
+    )
+    if not result:
+        return None
+    value, ttl = result
+    user = await decode_session(redis, value)
+    if user is None:
+        return None
+    user["expire_time"] = int(time.time()) + int(ttl)
+    return user
+
+
+async def delete_session(redis: aioredis.Redis, token_key: str):
+    """Remove a session and evict it from every worker's L1 cache.
+
+    The per-user set entry is left for INDEX_SESSION / revocation to prune.
+    """
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.delete(f"{LOGIN_TOKEN_KEY}{token_key}")
+        pipe.zrem(LOGIN_ONLINE_KEY, token_key)
+        await pipe.execute()
+    await publish_invalidation(redis, token_keys=[token_key])
+
+
+async def revoke_user_sessions(redis: aioredis.Redis, user_ids: list[int]) -> list[str]:
+    """Delete every session of the given users in one round trip.
+
+    Returns the revoked token keys.
+    """
+    if not user_ids:
+        return []
+    script = get_script(redis, REVOKE_USER_SESSIONS)
+    revoked = await script(
+        keys=[f"{LOGIN_USER_TOKENS_KEY}{uid}" for uid in user_ids],
+        args=[LOGIN_TOKEN_KEY, LOGIN_ONLINE_KEY],
+    )
+    revoked = [token.decode() for token in revoked]
+    await publish_invalidation(redis, token_keys=revoked, user_ids=user_ids)
+    return revoked
+
+
+def _texts(values: list[bytes]) -> list[str]:
+    return [v.decode() for v in values]
+
+
+async def _fetch_sessions(
+    redis: aioredis.Redis, token_keys: list[str],
+) -> list[tuple[str, dict]]:
+    """MGET a batch of sessions, pruning index entries whose session has expired.
+
+    Only profile fields are decoded; permissions are left empty.
+    """
+    values = await redis.mget([f"{LOGIN_TOKEN_KEY}{t}" for t in token_keys])
+    sessions = []
+    stale = []
+    for token_key, value in zip(token_keys, values):
+        user = None
+        if value is not None:
+            user = await decode_session(redis, value, with_permissions=False)
+        if user is None:
+            stale.append(token_key)
+        else:
+            sessions.append((token_key, user))
+    if stale:
+        await redis.zrem(LOGIN_ONLINE_KEY, *stale)
+    return sessions
+
+
+async def page_online_sessions(
+    redis: aioredis.Redis,
+    *,
+    page_num: int = 1,
+    page_size: int = 10,
+    ipaddr: str | None = None,
+    user_name: str | None = None,
+) -> tuple[list[dict], int]:
+    """Page online sessions, most recently refreshed first. Returns (sessions, total).
+
+    Without filters only the requested page is fetched. With filters the
+    index is walked in ONLINE_SCAN_CHUNK batches and only the matching rows
+    that fall on the requested page are kept.
+    """
+    start = (page_num - 1) * page_size
+    # Drop sessions that expired on their own; nothing else removes them
+    await redis.zremrangebyscore(LOGIN_ONLINE_KEY, "-inf", time.time())
+
+    if not ipaddr and not user_name:
+        total = await redis.zcard(LOGIN_ONLINE_KEY)
+        token_keys = _texts(await redis.zrevrange(LOGIN_ONLINE_KEY, start, start + page_size - 1))
+        if not token_keys:
+            return [], total
+        sessions = await _fetch_sessions(redis, token_keys)
+        total -= len(token_keys) - len(sessions)
+        return [user for _, user in sessions], total
+
+    rows: list[dict] = []
+    matched = 0
+    offset = 0
+    while True:
+        token_keys = _texts(
+            await redis.zrevrange(LOGIN_ONLINE_KEY, offset, offset + ONLINE_SCAN_CHUNK - 1)
+        )
+        if not token_keys:
+            break
+        sessions = await _fetch_sessions(redis, token_keys)
+        # Pruned entries shift the remaining ones down by the same amount
+        offset += len(sessions)
+        for _, user in sessions:
+            if ipaddr and ipaddr not in user.get("login_ip", ""):
+                continue
+            if user_name and user_name not in user.get("user_name", ""):
+                continue
+            if start <= matched < start + page_size:
+                rows.append(user)
+            matched += 1
+    return rows, matched
@@ -0,0 +1,307 @@
+"""Opt-in stateless authentication from signed token claims.
+
+With ``STATELESS_TOKEN_ENABLED`` the login token also carries the user's id,
+dept, role ids/keys and the permission version of each of those roles. An L1
+cache miss in ``get_current_user`` can then be authenticated without reading
+the session from Redis, using only in-memory state that is loaded at startup
+and kept current over the session invalidation channel:
+
+* revoked token keys (logout, force logout, revoked users) -- rejected;
+* per-user cut-off times (password, role or profile changes) -- tokens
+  issued before the cut-off fall back to the Redis session;
+* per-role permission versions, plus an ``all`` version bumped by menu
+  changes -- tokens with stale versions fall back to the Redis session.
+
+The Redis session remains the source of truth: it is still written at login,
+its TTL is slid in the background at most once per refresh interval per
+worker, and claims are only honoured for TOKEN_EXPIRE_MINUTES after login.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+from app.core.constants import (
+    LOGIN_ONLINE_KEY, LOGIN_TOKEN_KEY, REVOKED_TOKENS_KEY, REVOKED_USERS_KEY, ROLE_PERMS_KEY,
+    ROLE_VERSIONS_KEY, SESSION_INVALIDATE_CHANNEL, SUPER_ADMIN,
+)
+from app.core.exceptions import AuthException
+from app.core.permission import ALL_PERMISSION, PermissionIndex
+from app.schemas.auth import LoginUser
+
+logger = logging.getLogger(__name__)
+
+ALL_ROLES = "all"
+
+
+def role_perms_key(role_id: int, all_version: int, version: int) -> str:
+    """Redis key of a role's permission set at the given ``role_versions``."""
+    return f"{ROLE_PERMS_KEY}{role_id}:{all_version}.{version}"
+
+# Compiled permission sets kept per (role ids, versions) combination
+_MAX_INDEXES = 1024
+# Revoked-token entries are pruned at most this often (seconds)
+_PRUNE_INTERVAL = 60
+
+
+def _session_ttl() -> int:
+    return settings.TOKEN_EXPIRE_MINUTES * 60
+
+
+def _text(value: bytes | str) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class StatelessAuth:
+
+    def __init__(self):
+        self.revoked_tokens: dict[str, float] = {}  # token key -> when the entry can be dropped
+        self.user_cutoffs: dict[int, float] = {}  # user id -> last invalidation time
+        self.role_versions: dict[str, int] = {}  # role id (str) or "all" -> version
+        # True while role_versions is kept current by the invalidation listener
+        self.synced = False
+        self._role_perms: dict[tuple[int, int, int], list[str]] = {}
+        self._indexes: OrderedDict[tuple, tuple[list[str], PermissionIndex]] = OrderedDict()
+        self._next_touch: OrderedDict[str, float] = OrderedDict()
+        self._tasks: set[asyncio.Task] = set()
+        self._pruned_at = 0.0
+        self.hits = 0
+        self.fallbacks = 0
+
+    # ---- Synchronisation -------------------------------------------------
+
+    async def sync(self, redis: aioredis.Redis):
+        """Reload revocations and role versions from Redis."""
+        now = time.time()
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.zrangebyscore(REVOKED_TOKENS_KEY, now, "+inf", withscores=True)
+            pipe.zrangebyscore(REVOKED_USERS_KEY, now - _session_ttl(), "+inf", withscores=True)
+            pipe.hgetall(ROLE_VERSIONS_KEY)
+            tokens, users, versions = await pipe.execute()
+        self.revoked_tokens = {_text(t): score for t, score in tokens}
+        self.user_cutoffs = {int(u): score for u, score in users}
+        self._set_role_versions({_text(k): int(v) for k, v in versions.items()}, replace=True)
+        self.synced = True
+
+    def apply(self, message: dict):
+        """Apply an invalidation message published by any worker."""
+        ts = message.get("ts") or time.time()
+        for token_key in message.get("token_keys", []):
+            self.revoked_tokens[token_key] = ts + _session_ttl()
+        for user_id in message.get("user_ids", []):
+            self.user_cutoffs[user_id] = max(ts, self.user_cutoffs.get(user_id, 0))
+        if message.get("role_versions"):
+            self._set_role_versions(message["role_versions"])
+        self._prune()
+
+    async def record(
+        self, redis: aioredis.Redis, token_keys: list[str], user_ids: list[int], ts: float,
+    ):
+        """Persist revocations so that workers started later see them too."""
+        if not token_keys and not user_ids:
+            return
+        ttl = _session_ttl()
+        async with redis.pipeline(transaction=False) as pipe:
+            if token_keys:
+                pipe.zadd(REVOKED_TOKENS_KEY, {t: ts + ttl for t in token_keys})
+                pipe.zremrangebyscore(REVOKED_TOKENS_KEY, "-inf", ts)
+            if user_ids:
+                pipe.zadd(REVOKED_USERS_KEY, {str(u): ts for u in user_ids})
+                pipe.zremrangebyscore(REVOKED_USERS_KEY, "-inf", ts - ttl)
+            await pipe.execute()
+
+    async def bump_role_versions(self, redis: aioredis.Redis, role_ids: list[int] | None):
+        """Mark the permissions of the given roles (or of every role) as changed."""
+        fields = [str(rid) for rid in role_ids] if role_ids is not None else [ALL_ROLES]
+        if not fields:
+            return
+        async with redis.pipeline(transaction=False) as pipe:
+            for field in fields:
+                pipe.hincrby(ROLE_VERSIONS_KEY, field, 1)
+            versions = dict(zip(fields, await pipe.execute()))
+        self._set_role_versions(versions)
+        try:
+            await redis.publish(SESSION_INVALIDATE_CHANNEL, json.dumps({"role_versions": versions}))
+        except Exception:
+            logger.exception("Failed to publish role version change")
+
+    def _set_role_versions(self, versions: dict[str, int], replace: bool = False):
+        if replace:
+            self.role_versions = dict(versions)
+        else:
+            for field, version in versions.items():
+                # Messages may arrive out of order; versions only move forward
+                if version > self.role_versions.get(field, 0):
+                    self.role_versions[field] = version
+        self._role_perms.clear()
+        self._indexes.clear()
+
+    def _prune(self):
+        now = time.time()
+        if now - self._pruned_at < _PRUNE_INTERVAL:
+            return
+        self._pruned_at = now
+        self.revoked_tokens = {t: exp for t, exp in self.revoked_tokens.items() if exp > now}
+        horizon = now - _session_ttl()
+        self.user_cutoffs = {u: ts for u, ts in self.user_cutoffs.items() if ts > horizon}
+
+    # ---- Token claims ----------------------------------------------------
+
+    def _versions(self, role_ids: list[int]) -> list[int]:
+        get = self.role_versions.get
+        return [get(ALL_ROLES, 0), *(get(str(rid), 0) for rid in role_ids)]
+
+    async def build_claims(self, redis: aioredis.Redis, login_user: LoginUser) -> dict:
+        """Claims embedded in the token at login; versions are read from Redis."""
+        fields = [ALL_ROLES, *(str(rid) for rid in login_user.role_ids)]
+        versions = await redis.hmget(ROLE_VERSIONS_KEY, fields)
+        return {
+            "uid": login_user.user_id,
+            "did": login_user.dept_id,
+            "uname": login_user.user_name,
+            "dname": login_user.dept_name,
+            "rids": login_user.role_ids,
+            "rkeys": login_user.roles,
+            "pv": [int(v) if v is not None else 0 for v in versions],
+            # Not "exp": the token itself stays valid for as long as the session does
+            "sexp": int(time.time()) + _session_ttl(),
+        }
+
+    async def authenticate(
+        self, redis: aioredis.Redis, claims: dict,
+    ) -> tuple[dict, PermissionIndex] | None:
+        """Build the LoginUser dict from token claims.
+
+        Returns None when the claims cannot be trusted on their own and the
+        Redis session must be consulted instead.
+        """
+        token_key = claims["login_user_key"]
+        if token_key in self.revoked_tokens:
+            raise AuthException("登录已过期，请重新登录")
+        now = time.time()
+        role_ids = claims.get("rids", [])
+        if (
+            claims.get("sexp", 0) <= now
+            or self.user_cutoffs.get(claims["uid"], 0) >= claims.get("iat", 0)
+            or claims.get("pv") != self._versions(role_ids)
+        ):
+            self.fallbacks += 1
+            return None
+
+        resolved = await self._permissions(redis, claims["uname"], role_ids, claims["pv"])
+        if resolved is None:
+            self.fallbacks += 1
+            return None
+        permissions, index = resolved
+        self.hits += 1
+        self._touch(redis, token_key)
+        user = {
+            "user_id": claims["uid"],
+            "dept_id": claims.get("did"),
+            "user_name": claims["uname"],
+            "dept_name": claims.get("dname", ""),
+            "roles": claims.get("rkeys", []),
+            "role_ids": role_ids,
+            "permissions": permissions,
+            "token_key": token_key,
+            "expire_time": int(now) + _session_ttl(),
+        }
+        return user, index
+
+    async def role_permissions(
+        self, redis: aioredis.Redis, user_name: str, role_ids: list[int],
+    ) -> tuple[list[str], PermissionIndex] | None:
+        """Permissions of ``role_ids`` at the current role versions.
+
+        None if a role's set is not cached in Redis at those versions.
+        """
+        if self.synced:
+            versions = self._versions(role_ids)
+        else:
+            fields = [ALL_ROLES, *(str(rid) for rid in role_ids)]
+            versions = [int(v or 0) for v in await redis.hmget(ROLE_VERSIONS_KEY, fields)]
+        return await self._permissions(redis, user_name, role_ids, versions)
+
+    async def _permissions(
+        self, redis: aioredis.Redis, user_name: str, role_ids: list[int], versions: list[int],
+    ) -> tuple[list[str], PermissionIndex] | None:
+        if user_name == SUPER_ADMIN:
+            role_ids, versions = [], [0]
+        key = (tuple(role_ids), tuple(versions))
+        cached = self._indexes.get(key)
+        if cached is not None:
+            self._indexes.move_to_end(key)
+            return cached
+
+        all_version = versions[0]
+        perm_keys = [(rid, all_version, v) for rid, v in zip(role_ids, versions[1:])]
+        missing = [k for k in perm_keys if k not in self._role_perms]
+        if missing:
+            values = await redis.mget([role_perms_key(*k) for k in missing])
+            if any(v is None for v in values):
+                # Not cached in Redis; the session path has the permissions
+                return None
+            for k, value in zip(missing, values):
+                self._role_perms[k] = json.loads(value)
+
+        if user_name == SUPER_ADMIN:
+            permissions = [ALL_PERMISSION]
+        else:
+            merged: set[str] = set()
+            for k in perm_keys:
+                merged.update(self._role_perms[k])
+            permissions = sorted(merged)
+        entry = (permissions, PermissionIndex(permissions))
+        self._indexes[key] = entry
+        if len(self._indexes) > _MAX_INDEXES:
+            self._indexes.popitem(last=False)
+        return entry
+
+    # ---- Session TTL -----------------------------------------------------
+
+    def _touch(self, redis: aioredis.Redis, token_key: str):
+        """Slide the Redis session TTL in the background, at most once per interval."""
+        now = time.monotonic()
+        due = self._next_touch.get(token_key)
+        if due is not None and due > now:
+            return
+        interval = (settings.TOKEN_EXPIRE_MINUTES - settings.TOKEN_REFRESH_WINDOW_MINUTES) * 60
+        self._next_touch[token_key] = now + max(interval, 1)
+        self._next_touch.move_to_end(token_key)
+        while len(self._next_touch) > max(settings.SESSION_CACHE_MAX_SIZE, 1):
+            self._next_touch.popitem(last=False)
+        task = asyncio.create_task(self._refresh_session(redis, token_key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh_session(self, redis: aioredis.Redis, token_key: str):
+        ttl = _session_ttl()
+        try:
+            alive = await redis.expire(f"{LOGIN_TOKEN_KEY}{token_key}", ttl)
+            if alive:
+                # Keep the online index score (the expiry time) in step
+                await redis.zadd(LOGIN_ONLINE_KEY, {token_key: int(time.time()) + ttl}, xx=True)
+        except Exception:
+            logger.warning("Failed to refresh session TTL for %s", token_key, exc_info=True)
+            self._next_touch.pop(token_key, None)
+            return
+        if not alive:
+            # Session expired or was deleted without a broadcast reaching us
+            self.revoked_tokens[token_key] = time.time() + _session_ttl()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.STATELESS_TOKEN_ENABLED,
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+            "revokedTokens": len(self.revoked_tokens),
+            "userCutoffs": len(self.user_cutoffs),
+            "roleVersions": len(self.role_versions),
+        }
+
+
+stateless_auth = StatelessAuth()
@@ -1,15 +1,30 @@
-from typing import Any, Generic, Sequence, Type, TypeVar
+import base64
+import hashlib
+import json
+from datetime import date, datetime
+from typing import Any, Collection, Generic, Sequence, Type, TypeVar
 
 from pydantic import BaseModel
-from sqlalchemy import Select, func, select, delete
+from sqlalchemy import Column, Select, and_, delete, func, insert, or_, select, text, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 
+from app.config import settings
+from app.core.constants import PAGE_TOTAL_KEY, CountMode, DelFlag
+from app.core.exceptions import ServiceException
+from app.core.redis import get_redis
+from app.db.session import run_after_commit
 from app.models.base import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+_LOADERS = {"joined": joinedload, "selectin": selectinload}
+
+# Below this many rows (by InnoDB's estimate) an "estimated" list is counted exactly
+_ESTIMATE_MIN_ROWS = 100_000
+
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """Generic CRUD base class with pagination support."""
@@ -17,12 +32,29 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         self.model = model
 
-    async def get(self, db: AsyncSession, id: Any) -> ModelType | None:
+    # Relationships to eager-load per LoadProfile, as {attribute: "joined" | "selectin"}.
+    # Relationships are lazy="raise_on_sql", so whatever a caller reads must be
+    # loaded by the profile it asks for.
+    load_profiles: dict[str, dict[str, str]] = {}
+
+    def load_options(self, load: str | None) -> tuple:
+        """Loader options of profile ``load`` (none for None)."""
+        if load is None:
+            return ()
+        return tuple(
+            _LOADERS[strategy](getattr(self.model, attr))
+            for attr, strategy in self.load_profiles[load].items()
+        )
+
+    async def get(self, db: AsyncSession, id: Any, *, load: str | None = None) -> ModelType | None:
         result = await db.execute(
-            select(self.model).where(self._pk_column() == id)
+            select(self.model).where(self._pk_column() == id).options(*self.load_options(load))
         )
         return result.scalar_one_or_none()
 
+    # How get_list obtains totals (CountMode); subclasses and callers may override
+    count_mode: str = CountMode.EXACT
+
     async def get_list(
         self,
         db: AsyncSession,
@@ -30,24 +62,151 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         query: Select | None = None,
         page_num: int = 1,
         page_size: int = 10,
+        count_mode: str | None = None,
+        distinct: bool = False,
     ) -> tuple[Sequence[ModelType], int]:
-        """Get paginated list. Returns (items, total_count)."""
+        """Get paginated list. Returns (items, total_count).
+
+        ``count_mode`` defaults to the class's ``count_mode``; see CountMode.
+        Pass ``distinct=True`` for SELECT DISTINCT queries: a window count runs
+        before DISTINCT removes duplicates, so they are counted separately.
+        """
         if query is None:
             query = select(self.model)
+        mode = count_mode or self.count_mode
+        offset = (page_num - 1) * page_size
 
-        # Count total
-        count_query = select(func.count()).select_from(query.subquery())
-        total_result = await db.execute(count_query)
-        total = total_result.scalar() or 0
+        if mode == CountMode.WINDOW and settings.PAGINATION_WINDOW_COUNT and not distinct:
+            # The window runs over the whole filtered result before LIMIT
+            windowed = query.add_columns(func.count().over()).offset(offset).limit(page_size)
+            rows = (await db.execute(windowed)).all()
+            if rows:
+                return [row[0] for row in rows], rows[0][1]
+            if offset == 0:
+                return [], 0
+            # Past the last page: the total still has to be counted
+            return [], await self._count(db, query)
 
-        # Paginate
-        offset = (page_num - 1) * page_size
-        paginated = query.offset(offset).limit(page_size)
-        result = await db.execute(paginated)
+        total = await self._total(db, query, mode)
+        result = await db.execute(query.offset(offset).limit(page_size))
         items = result.scalars().all()
 
         return items, total
 
+    async def _count(self, db: AsyncSession, query: Select) -> int:
+        count_query = select(func.count()).select_from(query.order_by(None).subquery())
+        total_result = await db.execute(count_query)
+        return total_result.scalar() or 0
+
+    async def _total(self, db: AsyncSession, query: Select, mode: str) -> int:
+        if mode not in (CountMode.CACHED, CountMode.ESTIMATED):
+            return await self._count(db, query)
+
+        # The compiled SQL plus its bound values identifies the filter set
+        compiled = query.order_by(None).compile()
+        digest = hashlib.sha1(str(compiled).encode())
+        digest.update(json.dumps(compiled.params, sort_keys=True, default=str).encode())
+        key = f"{PAGE_TOTAL_KEY}{self.model.__tablename__}:{digest.hexdigest()}"
+        redis = get_redis()
+        cached = await redis.get(key)
+        if cached is not None:
+            return int(cached)
+
+        total = None
+        if mode == CountMode.ESTIMATED:
+            total = await self._estimated_count(db, query)
+        if total is None:
+            total = await self._count(db, query)
+        await redis.setex(key, settings.PAGINATION_TOTAL_CACHE_SECONDS, total)
+        return total
+
+    def forget_totals(self, db: AsyncSession):
+        """Drop this table's cached list totals once ``db`` commits.
+
+        Called by writes that remove rows, so a "cached"/"estimated" list does
+        not keep reporting them; inserts are left to the short cache expiry.
+        """
+        if self.count_mode in (CountMode.CACHED, CountMode.ESTIMATED):
+            run_after_commit(db, self._drop_totals)
+
+    async def _drop_totals(self):
+        redis = get_redis()
+        keys = [
+            key async for key in redis.scan_iter(
+                match=f"{PAGE_TOTAL_KEY}{self.model.__tablename__}:*", count=500,
+            )
+        ]
+        if keys:
+            await redis.delete(*keys)
+
+    async def _estimated_count(self, db: AsyncSession, query: Select) -> int | None:
+        """InnoDB's row estimate for an unfiltered query on this table, or None."""
+        froms = query.get_final_froms()
+        if (
+            query.whereclause is not None
+            or len(froms) != 1
+            or froms[0] is not self.model.__table__
+            or db.get_bind().dialect.name != "mysql"
+        ):
+            return None
+        result = await db.execute(
+            text(
+                "SELECT table_rows FROM information_schema.tables "
+                "WHERE table_schema = DATABASE() AND table_name = :name"
+            ),
+            {"name": self.model.__tablename__},
+        )
+        estimate = result.scalar()
+        # The estimate can be off by tens of percent; small tables are cheap to count exactly
+        if estimate is None or estimate < _ESTIMATE_MIN_ROWS:
+            return None
+        return int(estimate)
+
+    async def get_keyset_list(
+        self,
+        db: AsyncSession,
+        *,
+        query: Select | None = None,
+        cursor: str | None = None,
+        page_size: int = 10,
+        sort_column=None,
+        descending: bool = True,
+    ) -> tuple[Sequence[ModelType], str | None]:
+        """Keyset (seek) pagination. Returns (items, next_cursor).
+
+        Rows are ordered by ``sort_column`` (if given) then the primary key,
+        replacing any ordering on ``query``. ``cursor`` is the next_cursor of
+        the previous page (None or "" for the first page); each page is an
+        index range scan from the cursor, however deep it is. No total is
+        counted. next_cursor is None on the last page.
+
+        ``sort_column`` must be NOT NULL: a NULL cannot be compared against, so
+        a page ending on one would have no way to continue.
+        """
+        if sort_column is not None and sort_column.nullable:
+            raise ValueError(f"keyset pagination needs a NOT NULL sort column, got {sort_column}")
+        if query is None:
+            query = select(self.model)
+        columns = [self._pk_column()] if sort_column is None else [sort_column, self._pk_column()]
+
+        if cursor:
+            values = _decode_cursor(cursor, columns)
+            # Expanded (a < x OR a = x AND b < y) form; MySQL uses the index for it
+            conditions = []
+            for i, column in enumerate(columns):
+                beyond = column < values[i] if descending else column > values[i]
+                conditions.append(and_(*(c == v for c, v in zip(columns[:i], values)), beyond))
+            query = query.where(or_(*conditions))
+
+        order = [c.desc() if descending else c.asc() for c in columns]
+        result = await db.execute(query.order_by(None).order_by(*order).limit(page_size + 1))
+        items = result.scalars().all()
+        if len(items) <= page_size:
+            return items, None
+        items = items[:page_size]
+        last = [getattr(items[-1], c.key) for c in columns]
+        return items, _encode_cursor(last)
+
     async def create(self, db: AsyncSession, obj_in: CreateSchemaType, **extra) -> ModelType:
         data = obj_in.model_dump(exclude_unset=True)
         data.update(extra)
@@ -72,13 +231,150 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         await db.refresh(db_obj)
         return db_obj
 
+    async def get_by_ids(self, db: AsyncSession, ids: list[Any]) -> Sequence[ModelType]:
+        """Load multiple records by primary key IDs in one query."""
+        if not ids:
+            return []
+        result = await db.execute(select(self.model).where(self._pk_column().in_(ids)))
+        return result.scalars().all()
+
     async def delete_by_ids(self, db: AsyncSession, ids: list[Any]) -> int:
         """Delete multiple records by primary key IDs."""
         stmt = delete(self.model).where(self._pk_column().in_(ids))
         result = await db.execute(stmt)
+        if result.rowcount:
+            self.forget_totals(db)
+        return result.rowcount
+
+    async def bulk_soft_delete(
+        self,
+        db: AsyncSession,
+        ids: list[Any],
+        *,
+        protected_ids: Collection[Any] = (),
+        relations: Collection[Column] = (),
+        update_by: str | None = None,
+    ) -> int:
+        """Set del_flag to '2' on ``ids`` except ``protected_ids`` with one UPDATE.
+
+        ``relations`` are association-table columns referencing this model's
+        key; their rows for the same ids are removed (one DELETE per column).
+        Returns the number of records newly marked deleted.
+        """
+        ids = [i for i in ids if i not in protected_ids]
+        if not ids:
+            return 0
+        values = {"del_flag": DelFlag.DELETED, "update_time": datetime.now()}
+        if update_by is not None:
+            values["update_by"] = update_by
+        result = await db.execute(
+            update(self.model)
+            .where(self._pk_column().in_(ids), self.model.del_flag == DelFlag.EXIST)
+            .values(**values)
+        )
+        await self.delete_relations(db, ids, *relations)
+        if result.rowcount:
+            self.forget_totals(db)
+        return result.rowcount
+
+    async def bulk_update_status(
+        self,
+        db: AsyncSession,
+        ids: list[Any],
+        status: str,
+        *,
+        protected_ids: Collection[Any] = (),
+        update_by: str | None = None,
+    ) -> int:
+        """Set ``status`` on ``ids`` except ``protected_ids`` with one UPDATE. Returns rows changed.
+
+        Soft-deleted records are left alone.
+        """
+        ids = [i for i in ids if i not in protected_ids]
+        if not ids:
+            return 0
+        values = {"status": status, "update_time": datetime.now()}
+        if update_by is not None:
+            values["update_by"] = update_by
+        stmt = update(self.model).where(self._pk_column().in_(ids))
+        if hasattr(self.model, "del_flag"):
+            stmt = stmt.where(self.model.del_flag == DelFlag.EXIST)
+        result = await db.execute(stmt.values(**values))
         return result.rowcount
 
+    @staticmethod
+    async def delete_relations(db: AsyncSession, ids: list[Any], *columns: Column) -> int:
+        """Delete association rows whose ``column`` is in ``ids``, one DELETE per column.
+
+        Returns the total number of rows removed.
+        """
+        if not ids:
+            return 0
+        removed = 0
+        for column in columns:
+            result = await db.execute(delete(column.table).where(column.in_(ids)))
+            removed += result.rowcount
+        return removed
+
+    @staticmethod
+    async def sync_relation(
+        db: AsyncSession,
+        owner_column: Column,
+        owner_id: Any,
+        target_column: Column,
+        target_ids: Collection[Any],
+    ) -> bool:
+        """Make ``owner_id``'s association rows match ``target_ids``.
+
+        Reads the current rows (locking them), then applies only the delta:
+        one DELETE for removed targets and one INSERT for added ones, each
+        skipped when empty. Returns True if anything changed.
+        """
+        table = owner_column.table
+        result = await db.execute(
+            select(target_column).where(owner_column == owner_id).with_for_update()
+        )
+        current = set(result.scalars().all())
+        wanted = set(target_ids)
+        removed = current - wanted
+        added = wanted - current
+        if removed:
+            await db.execute(
+                delete(table).where(owner_column == owner_id, target_column.in_(removed))
+            )
+        if added:
+            await db.execute(
+                insert(table),
+                [{owner_column.name: owner_id, target_column.name: t} for t in sorted(added)],
+            )
+        return bool(removed or added)
+
     def _pk_column(self):
         """Get the primary key column of the model."""
         pk_columns = self.model.__table__.primary_key.columns
         return list(pk_columns)[0]
+
+
+def _encode_cursor(values: list) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, columns: list) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        decoded = []
+        for column, value in zip(columns, values):
+            python_type = column.type.python_type
+            if value is None or isinstance(value, bool):
+                raise ValueError(cursor)
+            if python_type in (date, datetime):
+                value = python_type.fromisoformat(value)
+            elif not isinstance(value, python_type):
+                raise ValueError(cursor)
+            decoded.append(value)
+        return decoded
+    except (ValueError, TypeError, NotImplementedError):
+        raise ServiceException("分页游标无效") from None
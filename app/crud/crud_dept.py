@@ -1,33 +1,19 @@
 from datetime import datetime
-from typing import Sequence
 
-from sqlalchemy import select
+from sqlalchemy import delete, func, insert, literal, select, union_all, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.constants import DEPT_VERSION_KEY
+from app.core.redis import get_redis
 from app.crud.base import CRUDBase
+from app.db.session import run_after_commit
+from app.models.associations import sys_dept_closure
 from app.models.sys_dept import SysDept
 from app.schemas.sys_dept import DeptCreate, DeptUpdate
 
 
 class CRUDDept(CRUDBase[SysDept, DeptCreate, DeptUpdate]):
 
-    async def get_all_depts(
-        self,
-        db: AsyncSession,
-        *,
-        dept_name: str | None = None,
-        status: str | None = None,
-    ) -> Sequence[SysDept]:
-        """Get all departments (flat list, frontend builds tree)."""
-        query = select(SysDept).where(SysDept.del_flag == "0")
-        if dept_name:
-            query = query.where(SysDept.dept_name.like(f"%{dept_name}%"))
-        if status:
-            query = query.where(SysDept.status == status)
-        query = query.order_by(SysDept.parent_id, SysDept.order_num)
-        result = await db.execute(query)
-        return result.scalars().all()
-
     async def create_dept(self, db: AsyncSession, dept_in: DeptCreate, create_by: str) -> SysDept:
         # Build ancestors
         ancestors = ""
@@ -47,13 +33,19 @@ class CRUDDept(CRUDBase[SysDept, DeptCreate, DeptUpdate]):
         )
         db.add(dept)
         await db.flush()
+        await self._link_closure(db, dept.dept_id, dept_in.parent_id)
+        run_after_commit(db, _bump_dept_version)
         await db.refresh(dept)
         return dept
 
-    async def update_dept(self, db: AsyncSession, dept_in: DeptUpdate, update_by: str) -> SysDept | None:
+    async def update_dept(
+        self, db: AsyncSession, dept_in: DeptUpdate, update_by: str,
+    ) -> tuple[SysDept | None, int]:
+        """Update a department; returns it and the number of descendants re-parented with it."""
         dept = await self.get(db, dept_in.dept_id)
         if not dept:
-            return None
+            return None, 0
+        moved = 0
 
         old_ancestors = dept.ancestors
         new_ancestors = old_ancestors
@@ -69,19 +61,16 @@ class CRUDDept(CRUDBase[SysDept, DeptCreate, DeptUpdate]):
                 new_ancestors = f"0,{update_data['parent_id']}"
             update_data["ancestors"] = new_ancestors
 
-            # Update all children's ancestors
-            children = await db.execute(
-                select(SysDept).where(SysDept.ancestors.like(f"%,{dept.dept_id},%") | SysDept.ancestors.like(f"%,{dept.dept_id}"))
-            )
-            for child in children.scalars().all():
-                child.ancestors = child.ancestors.replace(old_ancestors, new_ancestors, 1)
+            await self._move_closure(db, dept.dept_id, update_data["parent_id"])
+            moved = await self._rewrite_ancestors(db, dept.dept_id, old_ancestors, new_ancestors)
 
+        run_after_commit(db, _bump_dept_version)
         update_data["update_by"] = update_by
         update_data["update_time"] = datetime.now()
         for k, v in update_data.items():
             setattr(dept, k, v)
         await db.flush()
-        return dept
+        return dept, moved
 
     async def soft_delete(self, db: AsyncSession, dept_id: int) -> bool:
         dept = await self.get(db, dept_id)
@@ -94,19 +83,85 @@ class CRUDDept(CRUDBase[SysDept, DeptCreate, DeptUpdate]):
         if result.scalars().first():
             return False  # Has children
         dept.del_flag = "2"
+        run_after_commit(db, _bump_dept_version)
+        await db.execute(
+            delete(sys_dept_closure).where(
+                (sys_dept_closure.c.descendant == dept_id) | (sys_dept_closure.c.ancestor == dept_id)
+            )
+        )
         await db.flush()
         return True
 
-    async def get_exclude_child(self, db: AsyncSession, dept_id: int) -> Sequence[SysDept]:
-        """Get all depts excluding the given dept and its children."""
-        query = select(SysDept).where(
-            SysDept.del_flag == "0",
-            SysDept.dept_id != dept_id,
-            ~SysDept.ancestors.like(f"%,{dept_id},%"),
-            ~SysDept.ancestors.like(f"%,{dept_id}"),
-        ).order_by(SysDept.parent_id, SysDept.order_num)
-        result = await db.execute(query)
-        return result.scalars().all()
+    async def is_in_subtree(self, db: AsyncSession, dept_id: int, root_id: int) -> bool:
+        """True if ``dept_id`` is ``root_id`` or one of its descendants."""
+        result = await db.execute(
+            select(sys_dept_closure.c.depth).where(
+                sys_dept_closure.c.ancestor == root_id,
+                sys_dept_closure.c.descendant == dept_id,
+            )
+        )
+        return result.first() is not None
+
+    async def _link_closure(self, db: AsyncSession, dept_id: int, parent_id: int):
+        """Add closure rows for a new leaf department: its parent's paths plus itself."""
+        c = sys_dept_closure.c
+        paths = select(c.ancestor, literal(dept_id), c.depth + 1).where(c.descendant == parent_id)
+        itself = select(literal(dept_id), literal(dept_id), literal(0))
+        await db.execute(
+            insert(sys_dept_closure).from_select(
+                ["ancestor", "descendant", "depth"], union_all(paths, itself),
+            )
+        )
+
+    async def _rewrite_ancestors(
+        self, db: AsyncSession, dept_id: int, old_ancestors: str, new_ancestors: str,
+    ) -> int:
+        """Swap the ``old_ancestors`` prefix for ``new_ancestors`` on all descendants in one UPDATE.
+
+        Runs after ``_move_closure``; the paths inside the subtree are unchanged
+        by a move, so the closure still selects exactly the moved descendants.
+        """
+        c = sys_dept_closure.c
+        result = await db.execute(
+            update(SysDept)
+            .where(SysDept.dept_id.in_(
+                select(c.descendant).where(c.ancestor == dept_id, c.depth > 0)
+            ))
+            .values(ancestors=func.concat(
+                new_ancestors, func.substring(SysDept.ancestors, len(old_ancestors) + 1),
+            ))
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    async def _move_closure(self, db: AsyncSession, dept_id: int, parent_id: int) -> list[int]:
+        """Re-attach the subtree rooted at ``dept_id`` under ``parent_id``.
+
+        Returns the ids of the moved subtree (including ``dept_id``).
+        """
+        c = sys_dept_closure.c
+        result = await db.execute(select(c.descendant).where(c.ancestor == dept_id))
+        subtree = list(result.scalars().all())
+        # Drop paths from the old ancestors into the subtree; paths inside it stay
+        await db.execute(
+            delete(sys_dept_closure).where(c.descendant.in_(subtree), c.ancestor.not_in(subtree))
+        )
+        above = sys_dept_closure.alias("above")
+        below = sys_dept_closure.alias("below")
+        await db.execute(
+            insert(sys_dept_closure).from_select(
+                ["ancestor", "descendant", "depth"],
+                select(above.c.ancestor, below.c.descendant, above.c.depth + below.c.depth + 1)
+                .select_from(above.join(below, below.c.ancestor == dept_id))
+                .where(above.c.descendant == parent_id),
+            )
+        )
+        return subtree
+
+
+async def _bump_dept_version():
+    """Retire every cache derived from the department tree (data scopes)."""
+    await get_redis().incr(DEPT_VERSION_KEY)
 
 
 crud_dept = CRUDDept(SysDept)
@@ -1,26 +1,27 @@
 from typing import Sequence
 
-from sqlalchemy import delete, select
+from sqlalchemy import Select, delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.constants import CountMode
 from app.crud.base import CRUDBase
 from app.models.sys_job_log import SysJobLog
 
 
 class CRUDJobLog(CRUDBase[SysJobLog, None, None]):
 
-    async def get_job_log_list(
+    # Log tables grow without bound; unfiltered totals come from table statistics
+    count_mode = CountMode.ESTIMATED
+
+    def _list_query(
         self,
-        db: AsyncSession,
         *,
-        page_num: int = 1,
-        page_size: int = 10,
         job_name: str | None = None,
         job_group: str | None = None,
         status: str | None = None,
         begin_time: str | None = None,
         end_time: str | None = None,
-    ) -> tuple[Sequence[SysJobLog], int]:
+    ) -> Select:
         query = select(SysJobLog)
         if job_name:
             query = query.where(SysJobLog.job_name.like(f"%{job_name}%"))
@@ -33,10 +34,42 @@ class CRUDJobLog(CRUDBase[SysJobLog, None, None]):
         if end_time:
             query = query.where(SysJobLog.create_time <= end_time)
         query = query.order_by(SysJobLog.job_log_id.desc())
+        return query
+
+    async def get_job_log_list(
+        self,
+        db: AsyncSession,
+        *,
+        page_num: int = 1,
+        page_size: int = 10,
+        job_name: str | None = None,
+        job_group: str | None = None,
+        status: str | None = None,
+        begin_time: str | None = None,
+        end_time: str | None = None,
+    ) -> tuple[Sequence[SysJobLog], int]:
+        query = self._list_query(
+            job_name=job_name, job_group=job_group, status=status, begin_time=begin_time,
+            end_time=end_time,
+        )
         return await self.get_list(db, query=query, page_num=page_num, page_size=page_size)
 
+    async def get_job_log_page(
+        self,
+        db: AsyncSession,
+        *,
+        cursor: str | None = None,
+        page_size: int = 10,
+        **filters,
+    ) -> tuple[Sequence[SysJobLog], str | None]:
+        """Keyset-paginated variant of get_job_log_list; filters are the same."""
+        return await self.get_keyset_list(
+            db, query=self._list_query(**filters), cursor=cursor, page_size=page_size,
+        )
+
     async def clean(self, db: AsyncSession):
         await db.execute(delete(SysJobLog))
+        self.forget_totals(db)
 
 
 crud_job_log = CRUDJobLog(SysJobLog)
@@ -1,26 +1,27 @@
 from typing import Sequence
 
-from sqlalchemy import delete, select
+from sqlalchemy import Select, delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.constants import CountMode
 from app.crud.base import CRUDBase
 from app.models.sys_logininfor import SysLogininfor
 
 
 class CRUDLogininfor(CRUDBase[SysLogininfor, None, None]):
 
-    async def get_logininfor_list(
+    # Log tables grow without bound; unfiltered totals come from table statistics
+    count_mode = CountMode.ESTIMATED
+
+    def _list_query(
         self,
-        db: AsyncSession,
         *,
-        page_num: int = 1,
-        page_size: int = 10,
         user_name: str | None = None,
         ipaddr: str | None = None,
         status: str | None = None,
         begin_time: str | None = None,
         end_time: str | None = None,
-    ) -> tuple[Sequence[SysLogininfor], int]:
+    ) -> Select:
         query = select(SysLogininfor)
         if user_name:
             query = query.where(SysLogininfor.user_name.like(f"%{user_name}%"))
@@ -33,14 +34,46 @@ class CRUDLogininfor(CRUDBase[SysLogininfor, None, None]):
         if end_time:
             query = query.where(SysLogininfor.login_time <= end_time)
         query = query.order_by(SysLogininfor.info_id.desc())
+        return query
+
+    async def get_logininfor_list(
+        self,
+        db: AsyncSession,
+        *,
+        page_num: int = 1,
+        page_size: int = 10,
+        user_name: str | None = None,
+        ipaddr: str | None = None,
+        status: str | None = None,
+        begin_time: str | None = None,
+        end_time: str | None = None,
+    ) -> tuple[Sequence[SysLogininfor], int]:
+        query = self._list_query(
+            user_name=user_name, ipaddr=ipaddr, status=status, begin_time=begin_time,
+            end_time=end_time,
+        )
         return await self.get_list(db, query=query, page_num=page_num, page_size=page_size)
 
+    async def get_logininfor_page(
+        self,
+        db: AsyncSession,
+        *,
+        cursor: str | None = None,
+        page_size: int = 10,
+        **filters,
+    ) -> tuple[Sequence[SysLogininfor], str | None]:
+        """Keyset-paginated variant of get_logininfor_list; filters are the same."""
+        return await self.get_keyset_list(
+            db, query=self._list_query(**filters), cursor=cursor, page_size=page_size,
+        )
+
     async def add_log(self, db: AsyncSession, log: SysLogininfor):
         db.add(log)
         await db.flush()
 
     async def clean(self, db: AsyncSession):
         await db.execute(delete(SysLogininfor))
+        self.forget_totals(db)
 
 
 crud_logininfor = CRUDLogininfor(SysLogininfor)
@@ -4,9 +4,12 @@ from typing import Sequence
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.redis import get_redis
 from app.crud.base import CRUDBase
+from app.db.session import run_after_commit
 from app.models.sys_menu import SysMenu
 from app.schemas.sys_menu import MenuCreate, MenuUpdate
+from app.services.permission_service import invalidate_role_permissions
 
 
 class CRUDMenu(CRUDBase[SysMenu, MenuCreate, MenuUpdate]):
@@ -33,6 +36,8 @@ class CRUDMenu(CRUDBase[SysMenu, MenuCreate, MenuUpdate]):
         db.add(menu)
         await db.flush()
         await db.refresh(menu)
+        # Admin's router tree includes every menu
+        run_after_commit(db, lambda: invalidate_role_permissions(get_redis()))
         return menu
 
     async def update_menu(self, db: AsyncSession, menu_in: MenuUpdate, update_by: str) -> SysMenu | None:
@@ -45,6 +50,7 @@ class CRUDMenu(CRUDBase[SysMenu, MenuCreate, MenuUpdate]):
         for k, v in update_data.items():
             setattr(menu, k, v)
         await db.flush()
+        run_after_commit(db, lambda: invalidate_role_permissions(get_redis()))
         return menu
 
     async def delete_menu(self, db: AsyncSession, menu_id: int) -> bool:
@@ -58,6 +64,7 @@ class CRUDMenu(CRUDBase[SysMenu, MenuCreate, MenuUpdate]):
         if menu:
             await db.delete(menu)
             await db.flush()
+            run_after_commit(db, lambda: invalidate_role_permissions(get_redis()))
         return True
 
     async def has_child(self, db: AsyncSession, menu_id: int) -> bool:
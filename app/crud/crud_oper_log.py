@@ -1,27 +1,28 @@
 from typing import Sequence
 
-from sqlalchemy import delete, select
+from sqlalchemy import Select, delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.constants import CountMode
 from app.crud.base import CRUDBase
 from app.models.sys_oper_log import SysOperLog
 
 
 class CRUDOperLog(CRUDBase[SysOperLog, None, None]):
 
-    async def get_oper_log_list(
+    # Log tables grow without bound; unfiltered totals come from table statistics
+    count_mode = CountMode.ESTIMATED
+
+    def _list_query(
         self,
-        db: AsyncSession,
         *,
-        page_num: int = 1,
-        page_size: int = 10,
         title: str | None = None,
         business_type: int | None = None,
         oper_name: str | None = None,
         status: int | None = None,
         begin_time: str | None = None,
         end_time: str | None = None,
-    ) -> tuple[Sequence[SysOperLog], int]:
+    ) -> Select:
         query = select(SysOperLog)
         if title:
             query = query.where(SysOperLog.title.like(f"%{title}%"))
@@ -36,14 +37,47 @@ class CRUDOperLog(CRUDBase[SysOperLog, None, None]):
         if end_time:
             query = query.where(SysOperLog.oper_time <= end_time)
         query = query.order_by(SysOperLog.oper_id.desc())
+        return query
+
+    async def get_oper_log_list(
+        self,
+        db: AsyncSession,
+        *,
+        page_num: int = 1,
+        page_size: int = 10,
+        title: str | None = None,
+        business_type: int | None = None,
+        oper_name: str | None = None,
+        status: int | None = None,
+        begin_time: str | None = None,
+        end_time: str | None = None,
+    ) -> tuple[Sequence[SysOperLog], int]:
+        query = self._list_query(
+            title=title, business_type=business_type, oper_name=oper_name, status=status,
+            begin_time=begin_time, end_time=end_time,
+        )
         return await self.get_list(db, query=query, page_num=page_num, page_size=page_size)
 
+    async def get_oper_log_page(
+        self,
+        db: AsyncSession,
+        *,
+        cursor: str | None = None,
+        page_size: int = 10,
+        **filters,
+    ) -> tuple[Sequence[SysOperLog], str | None]:
+        """Keyset-paginated variant of get_oper_log_list; filters are the same."""
+        return await self.get_keyset_list(
+            db, query=self._list_query(**filters), cursor=cursor, page_size=page_size,
+        )
+
     async def add_log(self, db: AsyncSession, log: SysOperLog):
         db.add(log)
         await db.flush()
 
     async def clean(self, db: AsyncSession):
         await db.execute(delete(SysOperLog))
+        self.forget_totals(db)
 
 
 crud_oper_log = CRUDOperLog(SysOperLog)
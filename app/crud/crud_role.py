@@ -4,11 +4,19 @@ from typing import Sequence
 from sqlalchemy import Select, delete, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.data_scope import DataScopeFilter
+from app.core.redis import get_redis
+from app.core.stateless_auth import stateless_auth
 from app.crud.base import CRUDBase
+from app.db.session import run_after_commit
 from app.models.associations import sys_role_dept, sys_role_menu, sys_user_role
 from app.models.sys_role import SysRole
 from app.models.sys_user import SysUser
 from app.schemas.sys_role import RoleCreate, RoleUpdate
+from app.services.permission_service import invalidate_role_permissions
+
+# Users per multi-row INSERT / IN list when (de)authorizing a role in bulk
+AUTH_USER_CHUNK = 1000
 
 
 class CRUDRole(CRUDBase[SysRole, RoleCreate, RoleUpdate]):
@@ -73,28 +81,35 @@ class CRUDRole(CRUDBase[SysRole, RoleCreate, RoleUpdate]):
 
     async def update_role(
         self, db: AsyncSession, role_in: RoleUpdate, update_by: str
-    ) -> SysRole | None:
+    ) -> tuple[SysRole | None, bool]:
+        """Update a role and its menus.
+
+        Returns the role and whether its key, status or menus (and therefore
+        the roles/permissions of its users) changed.
+        """
         role = await self.get(db, role_in.role_id)
         if not role:
-            return None
+            return None, False
 
         update_data = role_in.model_dump(exclude_unset=True, exclude={"role_id", "menu_ids"})
+        access_changed = any(
+            k in update_data and update_data[k] != getattr(role, k) for k in ("role_key", "status")
+        )
         update_data["update_by"] = update_by
         update_data["update_time"] = datetime.now()
         for k, v in update_data.items():
             setattr(role, k, v)
 
-        # Update menu relations
-        await db.execute(delete(sys_role_menu).where(sys_role_menu.c.role_id == role.role_id))
-        if role_in.menu_ids:
-            await db.execute(
-                insert(sys_role_menu),
-                [{"role_id": role.role_id, "menu_id": mid} for mid in role_in.menu_ids],
-            )
+        if await self.sync_relation(
+            db, sys_role_menu.c.role_id, role.role_id, sys_role_menu.c.menu_id, role_in.menu_ids,
+        ):
+            access_changed = True
 
         await db.flush()
         await db.refresh(role)
-        return role
+        if access_changed:
+            run_after_commit(db, lambda: invalidate_role_permissions(get_redis(), [role.role_id]))
+        return role, access_changed
 
     async def update_data_scope(
         self, db: AsyncSession, role_id: int, data_scope: str, dept_ids: list[int], update_by: str
@@ -113,32 +128,36 @@ class CRUDRole(CRUDBase[SysRole, RoleCreate, RoleUpdate]):
                 [{"role_id": role_id, "dept_id": did} for did in dept_ids],
             )
         await db.flush()
+        # A new role version retires cached data scopes that include this role
+        run_after_commit(db, lambda: stateless_auth.bump_role_versions(get_redis(), [role_id]))
         return role
 
     async def soft_delete(self, db: AsyncSession, role_ids: list[int]) -> int:
-        count = 0
-        for rid in role_ids:
-            role = await self.get(db, rid)
-            if role and role.role_id != 1:  # Cannot delete admin role
-                role.del_flag = "2"
-                # Clean up relations
-                await db.execute(delete(sys_role_menu).where(sys_role_menu.c.role_id == rid))
-                await db.execute(delete(sys_role_dept).where(sys_role_dept.c.role_id == rid))
-                count += 1
-        await db.flush()
+        """Soft delete roles; returns the number deleted.
+
+        Bumps the roles' versions after commit if any was deleted, which drops
+        their users' cached sessions and permission sets.
+        """
+        count = await self.bulk_soft_delete(
+            db, role_ids,
+            protected_ids={1},  # Cannot delete admin role
+            relations=[sys_role_menu.c.role_id, sys_role_dept.c.role_id],
+        )
+        if count:
+            run_after_commit(db, lambda: invalidate_role_permissions(get_redis(), role_ids))
         return count
 
-    async def update_status(self, db: AsyncSession, role_id: int, status: str, update_by: str):
-        role = await self.get(db, role_id)
-        if role:
-            role.status = status
-            role.update_by = update_by
-            role.update_time = datetime.now()
-            await db.flush()
+    async def update_status(self, db: AsyncSession, role_id: int, status: str, update_by: str) -> bool:
+        """Set a role's status; returns True if the role was updated (see soft_delete)."""
+        if await self.bulk_update_status(db, [role_id], status, update_by=update_by):
+            run_after_commit(db, lambda: invalidate_role_permissions(get_redis(), [role_id]))
+            return True
+        return False
 
     async def get_allocated_users(
         self, db: AsyncSession, role_id: int, *, page_num: int = 1, page_size: int = 10,
         user_name: str | None = None, phonenumber: str | None = None,
+        data_scope: DataScopeFilter | None = None,
     ) -> tuple[Sequence[SysUser], int]:
         """Get users that have this role."""
         query = (
@@ -146,6 +165,8 @@ class CRUDRole(CRUDBase[SysRole, RoleCreate, RoleUpdate]):
             .join(sys_user_role, sys_user_role.c.user_id == SysUser.user_id)
             .where(sys_user_role.c.role_id == role_id, SysUser.del_flag == "0")
         )
+        if data_scope:
+            query = data_scope.apply_to_users(query)
         if user_name:
             query = query.where(SysUser.user_name.like(f"%{user_name}%"))
         if phonenumber:
@@ -155,6 +176,7 @@ class CRUDRole(CRUDBase[SysRole, RoleCreate, RoleUpdate]):
     async def get_unallocated_users(
         self, db: AsyncSession, role_id: int, *, page_num: int = 1, page_size: int = 10,
         user_name: str | None = None, phonenumber: str | None = None,
+        data_scope: DataScopeFilter | None = None,
     ) -> tuple[Sequence[SysUser], int]:
         """Get users that do not have this role."""
         allocated_ids = select(sys_user_role.c.user_id).where(
@@ -164,6 +186,8 @@ class CRUDRole(CRUDBase[SysRole, RoleCreate, RoleUpdate]):
             SysUser.del_flag == "0",
             SysUser.user_id.not_in(allocated_ids),
         )
+        if data_scope:
+            query = data_scope.apply_to_users(query)
         if user_name:
             query = query.where(SysUser.user_name.like(f"%{user_name}%"))
         if phonenumber:
@@ -178,20 +202,37 @@ class CRUDRole(CRUDBase[SysRole, RoleCreate, RoleUpdate]):
             )
         )
 
-    async def cancel_auth_users(self, db: AsyncSession, role_id: int, user_ids: list[int]):
-        await db.execute(
-            delete(sys_user_role).where(
-                sys_user_role.c.role_id == role_id,
-                sys_user_role.c.user_id.in_(user_ids),
+    async def cancel_auth_users(self, db: AsyncSession, role_id: int, user_ids: list[int]) -> int:
+        """Remove ``role_id`` from ``user_ids``; returns the number of grants removed."""
+        user_ids = list(dict.fromkeys(user_ids))
+        removed = 0
+        for start in range(0, len(user_ids), AUTH_USER_CHUNK):
+            result = await db.execute(
+                delete(sys_user_role).where(
+                    sys_user_role.c.role_id == role_id,
+                    sys_user_role.c.user_id.in_(user_ids[start:start + AUTH_USER_CHUNK]),
+                )
             )
-        )
-
-    async def select_auth_users(self, db: AsyncSession, role_id: int, user_ids: list[int]):
-        for uid in user_ids:
-            await db.execute(
-                insert(sys_user_role).prefix_with("IGNORE"),
-                [{"user_id": uid, "role_id": role_id}],
+            removed += result.rowcount
+        return removed
+
+    async def select_auth_users(self, db: AsyncSession, role_id: int, user_ids: list[int]) -> int:
+        """Grant ``role_id`` to ``user_ids``; returns the number of new grants.
+
+        Ids are deduplicated and inserted AUTH_USER_CHUNK rows per statement;
+        users who already have the role are skipped by INSERT IGNORE.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        granted = 0
+        for start in range(0, len(user_ids), AUTH_USER_CHUNK):
+            result = await db.execute(
+                insert(sys_user_role).prefix_with("IGNORE").values([
+                    {"user_id": uid, "role_id": role_id}
+                    for uid in user_ids[start:start + AUTH_USER_CHUNK]
+                ])
             )
+            granted += result.rowcount
+        return granted
 
 
 crud_role = CRUDRole(SysRole)
@@ -1,22 +1,34 @@
 from datetime import datetime
 from typing import Sequence
 
-from sqlalchemy import Select, delete, insert, select
+from sqlalchemy import Select, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.constants import USER_INFO_VERSION_KEY, CountMode, LoadProfile, UserStatus
+from app.core.data_scope import DataScopeFilter
+from app.core.redis import get_redis, get_session_redis
+from app.core.session_store import revoke_user_sessions
 from app.crud.base import CRUDBase
-from app.models.associations import sys_user_post, sys_user_role
-from app.models.sys_dept import SysDept
+from app.db.session import run_after_commit
+from app.models.associations import sys_dept_closure, sys_user_post, sys_user_role
 from app.models.sys_user import SysUser
 from app.schemas.sys_user import UserCreate, UserUpdate
 
 
 class CRUDUser(CRUDBase[SysUser, UserCreate, UserUpdate]):
 
-    async def get_by_username(self, db: AsyncSession, username: str) -> SysUser | None:
+    load_profiles = {
+        # The dept is a many-to-one, joined into the page query itself
+        LoadProfile.LIST: {"dept": "joined"},
+        LoadProfile.DETAIL: {"dept": "joined", "roles": "selectin", "posts": "selectin"},
+    }
+
+    async def get_by_username(
+        self, db: AsyncSession, username: str, *, load: str | None = None,
+    ) -> SysUser | None:
         stmt = select(SysUser).where(
             SysUser.user_name == username, SysUser.del_flag == "0"
-        )
+        ).options(*self.load_options(load))
         result = await db.execute(stmt)
         return result.scalar_one_or_none()
 
@@ -32,8 +44,12 @@ class CRUDUser(CRUDBase[SysUser, UserCreate, UserUpdate]):
         dept_id: int | None = None,
         begin_time: str | None = None,
         end_time: str | None = None,
+        data_scope: DataScopeFilter | None = None,
+        load: str | None = LoadProfile.LIST,
     ) -> tuple[Sequence[SysUser], int]:
-        query = select(SysUser).where(SysUser.del_flag == "0")
+        query = select(SysUser).where(SysUser.del_flag == "0").options(*self.load_options(load))
+        if data_scope:
+            query = data_scope.apply_to_users(query)
 
         if user_name:
             query = query.where(SysUser.user_name.like(f"%{user_name}%"))
@@ -45,10 +61,8 @@ class CRUDUser(CRUDBase[SysUser, UserCreate, UserUpdate]):
             # Include child departments
             query = query.where(
                 SysUser.dept_id.in_(
-                    select(SysDept.dept_id).where(
-                        (SysDept.dept_id == dept_id)
-                        | SysDept.ancestors.like(f"%,{dept_id},%")
-                        | SysDept.ancestors.like(f"%,{dept_id}")
+                    select(sys_dept_closure.c.descendant).where(
+                        sys_dept_closure.c.ancestor == dept_id
                     )
                 )
             )
@@ -58,7 +72,11 @@ class CRUDUser(CRUDBase[SysUser, UserCreate, UserUpdate]):
             query = query.where(SysUser.create_time <= end_time)
 
         query = query.order_by(SysUser.user_id)
-        return await self.get_list(db, query=query, page_num=page_num, page_size=page_size)
+        # WINDOW only takes effect with PAGINATION_WINDOW_COUNT (off by default
+        # for MySQL 5.7, which has no window functions); otherwise an exact count
+        return await self.get_list(
+            db, query=query, page_num=page_num, page_size=page_size, count_mode=CountMode.WINDOW,
+        )
 
     async def create_user(
         self, db: AsyncSession, user_in: UserCreate, password_hash: str, create_by: str
@@ -96,46 +114,50 @@ class CRUDUser(CRUDBase[SysUser, UserCreate, UserUpdate]):
 
     async def update_user(
         self, db: AsyncSession, user_in: UserUpdate, update_by: str
-    ) -> SysUser:
+    ) -> tuple[SysUser | None, bool]:
+        """Update a user and their role/post links.
+
+        Returns the user and whether anything held in their login sessions
+        (dept, status, roles) changed.
+        """
         user = await self.get(db, user_in.user_id)
         if not user:
-            return None
+            return None, False
 
         update_data = user_in.model_dump(exclude_unset=True, exclude={"user_id", "post_ids", "role_ids"})
+        session_changed = any(
+            k in update_data and update_data[k] != getattr(user, k) for k in ("dept_id", "status")
+        )
         update_data["update_by"] = update_by
         update_data["update_time"] = datetime.now()
         for k, v in update_data.items():
             setattr(user, k, v)
 
-        # Update role relations
-        await db.execute(delete(sys_user_role).where(sys_user_role.c.user_id == user.user_id))
-        if user_in.role_ids:
-            await db.execute(
-                insert(sys_user_role),
-                [{"user_id": user.user_id, "role_id": rid} for rid in user_in.role_ids],
-            )
-
-        # Update post relations
-        await db.execute(delete(sys_user_post).where(sys_user_post.c.user_id == user.user_id))
-        if user_in.post_ids:
-            await db.execute(
-                insert(sys_user_post),
-                [{"user_id": user.user_id, "post_id": pid} for pid in user_in.post_ids],
-            )
+        if await self.update_user_roles(db, user.user_id, user_in.role_ids):
+            session_changed = True
+        await self.sync_relation(
+            db, sys_user_post.c.user_id, user.user_id, sys_user_post.c.post_id, user_in.post_ids,
+        )
 
         await db.flush()
         await db.refresh(user)
-        return user
+        run_after_commit(db, lambda: bump_user_info_version(user.user_id))
+        return user, session_changed
+
+    async def update_user_roles(self, db: AsyncSession, user_id: int, role_ids: list[int]) -> bool:
+        """Set a user's roles; returns True if they changed."""
+        return await self.sync_relation(
+            db, sys_user_role.c.user_id, user_id, sys_user_role.c.role_id, role_ids,
+        )
 
     async def soft_delete(self, db: AsyncSession, user_ids: list[int]) -> int:
-        """Soft delete users by setting del_flag to '2'."""
-        count = 0
-        for uid in user_ids:
-            user = await self.get(db, uid)
-            if user and user.user_id != 1:  # Cannot delete admin
-                user.del_flag = "2"
-                count += 1
-        await db.flush()
+        """Soft delete users, drop their role/post links and revoke their sessions."""
+        user_ids = [uid for uid in user_ids if uid != 1]  # Cannot delete admin
+        count = await self.bulk_soft_delete(
+            db, user_ids, relations=[sys_user_role.c.user_id, sys_user_post.c.user_id],
+        )
+        if user_ids:
+            run_after_commit(db, lambda: revoke_user_sessions(get_session_redis(), user_ids))
         return count
 
     async def reset_password(self, db: AsyncSession, user_id: int, password_hash: str, update_by: str):
@@ -145,20 +167,35 @@ class CRUDUser(CRUDBase[SysUser, UserCreate, UserUpdate]):
             user.update_by = update_by
             user.update_time = datetime.now()
             await db.flush()
+            run_after_commit(db, lambda: revoke_user_sessions(get_session_redis(), [user_id]))
 
     async def update_status(self, db: AsyncSession, user_id: int, status: str, update_by: str):
+        if await self.bulk_update_status(db, [user_id], status, update_by=update_by):
+            run_after_commit(db, lambda: bump_user_info_version(user_id))
+            if status == UserStatus.DISABLE:
+                run_after_commit(db, lambda: revoke_user_sessions(get_session_redis(), [user_id]))
+
+    async def update_profile(self, db: AsyncSession, user_id: int, data: dict) -> bool:
         user = await self.get(db, user_id)
-        if user:
-            user.status = status
-            user.update_by = update_by
-            user.update_time = datetime.now()
-            await db.flush()
+        if not user:
+            return False
+        for k, v in data.items():
+            setattr(user, k, v)
+        await db.flush()
+        run_after_commit(db, lambda: bump_user_info_version(user_id))
+        return True
 
     async def update_avatar(self, db: AsyncSession, user_id: int, avatar: str):
         user = await self.get(db, user_id)
         if user:
             user.avatar = avatar
             await db.flush()
+            run_after_commit(db, lambda: bump_user_info_version(user_id))
+
+
+async def bump_user_info_version(user_id: int):
+    """Retire the /getInfo ETags issued for a user (see auth_service.user_info_etag)."""
+    await get_redis().incr(f"{USER_INFO_VERSION_KEY}{user_id}")
 
 
 crud_user = CRUDUser(SysUser)
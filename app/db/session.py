@@ -1,7 +1,14 @@
+import logging
+from contextvars import ContextVar
+from typing import Awaitable, Callable
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
@@ -10,6 +17,18 @@ engine = create_async_engine(
     max_overflow=20,
 )
 
+# Per-request statement counter, set by the DEBUG-only X-SQL-Count middleware
+sql_statement_count: ContextVar[list[int] | None] = ContextVar("sql_statement_count", default=None)
+
+
+if settings.DEBUG:
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count_statement(conn, cursor, statement, parameters, context, executemany):
+        counter = sql_statement_count.get()
+        if counter is not None:
+            counter[0] += 1
+
+
 async_session_factory = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -17,6 +36,11 @@ async_session_factory = async_sessionmaker(
 )
 
 
+def run_after_commit(session: AsyncSession, callback: Callable[[], Awaitable[None]]):
+    """Run ``callback`` once get_db has committed ``session`` (e.g. cache version bumps)."""
+    session.info.setdefault("after_commit", []).append(callback)
+
+
 async def get_db():
     """FastAPI dependency that provides an async database session."""
     async with async_session_factory() as session:
@@ -26,3 +50,8 @@ async def get_db():
         except Exception:
             await session.rollback()
             raise
+        for callback in session.info.pop("after_commit", []):
+            try:
+                await callback()
+            except Exception:
+                logger.exception("After-commit callback failed")
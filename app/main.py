@@ -8,6 +8,9 @@ from app.config import settings
 from app.core.exception_handlers import register_exception_handlers
 from app.core.middleware import setup_middleware
 from app.core.redis import close_redis, init_redis
+from app.core.session_cache import start_invalidation_listener, stop_invalidation_listener
+from app.core.stateless_auth import stateless_auth
+from app.services.captcha_service import captcha_pool
 from app.services.job_service import init_scheduler, shutdown_scheduler
 from app.api.router import api_router
 
@@ -16,11 +19,18 @@ from app.api.router import api_router
 async def lifespan(app: FastAPI):
     """Startup and shutdown events."""
     # Startup
-    await init_redis()
+    redis_client = await init_redis()
+    if settings.STATELESS_TOKEN_ENABLED:
+        await stateless_auth.sync(redis_client)
+    start_invalidation_listener(redis_client)
+    if settings.CAPTCHA_ENABLED:
+        captcha_pool.start()
     await init_scheduler(app)
     yield
     # Shutdown
     await shutdown_scheduler()
+    await captcha_pool.stop()
+    await stop_invalidation_listener()
     await close_redis()
 
 
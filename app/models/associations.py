@@ -1,4 +1,4 @@
-from sqlalchemy import BigInteger, Column, Table, ForeignKey
+from sqlalchemy import BigInteger, Column, ForeignKey, Index, Integer, Table
 
 from app.models.base import Base
 
@@ -33,3 +33,16 @@ sys_role_dept = Table(
     Column("role_id", BigInteger, ForeignKey("sys_role.role_id"), primary_key=True),
     Column("dept_id", BigInteger, ForeignKey("sys_dept.dept_id"), primary_key=True),
 )
+
+# Department hierarchy closure: one row per (ancestor, descendant) pair,
+# including every department paired with itself at depth 0. Derived data kept
+# in step by crud_dept, so (as in init_data.sql and the migration) it has no
+# foreign keys: init_data.sql can drop and recreate sys_dept freely.
+sys_dept_closure = Table(
+    "sys_dept_closure",
+    Base.metadata,
+    Column("ancestor", BigInteger, primary_key=True),
+    Column("descendant", BigInteger, primary_key=True),
+    Column("depth", Integer, nullable=False, default=0, server_default="0"),
+    Index("idx_dept_closure_descendant", "descendant"),
+)
@@ -21,4 +21,4 @@ class SysDept(Base, AuditMixin):
     del_flag: Mapped[str] = mapped_column(String(1), default="0", server_default="0")
 
     # Relationships
-    users: Mapped[list["SysUser"]] = relationship(back_populates="dept", lazy="noload")
+    users: Mapped[list["SysUser"]] = relationship(back_populates="dept", lazy="raise_on_sql")
@@ -18,10 +18,11 @@ class SysRole(Base, AuditMixin):
     status: Mapped[str] = mapped_column(String(1), nullable=False, default="0", server_default="0")
     del_flag: Mapped[str] = mapped_column(String(1), default="0", server_default="0")
 
-    # Relationships
+    # Relationships load nothing by default; queries opt in via loader options
+    # (see the CRUD classes' load_profiles)
     menus: Mapped[list["SysMenu"]] = relationship(
-        "SysMenu", secondary=sys_role_menu, lazy="selectin",
+        "SysMenu", secondary=sys_role_menu, lazy="raise_on_sql",
     )
     depts: Mapped[list["SysDept"]] = relationship(
-        "SysDept", secondary=sys_role_dept, lazy="selectin",
+        "SysDept", secondary=sys_role_dept, lazy="raise_on_sql",
     )
@@ -25,13 +25,14 @@ class SysUser(Base, AuditMixin):
     login_ip: Mapped[str] = mapped_column(String(128), default="", server_default="")
     login_date: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
-    # Relationships
+    # Relationships load nothing by default; queries opt in via loader options
+    # (see the CRUD classes' load_profiles)
     dept: Mapped["SysDept | None"] = relationship(
-        "SysDept", back_populates="users", lazy="joined",
+        "SysDept", back_populates="users", lazy="raise_on_sql",
     )
     roles: Mapped[list["SysRole"]] = relationship(
-        "SysRole", secondary=sys_user_role, lazy="selectin",
+        "SysRole", secondary=sys_user_role, lazy="raise_on_sql",
     )
     posts: Mapped[list["SysPost"]] = relationship(
-        "SysPost", secondary=sys_user_post, lazy="selectin",
+        "SysPost", secondary=sys_user_post, lazy="raise_on_sql",
     )
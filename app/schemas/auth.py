@@ -27,12 +27,17 @@ class LoginUser(CamelModel):
 
     # Runtime info
     login_ip: str = ""
+    login_location: str = ""
+    browser: str = ""
+    os: str = ""
     login_time: str = ""
     token_key: str = ""  # UUID key for Redis
+    expire_time: int = 0  # Unix timestamp when the Redis session expires
 
     # Permissions and roles
     permissions: list[str] = []
     roles: list[str] = []  # role keys
+    role_ids: list[int] = []  # active role IDs
 
     # Department info
     dept_name: str = ""
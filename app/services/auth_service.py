@@ -2,23 +2,30 @@ import json
 from datetime import datetime
 
 import redis.asyncio as aioredis
-from sqlalchemy import select
+from sqlalchemy import Row, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
 from app.config import settings
-from app.core.constants import (
-    CAPTCHA_CODE_KEY, LOGIN_TOKEN_KEY, PWD_ERR_CNT_KEY, SUPER_ADMIN,
-)
+from app.core.constants import CAPTCHA_CODE_KEY, DEPT_VERSION_KEY, PWD_ERR_CNT_KEY, USER_INFO_VERSION_KEY
 from app.core.exceptions import ServiceException
+from app.core.redis import get_session_redis
+from app.core.redis_scripts import LOGIN_FAILURE, LOGIN_PRECHECK, get_script
+from app.core.etag import make_etag
 from app.core.security import (
-    create_token, generate_uuid, get_password_hash, verify_password,
+    create_token, generate_uuid, hash_pool_slot, verify_password_async,
 )
+from app.core.session_store import delete_session, save_session
+from app.core.stateless_auth import stateless_auth
+from app.crud.crud_user import bump_user_info_version
+from app.db.session import run_after_commit
+from app.models.sys_dept import SysDept
 from app.models.sys_logininfor import SysLogininfor
-from app.models.sys_menu import SysMenu
-from app.models.sys_role import SysRole
 from app.models.sys_user import SysUser
-from app.models.associations import sys_user_role, sys_role_menu
 from app.schemas.auth import LoginUser
+from app.services import permission_service
+from app.utils.ip_utils import get_ip_location
+from app.utils.ua_utils import parse_user_agent
 
 
 async def login(
@@ -29,54 +36,61 @@ async def login(
     login_ip: str,
     db: AsyncSession,
     redis: aioredis.Redis,
+    user_agent: str = "",
 ) -> str:
     """Authenticate user and return JWT token."""
-    # 1. Validate captcha
-    if settings.CAPTCHA_ENABLED:
-        cache_key = f"{CAPTCHA_CODE_KEY}{captcha_uuid}"
-        cached_code = await redis.get(cache_key)
-        await redis.delete(cache_key)
-        if not cached_code or cached_code.lower() != code.lower():
-            raise ServiceException("验证码错误")
-
-    # 2. Check account lock
-    err_key = f"{PWD_ERR_CNT_KEY}{username}"
-    err_count = await redis.get(err_key)
-    if err_count and int(err_count) >= settings.MAX_RETRY_COUNT:
-        raise ServiceException(
-            f"密码错误次数过多，帐户已锁定{settings.LOCK_TIME_MINUTES}分钟"
+    # Claim a password-hash slot first: when hashing is saturated the login
+    # fails here, before the captcha is consumed
+    with hash_pool_slot():
+        # 1-2. Consume captcha and check account lock in one Lua call
+        err_key = f"{PWD_ERR_CNT_KEY}{username}"
+        precheck = get_script(redis, LOGIN_PRECHECK)
+        status, err_count = await precheck(
+            keys=[f"{CAPTCHA_CODE_KEY}{captcha_uuid}", err_key],
+            args=[
+                "1" if settings.CAPTCHA_ENABLED else "0",
+                code.lower(),
+                settings.MAX_RETRY_COUNT,
+            ],
         )
-
-    # 3. Find user
-    stmt = select(SysUser).where(
-        SysUser.user_name == username,
-        SysUser.del_flag == "0",
-    )
-    result = await db.execute(stmt)
-    user = result.scalar_one_or_none()
-
-    if not user:
-        await _increment_login_error(redis, err_key)
-        raise ServiceException("用户不存在/密码错误")
-
-    # 4. Verify password
-    if not verify_password(password, user.password):
-        await _increment_login_error(redis, err_key)
-        raise ServiceException("用户不存在/密码错误")
+        if status == 1:
+            raise ServiceException("验证码错误")
+        if status == 2:
+            raise ServiceException(
+                f"密码错误次数过多，帐户已锁定{settings.LOCK_TIME_MINUTES}分钟"
+            )
+
+        # 3. Find user
+        stmt = select(SysUser).where(
+            SysUser.user_name == username,
+            SysUser.del_flag == "0",
+        ).options(joinedload(SysUser.dept))  # dept_name goes into the session
+        result = await db.execute(stmt)
+        user = result.scalar_one_or_none()
+
+        if not user:
+            await _increment_login_error(redis, err_key)
+            raise ServiceException("用户不存在/密码错误")
+
+        # 4. Verify password
+        if not await verify_password_async(password, user.password):
+            await _increment_login_error(redis, err_key)
+            raise ServiceException("用户不存在/密码错误")
 
     # 5. Check status
     if user.status == "1":
         raise ServiceException("用户已停用")
 
     # Clear error count on success
-    await redis.delete(err_key)
+    if err_count:
+        await redis.delete(err_key)
 
-    # 6. Get permissions and roles
-    permissions = await _get_user_permissions(user, db)
-    role_keys = await _get_user_role_keys(user, db)
+    # 6. Get roles and permissions (per-role permission sets are cached in Redis)
+    roles, permissions = await permission_service.resolve_user_access(user, db, redis)
 
     # 7. Build LoginUser and cache in Redis
     token_key = generate_uuid()
+    browser, os = parse_user_agent(user_agent)
     login_user = LoginUser(
         user_id=user.user_id,
         dept_id=user.dept_id,
@@ -89,139 +103,109 @@ async def login(
         avatar=user.avatar,
         status=user.status,
         login_ip=login_ip,
+        login_location=get_ip_location(login_ip),
+        browser=browser,
+        os=os,
         login_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         token_key=token_key,
         permissions=permissions,
-        roles=role_keys,
+        roles=[r["role_key"] for r in roles],
+        role_ids=[r["role_id"] for r in roles],
         dept_name=user.dept.dept_name if user.dept else "",
     )
 
-    await redis.setex(
-        f"{LOGIN_TOKEN_KEY}{token_key}",
-        settings.TOKEN_EXPIRE_MINUTES * 60,
-        login_user.model_dump_json(),
-    )
+    await save_session(get_session_redis(), login_user)
 
     # 8. Update user login info
     user.login_ip = login_ip
     user.login_date = datetime.now()
     await db.flush()
+    run_after_commit(db, lambda: bump_user_info_version(user.user_id))
 
     # 9. Record login log
-    await _record_login_log(db, username, login_ip, "0", "登录成功")
+    await _record_login_log(db, username, login_ip, "0", "登录成功", browser=browser, os=os)
 
     # 10. Create JWT token
-    return create_token(token_key)
+    claims = None
+    if settings.STATELESS_TOKEN_ENABLED:
+        claims = await stateless_auth.build_claims(redis, login_user)
+    return create_token(token_key, claims)
 
 
 async def logout(token_key: str, redis: aioredis.Redis):
     """Remove user token from Redis."""
-    await redis.delete(f"{LOGIN_TOKEN_KEY}{token_key}")
+    await delete_session(redis, token_key)
+
+
+async def user_info_etag(current_user: dict, redis: aioredis.Redis) -> str:
+    """ETag for /getInfo, derived without touching the database.
 
+    The user's columns are covered by their info version, the dept columns by
+    the department version and roles/permissions by the session itself.
+    """
+    user_version, dept_version = await redis.mget(
+        f"{USER_INFO_VERSION_KEY}{current_user['user_id']}", DEPT_VERSION_KEY,
+    )
+    return make_etag(
+        current_user["user_id"], user_version, dept_version,
+        sorted(current_user.get("roles", [])), sorted(current_user.get("permissions", [])),
+    )
 
-async def get_user_info(current_user: dict, db: AsyncSession) -> dict:
-    """Get user info for /getInfo endpoint."""
-    user_id = current_user["user_id"]
-    stmt = select(SysUser).where(SysUser.user_id == user_id, SysUser.del_flag == "0")
-    result = await db.execute(stmt)
-    user = result.scalar_one_or_none()
 
-    if not user:
+async def get_user_info_row(current_user: dict, db: AsyncSession) -> Row:
+    """Load the columns shown by /getInfo (user plus dept) in one query."""
+    stmt = (
+        select(
+            SysUser.user_id, SysUser.dept_id, SysUser.user_name, SysUser.nick_name,
+            SysUser.email, SysUser.phonenumber, SysUser.sex, SysUser.avatar, SysUser.status,
+            SysUser.login_ip, SysUser.login_date, SysUser.create_time,
+            SysDept.dept_id.label("dept_ref_id"), SysDept.dept_name, SysDept.leader,
+        )
+        .outerjoin(SysDept, SysDept.dept_id == SysUser.dept_id)
+        .where(SysUser.user_id == current_user["user_id"], SysUser.del_flag == "0")
+    )
+    row = (await db.execute(stmt)).first()
+    if row is None:
         raise ServiceException("用户不存在")
+    return row
+
 
-    # Build user dict for response
+def build_user_info(current_user: dict, row: Row) -> dict:
+    """Build the /getInfo payload from get_user_info_row's row and the session."""
     user_dict = {
-        "userId": user.user_id,
-        "deptId": user.dept_id,
-        "userName": user.user_name,
-        "nickName": user.nick_name,
-        "email": user.email,
-        "phonenumber": user.phonenumber,
-        "sex": user.sex,
-        "avatar": user.avatar,
-        "status": user.status,
-        "loginIp": user.login_ip,
-        "loginDate": user.login_date.strftime("%Y-%m-%d %H:%M:%S") if user.login_date else None,
-        "createTime": user.create_time.strftime("%Y-%m-%d %H:%M:%S") if user.create_time else None,
+        "userId": row.user_id,
+        "deptId": row.dept_id,
+        "userName": row.user_name,
+        "nickName": row.nick_name,
+        "email": row.email,
+        "phonenumber": row.phonenumber,
+        "sex": row.sex,
+        "avatar": row.avatar,
+        "status": row.status,
+        "loginIp": row.login_ip,
+        "loginDate": row.login_date.strftime("%Y-%m-%d %H:%M:%S") if row.login_date else None,
+        "createTime": row.create_time.strftime("%Y-%m-%d %H:%M:%S") if row.create_time else None,
     }
 
-    if user.dept:
+    if row.dept_ref_id is not None:
         user_dict["dept"] = {
-            "deptId": user.dept.dept_id,
-            "deptName": user.dept.dept_name,
-            "leader": user.dept.leader,
+            "deptId": row.dept_ref_id,
+            "deptName": row.dept_name,
+            "leader": row.leader,
         }
 
-    roles_set = set(current_user.get("roles", []))
-    perms_set = set(current_user.get("permissions", []))
-
     return {
         "user": user_dict,
-        "roles": list(roles_set),
-        "permissions": list(perms_set),
+        "roles": sorted(set(current_user.get("roles", []))),
+        "permissions": sorted(set(current_user.get("permissions", []))),
     }
 
 
-async def _get_user_permissions(user: SysUser, db: AsyncSession) -> list[str]:
-    """Get all permission strings for a user."""
-    # Admin gets all permissions
-    if user.user_name == "admin":
-        return ["*:*:*"]
-
-    # Get role IDs for user
-    stmt = select(sys_user_role.c.role_id).where(
-        sys_user_role.c.user_id == user.user_id
-    )
-    result = await db.execute(stmt)
-    role_ids = [row[0] for row in result.fetchall()]
-
-    if not role_ids:
-        return []
-
-    # Get menu permissions through roles
-    stmt = (
-        select(SysMenu.perms)
-        .join(sys_role_menu, sys_role_menu.c.menu_id == SysMenu.menu_id)
-        .join(SysRole, SysRole.role_id == sys_role_menu.c.role_id)
-        .where(
-            sys_role_menu.c.role_id.in_(role_ids),
-            SysRole.status == "0",
-            SysRole.del_flag == "0",
-            SysMenu.status == "0",
-        )
-    )
-    result = await db.execute(stmt)
-    perms = set()
-    for row in result.fetchall():
-        if row[0]:
-            perms.add(row[0])
-
-    return list(perms)
-
-
-async def _get_user_role_keys(user: SysUser, db: AsyncSession) -> list[str]:
-    """Get all role keys for a user."""
-    if user.user_name == "admin":
-        return [SUPER_ADMIN]
-
-    stmt = (
-        select(SysRole.role_key)
-        .join(sys_user_role, sys_user_role.c.role_id == SysRole.role_id)
-        .where(
-            sys_user_role.c.user_id == user.user_id,
-            SysRole.status == "0",
-            SysRole.del_flag == "0",
-        )
-    )
-    result = await db.execute(stmt)
-    return [row[0] for row in result.fetchall()]
-
-
 async def _increment_login_error(redis: aioredis.Redis, err_key: str):
-    """Increment failed login attempt counter."""
-    count = await redis.incr(err_key)
-    if count == 1:
-        await redis.expire(err_key, settings.LOCK_TIME_MINUTES * 60)
+    """Increment failed login attempt counter (INCR + EXPIRE in one Lua call)."""
+    await get_script(redis, LOGIN_FAILURE)(
+        keys=[err_key], args=[settings.LOCK_TIME_MINUTES * 60],
+    )
 
 
 async def _record_login_log(
@@ -234,8 +218,6 @@ async def _record_login_log(
     os: str = "",
 ):
     """Record a login/logout event in sys_logininfor."""
-    from app.utils.ip_utils import get_ip_location
-
     log = SysLogininfor(
         user_name=user_name,
         ipaddr=ip,
@@ -0,0 +1,101 @@
+"""Pool of pre-rendered captcha images.
+
+Rendering a captcha (PIL drawing + PNG encoding) takes a few milliseconds of
+CPU. Instead of doing it on the event loop for every ``/captchaImage`` call,
+a background task keeps a bounded pool of ``(code, base64_png)`` pairs
+topped up by rendering on a small thread pool; the endpoint just pops one.
+Each pair is handed out once.
+"""
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import settings
+from app.utils.captcha import render_captcha
+
+logger = logging.getLogger(__name__)
+
+
+class CaptchaPool:
+
+    def __init__(self, size: int, refill_threshold: int, workers: int):
+        self.size = size
+        self.refill_threshold = refill_threshold
+        self.workers = workers
+        self._pool: deque[tuple[str, str]] = deque()
+        # Created per start() so the pool can be stopped and started again
+        self._executor: ThreadPoolExecutor | None = None
+        self._refill_needed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.served = 0
+        self.fallbacks = 0
+
+    async def get(self) -> tuple[str, str]:
+        """Pop a pre-rendered (code, base64_png), rendering one on demand if the pool is empty."""
+        if len(self._pool) <= self.refill_threshold:
+            self._refill_needed.set()
+        self.served += 1
+        if self._pool:
+            return self._pool.popleft()
+        self.fallbacks += 1
+        return await self._render()
+
+    async def _render(self) -> tuple[str, str]:
+        if self._executor is None:
+            # Not started (pool disabled, or a request outside the app lifespan)
+            self._executor = self._new_executor()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, render_captcha)
+
+    def _new_executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="captcha")
+
+    async def _refill(self):
+        while True:
+            await self._refill_needed.wait()
+            self._refill_needed.clear()
+            try:
+                while len(self._pool) < self.size:
+                    self._pool.append(await self._render())
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Captcha pool refill failed")
+                await asyncio.sleep(1)
+
+    def start(self):
+        if self._executor is None:
+            self._executor = self._new_executor()
+        if self.size > 0 and self._task is None:
+            # A fresh event, bound to the running loop
+            self._refill_needed = asyncio.Event()
+            self._refill_needed.set()
+            self._task = asyncio.create_task(self._refill())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._pool),
+            "maxSize": self.size,
+            "served": self.served,
+            "fallbacks": self.fallbacks,
+        }
+
+
+captcha_pool = CaptchaPool(
+    size=settings.CAPTCHA_POOL_SIZE,
+    refill_threshold=settings.CAPTCHA_POOL_REFILL_THRESHOLD,
+    workers=settings.CAPTCHA_POOL_WORKERS,
+)
@@ -0,0 +1,135 @@
+"""Process-local department tree cache.
+
+The whole (non-deleted) ``sys_dept`` table is small and read on every dept
+list, dept tree and exclude-list request, so each worker keeps it in memory:
+the flat list, a parent -> children index and the full tree-select
+structure. The cache is tagged with ``dept_version`` from Redis, which is
+bumped after every department change is committed; a worker reloads lazily
+on the first request that sees a newer version. Name, status and data-scope
+filters are applied to the cached rows.
+"""
+from operator import attrgetter
+
+import redis.asyncio as aioredis
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.constants import DEPT_VERSION_KEY
+from app.core.data_scope import DataScopeFilter
+from app.models.sys_dept import SysDept
+from app.utils.tree_utils import build_tree, group_by_parent
+
+
+class DeptTree:
+    """Immutable snapshot of the department table at one version."""
+
+    def __init__(self, version: str | None, rows: list[Row]):
+        self.version = version
+        self.rows = rows  # ordered by parent_id, order_num
+        self.by_id = {row.dept_id: row for row in rows}
+        self.children = group_by_parent(rows, attrgetter("parent_id"))
+        self.tree_select = self.build_tree_select(rows)
+
+    def subtree_ids(self, dept_id: int) -> set[int]:
+        """``dept_id`` and all of its descendants."""
+        ids = {dept_id}
+        stack = [dept_id]
+        while stack:
+            for child in self.children.get(stack.pop(), ()):
+                ids.add(child.dept_id)
+                stack.append(child.dept_id)
+        return ids
+
+    @staticmethod
+    def build_tree_select(rows: list[Row]) -> list[dict]:
+        """Tree-select nodes for ``rows``; rows whose parent is not included become roots."""
+        return build_tree(
+            rows,
+            key=attrgetter("dept_id"),
+            parent_key=attrgetter("parent_id"),
+            node=lambda row, children: {"id": row.dept_id, "label": row.dept_name, "children": children},
+            keep_orphans=True,
+        )
+
+
+class DeptTreeCache:
+
+    def __init__(self):
+        self._tree: DeptTree | None = None
+        self.hits = 0
+        self.reloads = 0
+
+    async def get(self, db: AsyncSession, redis: aioredis.Redis) -> DeptTree:
+        version = await redis.get(DEPT_VERSION_KEY)
+        tree = self._tree
+        if tree is None or tree.version != version:
+            result = await db.execute(
+                select(*SysDept.__table__.columns)
+                .where(SysDept.del_flag == "0")
+                .order_by(SysDept.parent_id, SysDept.order_num)
+            )
+            tree = DeptTree(version, list(result.all()))
+            self._tree = tree
+            self.reloads += 1
+        else:
+            self.hits += 1
+        return tree
+
+    def stats(self) -> dict:
+        tree = self._tree
+        return {
+            "version": tree.version if tree else None,
+            "size": len(tree.rows) if tree else 0,
+            "hits": self.hits,
+            "reloads": self.reloads,
+        }
+
+
+dept_tree_cache = DeptTreeCache()
+
+
+def _visible(tree: DeptTree, data_scope: DataScopeFilter | None) -> list[Row]:
+    if data_scope is None or data_scope.all:
+        return tree.rows
+    allowed = set(data_scope.dept_ids)
+    return [row for row in tree.rows if row.dept_id in allowed]
+
+
+async def list_depts(
+    db: AsyncSession,
+    redis: aioredis.Redis,
+    *,
+    dept_name: str | None = None,
+    status: str | None = None,
+    data_scope: DataScopeFilter | None = None,
+) -> list[Row]:
+    """Departments as a flat list (the frontend builds the tree)."""
+    rows = _visible(await dept_tree_cache.get(db, redis), data_scope)
+    if dept_name:
+        needle = dept_name.casefold()
+        rows = [row for row in rows if needle in row.dept_name.casefold()]
+    if status:
+        rows = [row for row in rows if row.status == status]
+    return rows
+
+
+async def list_depts_excluding(
+    db: AsyncSession, redis: aioredis.Redis, dept_id: int,
+) -> list[Row]:
+    """All departments except ``dept_id`` and its descendants."""
+    tree = await dept_tree_cache.get(db, redis)
+    excluded = tree.subtree_ids(dept_id)
+    return [row for row in tree.rows if row.dept_id not in excluded]
+
+
+async def dept_tree_select(
+    db: AsyncSession, redis: aioredis.Redis, data_scope: DataScopeFilter | None = None,
+) -> list[dict]:
+    """Department tree-select nodes (``id``/``label``/``children``).
+
+    The unfiltered tree is shared between requests and must not be modified.
+    """
+    tree = await dept_tree_cache.get(db, redis)
+    if data_scope is None or data_scope.all:
+        return tree.tree_select
+    return tree.build_tree_select(_visible(tree, data_scope))
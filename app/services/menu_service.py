@@ -1,14 +1,84 @@
+"""Vue router tree for ``/getRouters``, cached per role set.
+
+Users with the same active roles get the same tree, so it is built once per
+sorted role-id set (admin has its own entry) and kept in Redis and in a small
+per-worker LRU. The key includes the ``all`` version and the version of each
+role from ``role_versions``, which menu and role writes bump; a change simply
+moves readers to a new key and old entries expire.
+"""
+import json
+from collections import OrderedDict
+from operator import attrgetter
+
+import redis.asyncio as aioredis
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.constants import MenuType
+from app.core.constants import MenuType, ROLE_VERSIONS_KEY, ROUTERS_KEY, SUPER_ADMIN
+from app.core.stateless_auth import ALL_ROLES
 from app.models.sys_menu import SysMenu
 from app.models.sys_role import SysRole
-from app.models.associations import sys_user_role, sys_role_menu
+from app.models.associations import sys_role_menu
+from app.utils.tree_utils import build_tree
+
+# Entries are versioned, so a day is only a bound on Redis garbage
+ROUTERS_TTL_SECONDS = 24 * 3600
+_MAX_LOCAL = 256
+
+_local: OrderedDict[str, list[dict]] = OrderedDict()
+
+
+def _role_set(user: dict) -> tuple[bool, list[int]]:
+    is_admin = SUPER_ADMIN in user.get("roles", [])
+    return is_admin, [] if is_admin else sorted(user.get("role_ids", []))
+
+
+async def get_routers_key(user: dict, redis: aioredis.Redis) -> str:
+    """Cache key of the user's router tree; it changes whenever the tree may change."""
+    is_admin, role_ids = _role_set(user)
+    fields = [ALL_ROLES, *(str(rid) for rid in role_ids)]
+    versions = await redis.hmget(ROLE_VERSIONS_KEY, fields)
+    return (
+        f"{ROUTERS_KEY}{'admin' if is_admin else ','.join(map(str, role_ids))}:"
+        + ".".join(_text(v) for v in versions)
+    )
+
+
+async def get_routers(
+    user: dict, db: AsyncSession, redis: aioredis.Redis, key: str | None = None,
+) -> list[dict]:
+    """Vue router tree for the current user (a LoginUser dict).
+
+    ``key`` may be passed if the caller already has it from get_routers_key.
+    The returned list is shared between requests and must not be modified.
+    """
+    if key is None:
+        key = await get_routers_key(user, redis)
+    routers = _local.get(key)
+    if routers is not None:
+        _local.move_to_end(key)
+        return routers
+
+    cached = await redis.get(key)
+    if cached is not None:
+        routers = json.loads(cached)
+    else:
+        routers = await _load_routers(*_role_set(user), db)
+        await redis.setex(key, ROUTERS_TTL_SECONDS, json.dumps(routers, ensure_ascii=False))
+    _local[key] = routers
+    if len(_local) > _MAX_LOCAL:
+        _local.popitem(last=False)
+    return routers
+
 
+def _text(value: bytes | str | None) -> str:
+    if value is None:
+        return "0"
+    return value.decode() if isinstance(value, bytes) else value
 
-async def get_routers(user_id: int, is_admin: bool, db: AsyncSession) -> list[dict]:
-    """Build Vue router tree for the current user."""
+
+async def _load_routers(is_admin: bool, role_ids: list[int], db: AsyncSession) -> list[dict]:
+    """Build the router tree from the menus of ``role_ids`` (all menus for admin)."""
     if is_admin:
         stmt = (
             select(SysMenu)
@@ -18,17 +88,19 @@ async def get_routers(user_id: int, is_admin: bool, db: AsyncSession) -> list[di
             )
             .order_by(SysMenu.parent_id, SysMenu.order_num)
         )
+    elif not role_ids:
+        return []
     else:
         stmt = (
             select(SysMenu)
             .join(sys_role_menu, sys_role_menu.c.menu_id == SysMenu.menu_id)
             .join(SysRole, SysRole.role_id == sys_role_menu.c.role_id)
-            .join(sys_user_role, sys_user_role.c.role_id == SysRole.role_id)
             .where(
-                sys_user_role.c.user_id == user_id,
+                sys_role_menu.c.role_id.in_(role_ids),
                 SysMenu.menu_type.in_([MenuType.DIRECTORY, MenuType.MENU]),
                 SysMenu.status == "0",
                 SysRole.status == "0",
+                SysRole.del_flag == "0",
             )
             .order_by(SysMenu.parent_id, SysMenu.order_num)
             .distinct()
@@ -36,25 +108,16 @@ async def get_routers(user_id: int, is_admin: bool, db: AsyncSession) -> list[di
 
     result = await db.execute(stmt)
     menus = result.scalars().all()
-    return _build_router_tree(menus, 0)
-
-
-def _build_router_tree(menus: list[SysMenu], parent_id: int) -> list[dict]:
-    """Recursively build Vue Router compatible tree."""
-    tree = []
-    children_menus = [m for m in menus if m.parent_id == parent_id]
-
-    for menu in children_menus:
-        router = _build_router_node(menu, menus)
-        tree.append(router)
-
-    return tree
-
+    return build_tree(
+        menus,
+        key=attrgetter("menu_id"),
+        parent_key=attrgetter("parent_id"),
+        node=_build_router_node,
+    )
 
-def _build_router_node(menu: SysMenu, all_menus: list[SysMenu]) -> dict:
-    """Convert a SysMenu to Vue Router format matching RuoYi frontend expectations."""
-    children = _build_router_tree(all_menus, menu.menu_id)
 
+def _build_router_node(menu: SysMenu, children: list[dict]) -> dict:
+    """Convert a SysMenu and its converted children to RuoYi Vue Router format."""
     router: dict = {
         "name": _get_route_name(menu),
         "path": _get_router_path(menu),
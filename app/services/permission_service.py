@@ -0,0 +1,153 @@
+"""Role and permission resolution with a per-role permission cache in Redis.
+
+A user's effective permissions are the union of the permission sets of their
+active roles. Each role's set is cached under
+``role_perms:<role_id>:<all version>.<role version>``, so with many users
+sharing a handful of roles, login only reads ``sys_user_role`` / ``sys_role``
+and the menu tables are hit once per role and version. Invalidation bumps the
+versions; superseded keys are never read again and expire.
+"""
+import json
+import logging
+
+import redis.asyncio as aioredis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.constants import ROLE_VERSIONS_KEY, SUPER_ADMIN
+from app.core.permission import ALL_PERMISSION, PermissionIndex
+from app.core.stateless_auth import ALL_ROLES, role_perms_key, stateless_auth
+from app.db.session import async_session_factory
+from app.models.associations import sys_role_menu, sys_user_role
+from app.models.sys_menu import SysMenu
+from app.models.sys_role import SysRole
+from app.models.sys_user import SysUser
+
+logger = logging.getLogger(__name__)
+
+# Permission sets are versioned, so a day is only a bound on Redis garbage
+ROLE_PERMS_TTL_SECONDS = 24 * 3600
+
+
+async def resolve_user_access(
+    user: SysUser, db: AsyncSession, redis: aioredis.Redis,
+) -> tuple[list[dict], list[str]]:
+    """Resolve a user's active roles and effective permissions.
+
+    Returns ``(roles, permissions)`` where each role is a dict with
+    ``role_id``, ``role_key`` and ``data_scope``.
+    """
+    if user.user_name == "admin":
+        return [{"role_id": 1, "role_key": SUPER_ADMIN, "data_scope": "1"}], [ALL_PERMISSION]
+
+    stmt = (
+        select(SysRole.role_id, SysRole.role_key, SysRole.data_scope)
+        .join(sys_user_role, sys_user_role.c.role_id == SysRole.role_id)
+        .where(
+            sys_user_role.c.user_id == user.user_id,
+            SysRole.status == "0",
+            SysRole.del_flag == "0",
+        )
+    )
+    result = await db.execute(stmt)
+    roles = [
+        {"role_id": row.role_id, "role_key": row.role_key, "data_scope": row.data_scope}
+        for row in result.all()
+    ]
+    role_perms = await get_role_permissions([r["role_id"] for r in roles], db, redis)
+    permissions: set[str] = set()
+    for perms in role_perms.values():
+        permissions.update(perms)
+    return roles, sorted(permissions)
+
+
+async def get_role_permissions(
+    role_ids: list[int], db: AsyncSession, redis: aioredis.Redis,
+) -> dict[int, list[str]]:
+    """Permission strings per role, served from Redis and backfilled in one query."""
+    if not role_ids:
+        return {}
+
+    # Versions are read before the menu tables: a set loaded concurrently with a
+    # role/menu change is written under the version that change retires.
+    all_version, *versions = await redis.hmget(
+        ROLE_VERSIONS_KEY, [ALL_ROLES, *(str(rid) for rid in role_ids)]
+    )
+    keys = {
+        rid: role_perms_key(rid, int(all_version or 0), int(v or 0))
+        for rid, v in zip(role_ids, versions)
+    }
+    cached = await redis.mget(list(keys.values()))
+    role_perms: dict[int, list[str]] = {}
+    missing: list[int] = []
+    for rid, value in zip(keys, cached):
+        if value is None:
+            missing.append(rid)
+        else:
+            role_perms[rid] = json.loads(value)
+
+    if missing:
+        # A disabled or deleted role contributes nothing (its version is bumped
+        # on such changes, so live sessions pick this up)
+        stmt = (
+            select(sys_role_menu.c.role_id, SysMenu.perms)
+            .join(SysMenu, SysMenu.menu_id == sys_role_menu.c.menu_id)
+            .join(SysRole, SysRole.role_id == sys_role_menu.c.role_id)
+            .where(
+                sys_role_menu.c.role_id.in_(missing),
+                SysRole.status == "0",
+                SysRole.del_flag == "0",
+                SysMenu.status == "0",
+                SysMenu.perms.is_not(None),
+                SysMenu.perms != "",
+            )
+        )
+        result = await db.execute(stmt)
+        loaded: dict[int, set[str]] = {rid: set() for rid in missing}
+        for rid, perms in result.all():
+            loaded[rid].add(perms)
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for rid, perms in loaded.items():
+                role_perms[rid] = sorted(perms)
+                pipe.setex(keys[rid], ROLE_PERMS_TTL_SECONDS, json.dumps(role_perms[rid]))
+            await pipe.execute()
+
+    return role_perms
+
+
+async def session_permissions(
+    user: dict, redis: aioredis.Redis,
+) -> tuple[list[str], PermissionIndex] | None:
+    """Current permissions of a session's roles (a LoginUser dict).
+
+    A session keeps the role ids it was issued for; their permission sets are
+    looked up at the current role versions, so role and menu edits reach live
+    sessions. Role assignment changes still take effect at the next login.
+    Returns None if the sets cannot be resolved (keep the login snapshot).
+    """
+    role_ids = user.get("role_ids", [])
+    resolved = await stateless_auth.role_permissions(redis, user["user_name"], role_ids)
+    if resolved is None:
+        # Not cached at the current versions yet: load (and cache) from the menu tables
+        try:
+            async with async_session_factory() as db:
+                await get_role_permissions(role_ids, db, redis)
+        except Exception:
+            logger.exception("Failed to load role permissions for a session")
+            return None
+        resolved = await stateless_auth.role_permissions(redis, user["user_name"], role_ids)
+    return resolved
+
+
+async def invalidate_role_permissions(
+    redis: aioredis.Redis, role_ids: list[int] | None = None,
+):
+    """Retire cached permission sets for the given roles, or for every role.
+
+    Bumps the roles' permission versions, which moves the permission cache,
+    cached router trees and stateless token claims to new keys. Callers run
+    this after commit, so nothing can re-cache the old state under the new
+    version.
+    """
+    await stateless_auth.bump_role_versions(redis, role_ids)
@@ -1,24 +1,33 @@
 import base64
+import functools
 import io
 import random
 import string
 
 from PIL import Image, ImageDraw, ImageFont
 
-from app.core.security import generate_uuid
+WIDTH, HEIGHT = 160, 60
+FONT_SIZES = range(28, 37)
 
 
-def generate_captcha() -> tuple[str, str, str]:
-    """Generate a captcha image.
+@functools.lru_cache(maxsize=len(FONT_SIZES))
+def _get_font(size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    """Load a captcha font once per size."""
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except (IOError, OSError):
+        return ImageFont.load_default()
+
+
+def render_captcha() -> tuple[str, str]:
+    """Render a captcha image.
 
     Returns:
-        (uuid, code, base64_image)
+        (code, base64_image)
     """
-    captcha_uuid = generate_uuid()
     code = "".join(random.choices(string.digits + string.ascii_lowercase, k=4))
 
-    width, height = 160, 60
-    image = Image.new("RGB", (width, height), _random_color(200, 255))
+    image = Image.new("RGB", (WIDTH, HEIGHT), _random_color(200, 255))
     draw = ImageDraw.Draw(image)
 
     # Draw captcha characters
@@ -26,29 +35,29 @@ def generate_captcha() -> tuple[str, str, str]:
         x = 10 + i * 35 + random.randint(-5, 5)
         y = random.randint(5, 15)
         color = _random_color(50, 150)
-        try:
-            font = ImageFont.truetype("arial.ttf", random.randint(28, 36))
-        except (IOError, OSError):
-            font = ImageFont.load_default()
+        font = _get_font(random.choice(FONT_SIZES))
         draw.text((x, y), char, fill=color, font=font)
 
     # Draw noise lines
     for _ in range(5):
-        x1, y1 = random.randint(0, width), random.randint(0, height)
-        x2, y2 = random.randint(0, width), random.randint(0, height)
+        x1, y1 = random.randint(0, WIDTH), random.randint(0, HEIGHT)
+        x2, y2 = random.randint(0, WIDTH), random.randint(0, HEIGHT)
         draw.line([(x1, y1), (x2, y2)], fill=_random_color(100, 200), width=1)
 
-    # Draw noise dots
-    for _ in range(100):
-        x, y = random.randint(0, width - 1), random.randint(0, height - 1)
-        draw.point((x, y), fill=_random_color(50, 200))
+    # Draw noise dots, a batch of points per color
+    for _ in range(5):
+        points = [
+            (random.randint(0, WIDTH - 1), random.randint(0, HEIGHT - 1))
+            for _ in range(20)
+        ]
+        draw.point(points, fill=_random_color(50, 200))
 
     # Convert to base64
     buf = io.BytesIO()
     image.save(buf, format="PNG")
     b64 = base64.b64encode(buf.getvalue()).decode("utf-8")
 
-    return captcha_uuid, code, b64
+    return code, b64
 
 
 def _random_color(start: int, end: int) -> tuple[int, int, int]:
@@ -0,0 +1,73 @@
+"""Tree building for flat parent-id lists (menus, departments)."""
+from collections.abc import Callable, Hashable, Iterable
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+N = TypeVar("N")
+
+
+def group_by_parent(
+    items: Iterable[T],
+    parent_key: Callable[[T], Hashable],
+    sort_key: Callable[[T], Any] | None = None,
+) -> dict[Hashable, list[T]]:
+    """Index items by parent id in one pass, keeping input order (or ``sort_key`` order)."""
+    groups: dict[Hashable, list[T]] = {}
+    for item in items:
+        groups.setdefault(parent_key(item), []).append(item)
+    if sort_key is not None:
+        for children in groups.values():
+            children.sort(key=sort_key)
+    return groups
+
+
+def build_tree(
+    items: Iterable[T],
+    *,
+    key: Callable[[T], Hashable],
+    parent_key: Callable[[T], Hashable],
+    node: Callable[[T, list[N]], N],
+    root_parent: Hashable = 0,
+    keep_orphans: bool = False,
+    sort_key: Callable[[T], Any] | None = None,
+) -> list[N]:
+    """Build a tree from a flat list in O(n).
+
+    ``node(item, children)`` turns an item into its output node; it is called
+    children first, so ``children`` are already converted. Roots are the items
+    whose parent is ``root_parent``. Items whose parent is not in ``items``
+    (an orphan, e.g. when the parent is filtered out) become roots as well if
+    ``keep_orphans`` is set and are dropped otherwise. Items on a parent cycle
+    are never reached and are dropped.
+    """
+    items = list(items)
+    groups = group_by_parent(items, parent_key, sort_key)
+    ids = {key(item) for item in items}
+    root_items = [
+        item
+        for parent, children in groups.items()
+        if parent not in ids and (keep_orphans or parent == root_parent)
+        for item in children
+    ]
+
+    # Iterative pre-order walk, then convert in reverse so children come first;
+    # no recursion limit on deep trees.
+    order: list[T] = []
+    seen: set[Hashable] = set()
+    stack = list(reversed(root_items))
+    while stack:
+        item = stack.pop()
+        item_id = key(item)
+        if item_id in seen:  # duplicate id
+            continue
+        seen.add(item_id)
+        order.append(item)
+        stack.extend(reversed(groups.get(item_id, ())))
+
+    built: dict[Hashable, N] = {}
+    for item in reversed(order):
+        item_id = key(item)
+        built[item_id] = node(
+            item, [built[c] for c in map(key, groups.get(item_id, ())) if c in built]
+        )
+    return [built[k] for k in dict.fromkeys(map(key, root_items)) if k in built]
@@ -0,0 +1,12 @@
+"""User-Agent parsing utilities."""
+from user_agents import parse
+
+
+def parse_user_agent(user_agent: str) -> tuple[str, str]:
+    """Return (browser, os) descriptions for a User-Agent header, e.g. ("Chrome 120", "Windows 10")."""
+    if not user_agent:
+        return "", ""
+    ua = parse(user_agent)
+    browser = f"{ua.browser.family} {ua.browser.version_string}".strip()
+    os = f"{ua.os.family} {ua.os.version_string}".strip()
+    return browser, os
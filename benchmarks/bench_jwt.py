@@ -0,0 +1,59 @@
+"""Per-request token verification cost: python-jose vs stdlib HS256 vs memo hit.
+
+Measures create_token-style encoding and the decode done by get_current_user
+for a session-only token and for a token carrying stateless-auth claims.
+
+Usage:
+    python benchmarks/bench_jwt.py [iterations]
+"""
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, ".")
+
+from app.config import settings  # noqa: E402
+from app.core import security  # noqa: E402
+from app.core.jwt_backend import HS256Backend, JoseBackend  # noqa: E402
+
+PAYLOADS = {
+    "session": {"login_user_key": "6f1d3f3e8a0b4c6d9a572f1e4c9d7b21"},
+    "stateless": {
+        "login_user_key": "6f1d3f3e8a0b4c6d9a572f1e4c9d7b21",
+        "uid": 100, "did": 103, "uname": "zhangsan", "dname": "研发部门",
+        "rids": [2, 5], "rkeys": ["common", "auditor"], "pv": [3, 1, 7],
+        "sexp": 1717203600,
+    },
+}
+
+
+def per_call_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    backends = {
+        "jose": JoseBackend(settings.JWT_SECRET),
+        "hs256": HS256Backend(settings.JWT_SECRET),
+    }
+    for label, claims in PAYLOADS.items():
+        payload = {**claims, "iat": datetime.now(timezone.utc)}
+        print(f"{label} token")
+        for name, backend in backends.items():
+            token = backend.encode(payload)
+            encode_us = per_call_us(lambda: backend.encode(payload), iterations)
+            decode_us = per_call_us(lambda: backend.decode(token), iterations)
+            print(f"  {name:<6} encode {encode_us:7.2f}us  decode {decode_us:7.2f}us")
+
+        token = security.create_token(claims["login_user_key"], claims)
+        security.decode_token(token)
+        memo_us = per_call_us(lambda: security.decode_token(token), iterations)
+        print(f"  memo   decode {memo_us:7.2f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Redis cost of the login pre-check: sequential commands vs Lua scripts.
+
+Compares the former login bookkeeping (captcha GET + DEL, error-count GET,
+then INCR + EXPIRE on failure) with LOGIN_PRECHECK / LOGIN_FAILURE, which do
+the same work in one round trip each. Requires the Redis at REDIS_URL.
+
+Usage:
+    python benchmarks/bench_login_redis.py [iterations]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+sys.path.insert(0, ".")
+
+import redis.asyncio as aioredis  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.core.constants import CAPTCHA_CODE_KEY, PWD_ERR_CNT_KEY  # noqa: E402
+from app.core.redis_scripts import LOGIN_FAILURE, LOGIN_PRECHECK, get_script  # noqa: E402
+
+CAPTCHA_KEY = f"{CAPTCHA_CODE_KEY}bench"
+ERR_KEY = f"{PWD_ERR_CNT_KEY}bench_user"
+LOCK_SECONDS = settings.LOCK_TIME_MINUTES * 60
+
+
+async def sequential(r: aioredis.Redis, fail: bool):
+    cached = await r.get(CAPTCHA_KEY)
+    await r.delete(CAPTCHA_KEY)
+    assert cached == "abcd"
+    err = await r.get(ERR_KEY)
+    assert not err or int(err) < 10**9
+    if fail:
+        count = await r.incr(ERR_KEY)
+        if count == 1:
+            await r.expire(ERR_KEY, LOCK_SECONDS)
+
+
+async def scripted(r: aioredis.Redis, fail: bool):
+    status, _ = await get_script(r, LOGIN_PRECHECK)(
+        keys=[CAPTCHA_KEY, ERR_KEY], args=["1", "abcd", 10**9],
+    )
+    assert status == 0
+    if fail:
+        await get_script(r, LOGIN_FAILURE)(keys=[ERR_KEY], args=[LOCK_SECONDS])
+
+
+async def measure(r: aioredis.Redis, name: str, fn, iterations: int, fail: bool):
+    await r.delete(ERR_KEY)
+    samples = []
+    for _ in range(iterations):
+        await r.set(CAPTCHA_KEY, "abcd")
+        start = time.perf_counter()
+        await fn(r, fail)
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    samples.sort()
+    label = "failure" if fail else "success"
+    print(
+        f"{name:<10} {label:<8} median={statistics.median(samples):8.1f}us "
+        f"p99={samples[int(len(samples) * 0.99) - 1]:8.1f}us"
+    )
+
+
+async def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    r = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+    try:
+        for fail in (False, True):
+            await measure(r, "sequential", sequential, iterations, fail)
+            await measure(r, "lua", scripted, iterations, fail)
+    finally:
+        await r.delete(CAPTCHA_KEY, ERR_KEY)
+        await r.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
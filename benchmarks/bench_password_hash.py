@@ -0,0 +1,78 @@
+"""Event-loop latency under concurrent logins: inline bcrypt vs the hash pool.
+
+A heartbeat task sleeps 10 ms in a loop and records how late it wakes up
+while a burst of password verifications runs. With inline bcrypt every
+verification stalls the loop; with verify_password_async the loop stays
+responsive and only the logins themselves wait on the pool.
+
+Usage:
+    python benchmarks/bench_password_hash.py [concurrent_logins]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+sys.path.insert(0, ".")
+
+from app.config import settings  # noqa: E402
+from app.core.exceptions import ServiceException  # noqa: E402
+from app.core.security import (  # noqa: E402
+    get_password_hash, verify_password, verify_password_async,
+)
+
+TICK = 0.01
+
+
+async def heartbeat(lags: list[float], stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append((time.perf_counter() - start - TICK) * 1000)
+
+
+async def login_inline(password: str, hashed: str) -> bool:
+    return verify_password(password, hashed)
+
+
+async def login_pooled(password: str, hashed: str) -> bool:
+    try:
+        return await verify_password_async(password, hashed)
+    except ServiceException:
+        return False
+
+
+async def run(name: str, login, concurrency: int, hashed: str):
+    lags: list[float] = []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    await asyncio.sleep(TICK * 5)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(login("admin123", hashed) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await beat
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99) - 1] if lags else 0.0
+    print(
+        f"{name:<8} logins={concurrency:<4} ok={sum(results):<4} total={elapsed:6.2f}s "
+        f"loop_lag_median={statistics.median(lags):7.1f}ms "
+        f"p99={p99:7.1f}ms max={max(lags):7.1f}ms"
+    )
+
+
+async def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    hashed = get_password_hash("admin123")
+    print(
+        f"PASSWORD_HASH_WORKERS={settings.PASSWORD_HASH_WORKERS} "
+        f"PASSWORD_HASH_MAX_PENDING={settings.PASSWORD_HASH_MAX_PENDING}"
+    )
+    await run("inline", login_inline, concurrency, hashed)
+    await run("pooled", login_pooled, concurrency, hashed)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""Session payload size and decode time: legacy JSON vs format 2 (msgpack).
+
+Builds a LoginUser with N permission strings and compares the stored value
+size and the time to turn it back into a LoginUser dict. The permission
+dictionary is pre-warmed, as it is in a running worker, so no Redis is needed.
+
+Usage:
+    python benchmarks/bench_session_codec.py [permission_count] [iterations]
+"""
+import asyncio
+import json
+import sys
+import time
+
+sys.path.insert(0, ".")
+
+import msgpack  # noqa: E402
+
+from app.core.session_codec import (  # noqa: E402
+    SESSION_FIELDS, _VERSION_PREFIX, decode_session, permission_dictionary,
+)
+from app.schemas.auth import LoginUser  # noqa: E402
+
+MODULES = ["system", "monitor", "tool", "crm", "erp", "oa", "wms", "bpm"]
+ACTIONS = ["list", "query", "add", "edit", "remove", "export", "import", "resetPwd"]
+
+
+def make_user(permission_count: int) -> LoginUser:
+    perms = []
+    i = 0
+    while len(perms) < permission_count:
+        module = MODULES[i % len(MODULES)]
+        for action in ACTIONS:
+            perms.append(f"{module}:resource{i}:{action}")
+        i += 1
+    return LoginUser(
+        user_id=100, dept_id=103, user_name="zhangsan", nick_name="张三",
+        email="zhangsan@example.com", phonenumber="15888888888",
+        login_ip="192.168.1.10", login_location="内网IP", browser="Chrome 126",
+        os="Windows 10", login_time="2024-06-01 09:00:00",
+        token_key="6f1d3f3e-8a0b-4c6d-9a57-2f1e4c9d7b21", expire_time=1717203600,
+        permissions=perms[:permission_count], roles=["common", "auditor"],
+        role_ids=[2, 5], dept_name="研发部门",
+    )
+
+
+def encode_v2(user: LoginUser) -> bytes:
+    # Same layout as encode_session, with ids taken from the pre-warmed dictionary
+    ids = {perm: i for i, perm in enumerate(user.permissions, start=1)}
+    permission_dictionary._switch_epoch("bench")
+    permission_dictionary._names.update((i, perm) for perm, i in ids.items())
+    fields = [getattr(user, name) for name in SESSION_FIELDS]
+    return _VERSION_PREFIX + msgpack.packb(["bench", fields, list(ids.values())])
+
+
+async def time_decode(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await fn()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+async def main():
+    permission_count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    user = make_user(permission_count)
+
+    legacy = user.model_dump_json().encode()
+    compact = encode_v2(user)
+    assert await decode_session(None, compact) == json.loads(legacy)
+
+    async def decode_legacy():
+        return json.loads(legacy)
+
+    async def decode_compact():
+        return await decode_session(None, compact)
+
+    legacy_us = await time_decode(decode_legacy, iterations)
+    compact_us = await time_decode(decode_compact, iterations)
+    print(f"permissions: {permission_count}")
+    print(f"json     {len(legacy):6d} bytes  decode {legacy_us:7.2f}us")
+    print(f"format 2 {len(compact):6d} bytes  decode {compact_us:7.2f}us")
+    print(f"size     -{(1 - len(compact) / len(legacy)) * 100:.0f}%  "
+          f"decode -{(1 - compact_us / legacy_us) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
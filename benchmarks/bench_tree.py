@@ -0,0 +1,81 @@
+"""Tree building from a flat parent-id list: per-node scan vs one-pass grouping.
+
+Generates N menu-like nodes (random fan-out, ordered by parent_id as the
+queries return them) and times the old recursive builder, which filters the
+whole list for every node, against app.utils.tree_utils.build_tree. The old
+builder is quadratic and is skipped above --legacy-max nodes.
+
+Usage:
+    python benchmarks/bench_tree.py [sizes...] [--legacy-max N]
+"""
+import random
+import sys
+import time
+from collections import namedtuple
+from operator import attrgetter
+
+sys.path.insert(0, ".")
+
+from app.utils.tree_utils import build_tree  # noqa: E402
+
+Node = namedtuple("Node", "menu_id parent_id menu_name order_num")
+
+
+def generate(count: int) -> list[Node]:
+    rng = random.Random(count)
+    nodes = [Node(1, 0, "root-1", 1)]
+    for menu_id in range(2, count + 1):
+        # Mostly attach to recent nodes so the tree gets some depth
+        parent = rng.choice(nodes[-50:]) if rng.random() < 0.9 else rng.choice(nodes)
+        nodes.append(Node(menu_id, parent.menu_id, f"menu-{menu_id}", rng.randint(1, 20)))
+    return sorted(nodes, key=lambda n: (n.parent_id, n.order_num))
+
+
+def legacy_tree(menus, parent_id: int) -> list[dict]:
+    tree = []
+    for m in menus:
+        if m.parent_id == parent_id:
+            tree.append({"id": m.menu_id, "label": m.menu_name, "children": legacy_tree(menus, m.menu_id)})
+    return tree
+
+
+def linear_tree(menus) -> list[dict]:
+    return build_tree(
+        menus,
+        key=attrgetter("menu_id"),
+        parent_key=attrgetter("parent_id"),
+        node=lambda m, children: {"id": m.menu_id, "label": m.menu_name, "children": children},
+    )
+
+
+def timed(fn) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main():
+    args = sys.argv[1:]
+    legacy_max = 10_000
+    if "--legacy-max" in args:
+        i = args.index("--legacy-max")
+        legacy_max = int(args[i + 1])
+        del args[i:i + 2]
+    sizes = [int(a) for a in args] or [1_000, 10_000, 100_000]
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 200_000))
+
+    for size in sizes:
+        menus = generate(size)
+        linear_ms, tree = timed(lambda: linear_tree(menus))
+        line = f"{size:>7} nodes  linear {linear_ms:9.1f}ms"
+        if size <= legacy_max:
+            legacy_ms, expected = timed(lambda: legacy_tree(menus, 0))
+            assert expected == tree
+            line += f"  legacy {legacy_ms:9.1f}ms  ({legacy_ms / linear_ms:.0f}x)"
+        else:
+            line += "  legacy   skipped"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
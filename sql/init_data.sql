@@ -37,6 +37,44 @@ INSERT INTO sys_dept VALUES(107, 101, '0,100,101','运维部门', 5, '若依', '
 INSERT INTO sys_dept VALUES(108, 102, '0,100,102','市场部门', 1, '若依', '15888888888', 'ry@qq.com', '0', '0', 'admin', NOW(), '', NULL, NULL);
 INSERT INTO sys_dept VALUES(109, 102, '0,100,102','财务部门', 2, '若依', '15888888888', 'ry@qq.com', '0', '0', 'admin', NOW(), '', NULL, NULL);
 
+-- 部门祖先关系 (闭包表)：每个部门与其自身及所有上级部门各一行，用于按子树查询
+DROP TABLE IF EXISTS sys_dept_closure;
+CREATE TABLE sys_dept_closure (
+  ancestor    BIGINT NOT NULL,
+  descendant  BIGINT NOT NULL,
+  depth       INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (ancestor, descendant),
+  KEY idx_dept_closure_descendant (descendant)
+) ENGINE=InnoDB;
+
+INSERT INTO sys_dept_closure (ancestor, descendant, depth) VALUES
+  (100, 100, 0),
+  (100, 101, 1),
+  (100, 102, 1),
+  (100, 103, 2),
+  (100, 104, 2),
+  (100, 105, 2),
+  (100, 106, 2),
+  (100, 107, 2),
+  (100, 108, 2),
+  (100, 109, 2),
+  (101, 101, 0),
+  (101, 103, 1),
+  (101, 104, 1),
+  (101, 105, 1),
+  (101, 106, 1),
+  (101, 107, 1),
+  (102, 102, 0),
+  (102, 108, 1),
+  (102, 109, 1),
+  (103, 103, 0),
+  (104, 104, 0),
+  (105, 105, 0),
+  (106, 106, 0),
+  (107, 107, 0),
+  (108, 108, 0),
+  (109, 109, 0);
+
 -- ----------------------------
 -- 2. 用户表
 -- ----------------------------
@@ -1,4 +1,9 @@
-"""Comprehensive API test script for RuoYi-FastAPI backend."""
+"""Comprehensive API test script for RuoYi-FastAPI backend.
+
+The server must run with DEBUG=true (and the default
+PAGINATION_WINDOW_COUNT=false): the SQL statement counts are read from the
+X-SQL-Count response header.
+"""
 import json
 import sys
 import httpx
@@ -49,6 +54,15 @@ def report(name: str, ok: bool, detail: str = ""):
         print(f"  [FAIL] {name} -> {detail}")
 
 
+def check_sql_count(name: str, resp: httpx.Response, expected: int):
+    """Report whether a request ran exactly ``expected`` SQL statements."""
+    sql_count = resp.headers.get("x-sql-count")
+    if sql_count is None:
+        report(f"{name} (SQL count)", False, "X-SQL-Count header missing; run the server with DEBUG=true")
+    else:
+        report(f"{name} (SQL count)", int(sql_count) == expected, f"statements={sql_count}, expected {expected}")
+
+
 async def main():
     global passed, failed
 
@@ -96,11 +110,19 @@ async def main():
         data = resp.json()
         report("GET /getInfo", data.get("code") == 200 and data.get("user"), str(data.get("msg", "")))
 
+        etag = resp.headers.get("etag", "")
+        resp = await c.get("/getInfo", headers={**headers, "If-None-Match": etag})
+        report("GET /getInfo (If-None-Match)", bool(etag) and resp.status_code == 304, f"status={resp.status_code}")
+
         # 1.4 GET /getRouters
         resp = await c.get("/getRouters", headers=headers)
         data = resp.json()
         report("GET /getRouters", data.get("code") == 200 and isinstance(data.get("data"), list), str(data.get("msg", "")))
 
+        etag = resp.headers.get("etag", "")
+        resp = await c.get("/getRouters", headers={**headers, "If-None-Match": etag})
+        report("GET /getRouters (If-None-Match)", bool(etag) and resp.status_code == 304, f"status={resp.status_code}")
+
         # ============================================================
         print("\n=== 2. User Management ===")
         # ============================================================
@@ -110,6 +132,9 @@ async def main():
         data = resp.json()
         report("GET /system/user/list", data.get("code") == 200 and "total" in data, str(data.get("msg", "")))
 
+        # COUNT + page (dept joined in), no relationship loads
+        check_sql_count("GET /system/user/list", resp, 2)
+
         # 2.2 GET /system/user/ (add info: posts + roles)
         resp = await c.get("/system/user/", headers=headers)
         data = resp.json()
@@ -120,6 +145,9 @@ async def main():
         data = resp.json()
         report("GET /system/user/1", data.get("code") == 200 and data.get("data"), str(data.get("msg", "")))
 
+        # user + dept, roles, posts, all posts, all roles
+        check_sql_count("GET /system/user/1", resp, 5)
+
         # 2.4 POST /system/user (add user)
         resp = await c.post("/system/user", headers=headers, json={
             "user_name": "testuser001",
@@ -232,6 +260,8 @@ async def main():
         data = resp.json()
         report("GET /system/role/list", data.get("code") == 200 and "total" in data, str(data.get("msg", "")))
 
+        check_sql_count("GET /system/role/list", resp, 2)
+
         resp = await c.get("/system/role/optionselect", headers=headers)
         data = resp.json()
         report("GET /system/role/optionselect", data.get("code") == 200, str(data.get("msg", "")))
@@ -526,6 +556,10 @@ async def main():
         data = resp.json()
         report("GET /system/dict/data/type/sys_user_sex", data.get("code") == 200, str(data.get("msg", "")))
 
+        etag = resp.headers.get("etag", "")
+        resp = await c.get("/system/dict/data/type/sys_user_sex", headers={**headers, "If-None-Match": etag})
+        report("GET /system/dict/data/type/sys_user_sex (If-None-Match)", bool(etag) and resp.status_code == 304, f"status={resp.status_code}")
+
         # Get first dict data code
         resp = await c.get("/system/dict/data/list", headers=headers, params={"pageNum": 1, "pageSize": 1, "dictType": "sys_user_sex"})
         first_dict_code = None
@@ -584,6 +618,10 @@ async def main():
         data = resp.json()
         report("GET /system/config/configKey/{key}", data.get("code") == 200, str(data.get("msg", "")))
 
+        etag = resp.headers.get("etag", "")
+        resp = await c.get("/system/config/configKey/sys.index.skinName", headers={**headers, "If-None-Match": etag})
+        report("GET /system/config/configKey/{key} (If-None-Match)", bool(etag) and resp.status_code == 304, f"status={resp.status_code}")
+
         resp = await c.get("/system/config/1", headers=headers)
         data = resp.json()
         report("GET /system/config/1", data.get("code") == 200, str(data.get("msg", "")))
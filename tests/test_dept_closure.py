@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.orm import Session
+
+import app.main  # noqa: F401  (configures the mappers)
+from app.crud.crud_dept import crud_dept
+from app.models.associations import sys_dept_closure
+from app.models.sys_dept import SysDept
+
+
+class AsyncWrapper:
+    """The slice of AsyncSession the closure helpers use, over a sync session."""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def execute(self, *args, **kwargs):
+        return self.session.execute(*args, **kwargs)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def _concat(dbapi_connection, _):
+        # SQLite before 3.44 has no CONCAT()
+        dbapi_connection.create_function("concat", -1, lambda *parts: "".join(parts))
+
+    SysDept.__table__.create(engine)
+    sys_dept_closure.create(engine)
+    with Session(engine) as session:
+        yield AsyncWrapper(session)
+
+
+def _add(db, dept_id: int, parent_id: int, ancestors: str):
+    db.session.execute(
+        insert(SysDept).values(dept_id=dept_id, parent_id=parent_id, ancestors=ancestors)
+    )
+    asyncio.run(crud_dept._link_closure(db, dept_id, parent_id))
+
+
+def _closure(db) -> set[tuple[int, int, int]]:
+    return set(db.session.execute(select(sys_dept_closure)).all())
+
+
+def _expected_closure(parents: dict[int, int]) -> set[tuple[int, int, int]]:
+    rows = set()
+    for dept_id in parents:
+        node, depth = dept_id, 0
+        while node:
+            rows.add((node, dept_id, depth))
+            node, depth = parents[node], depth + 1
+    return rows
+
+
+def _build(db):
+    #   100 ─┬─ 101 ── 102 ── 104
+    #        └─ 103
+    _add(db, 100, 0, "0")
+    _add(db, 101, 100, "0,100")
+    _add(db, 102, 101, "0,100,101")
+    _add(db, 103, 100, "0,100")
+    _add(db, 104, 102, "0,100,101,102")
+    return {100: 0, 101: 100, 102: 101, 103: 100, 104: 102}
+
+
+def test_link_closure(db):
+    parents = _build(db)
+    assert _closure(db) == _expected_closure(parents)
+
+
+def test_move_subtree(db):
+    parents = _build(db)
+    subtree = asyncio.run(crud_dept._move_closure(db, 101, 103))
+    assert sorted(subtree) == [101, 102, 104]
+    parents[101] = 103
+    assert _closure(db) == _expected_closure(parents)
+
+    moved = asyncio.run(crud_dept._rewrite_ancestors(db, 101, "0,100", "0,100,103"))
+    assert moved == 2
+    ancestors = dict(db.session.execute(select(SysDept.dept_id, SysDept.ancestors)).all())
+    assert ancestors[102] == "0,100,103,101"
+    assert ancestors[104] == "0,100,103,101,102"
+    # Outside the subtree nothing changes; the moved root itself is updated by update_dept
+    assert ancestors[103] == "0,100"
+    assert ancestors[101] == "0,100"
+
+
+def test_move_to_top_level(db):
+    parents = _build(db)
+    asyncio.run(crud_dept._move_closure(db, 102, 0))
+    parents[102] = 0
+    assert _closure(db) == _expected_closure(parents)
@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from app.core.jwt_backend import HS256Backend, InvalidTokenError, JoseBackend
+
+
+def test_round_trip():
+    backend = HS256Backend("secret")
+    payload = {"login_user_key": "abc", "exp": int(time.time()) + 60}
+    assert backend.decode(backend.encode(payload)) == payload
+
+
+def test_interoperates_with_jose():
+    payload = {"login_user_key": "abc", "exp": int(time.time()) + 60}
+    assert JoseBackend("secret").decode(HS256Backend("secret").encode(payload)) == payload
+    assert HS256Backend("secret").decode(JoseBackend("secret").encode(payload)) == payload
+
+
+def test_expired():
+    backend = HS256Backend("secret")
+    token = backend.encode({"login_user_key": "abc", "exp": int(time.time()) - 1})
+    with pytest.raises(InvalidTokenError, match="expired"):
+        backend.decode(token)
+
+
+def test_not_yet_valid():
+    backend = HS256Backend("secret")
+    token = backend.encode({"login_user_key": "abc", "nbf": int(time.time()) + 60})
+    with pytest.raises(InvalidTokenError):
+        backend.decode(token)
+
+
+def test_wrong_secret():
+    token = HS256Backend("secret").encode({"login_user_key": "abc"})
+    with pytest.raises(InvalidTokenError, match="Signature"):
+        HS256Backend("other").decode(token)
+
+
+def test_tampered_payload():
+    backend = HS256Backend("secret")
+    header, _, signature = backend.encode({"login_user_key": "abc"}).split(".")
+    body = backend.encode({"login_user_key": "xyz"}).split(".")[1]
+    with pytest.raises(InvalidTokenError):
+        backend.decode(f"{header}.{body}.{signature}")
+
+
+@pytest.mark.parametrize("token", ["", "abc", "a.b", "a.b.c.d", "!!.??.**"])
+def test_malformed(token):
+    with pytest.raises(InvalidTokenError):
+        HS256Backend("secret").decode(token)
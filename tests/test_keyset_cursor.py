@@ -0,0 +1,40 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.core.exceptions import ServiceException
+from app.crud.base import _decode_cursor, _encode_cursor
+from app.crud.crud_oper_log import crud_oper_log
+from app.models.sys_oper_log import SysOperLog
+
+COLUMNS = [SysOperLog.oper_time, SysOperLog.oper_id]
+
+
+def test_round_trip():
+    values = [datetime(2024, 5, 1, 12, 30, 15), 42]
+    assert _decode_cursor(_encode_cursor(values), COLUMNS) == values
+    assert _decode_cursor(_encode_cursor([7]), [SysOperLog.oper_id]) == [7]
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not base64 !",
+        _encode_cursor([1]),  # Wrong number of values
+        _encode_cursor(["2024-05-01T12:30:15", "42"]),  # Wrong type
+        _encode_cursor(["yesterday", 42]),  # Not a datetime
+        _encode_cursor([None, 42]),
+        _encode_cursor(["2024-05-01T12:30:15", None]),
+        _encode_cursor(["2024-05-01T12:30:15", True]),
+    ],
+)
+def test_rejects_bad_cursor(cursor):
+    with pytest.raises(ServiceException):
+        _decode_cursor(cursor, COLUMNS)
+
+
+def test_rejects_nullable_sort_column():
+    # Raised before the session is touched
+    with pytest.raises(ValueError):
+        asyncio.run(crud_oper_log.get_keyset_list(None, sort_column=SysOperLog.oper_time))
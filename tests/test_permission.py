@@ -0,0 +1,21 @@
+from app.core.permission import PermissionIndex
+
+
+def test_exact_and_all():
+    assert PermissionIndex(["system:user:list"]).has("system:user:list")
+    assert not PermissionIndex(["system:user:list"]).has("system:user:add")
+    assert PermissionIndex(["*:*:*"]).has("monitor:job:list")
+
+
+def test_wildcard_segments():
+    index = PermissionIndex(["system:*:list", "monitor:*"])
+    assert index.has("system:user:list")
+    assert not index.has("system:user:add")
+    assert index.has("monitor:job:list")
+    assert index.has("monitor:job")
+
+
+def test_wildcard_does_not_match_zero_segments():
+    assert not PermissionIndex(["system:user:*"]).has("system:user")
+    assert not PermissionIndex(["monitor:*"]).has("monitor")
+    assert not PermissionIndex(["system:*:*"]).has("system:user")
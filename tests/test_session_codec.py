@@ -0,0 +1,91 @@
+import asyncio
+
+from app.core import session_codec
+from app.core.session_codec import PermissionDictionary, decode_session, encode_session
+from app.schemas.auth import LoginUser
+
+
+class FakeRedis:
+    """Just the permission-dictionary hash, with the intern script run in Python."""
+
+    def __init__(self):
+        self.hash: dict[str, str] = {}
+
+    def register_script(self, source):
+        redis = self
+
+        class Script:
+            registered_client = redis
+
+            async def __call__(self, keys, args):
+                h = redis.hash
+                h.setdefault("epoch", args[0])
+                result = [h["epoch"]]
+                for permission in args[1:]:
+                    if f"p:{permission}" not in h:
+                        h["seq"] = str(int(h.get("seq", 0)) + 1)
+                        h[f"p:{permission}"] = h["seq"]
+                        h[f"i:{h['seq']}"] = permission
+                    result.append(int(h[f"p:{permission}"]))
+                return result
+
+        return Script()
+
+    async def hmget(self, key, fields):
+        return [self.hash.get(f) for f in fields]
+
+
+def _user(**kwargs) -> LoginUser:
+    fields = dict(
+        user_id=2, dept_id=105, user_name="ry", nick_name="若依", token_key="tk",
+        expire_time=1_700_000_000, permissions=["system:user:list", "system:user:add"],
+        roles=["common"], role_ids=[2],
+    )
+    return LoginUser(**{**fields, **kwargs})
+
+
+def test_round_trip():
+    redis = FakeRedis()
+    user = _user()
+    value = asyncio.run(encode_session(redis, user))
+    assert value[:1] == b"\x02"
+    assert asyncio.run(decode_session(redis, value)) == user.model_dump()
+
+
+def test_round_trip_in_another_process(monkeypatch):
+    redis = FakeRedis()
+    user = _user()
+    value = asyncio.run(encode_session(redis, user))
+    # A fresh dictionary resolves the ids from Redis
+    monkeypatch.setattr(session_codec, "permission_dictionary", PermissionDictionary())
+    assert asyncio.run(decode_session(redis, value))["permissions"] == user.permissions
+
+
+def test_without_permissions():
+    redis = FakeRedis()
+    value = asyncio.run(encode_session(redis, _user()))
+    assert asyncio.run(decode_session(redis, value, with_permissions=False))["permissions"] == []
+
+
+def test_rebuilt_dictionary_expires_session():
+    redis = FakeRedis()
+    value = asyncio.run(encode_session(redis, _user()))
+    redis.hash.clear()
+    asyncio.run(encode_session(redis, _user(nick_name="x")))  # New epoch
+    assert asyncio.run(decode_session(redis, value)) is None
+
+
+def test_legacy_json():
+    user = _user()
+    assert asyncio.run(decode_session(FakeRedis(), user.model_dump_json().encode())) == user.model_dump()
+
+
+def test_legacy_json_without_required_fields_expires():
+    data = _user().model_dump_json(exclude={"role_ids", "expire_time"}).encode()
+    assert asyncio.run(decode_session(FakeRedis(), data)) is None
+    data = _user().model_dump_json(exclude={"expire_time"}).encode()
+    assert asyncio.run(decode_session(FakeRedis(), data)) is None
+
+
+def test_unknown_format():
+    assert asyncio.run(decode_session(FakeRedis(), b"\x09abc")) is None
@@ -0,0 +1,53 @@
+from app.utils.tree_utils import build_tree
+
+
+def _tree(items, **kwargs):
+    return build_tree(
+        items,
+        key=lambda i: i["id"],
+        parent_key=lambda i: i["parent"],
+        node=lambda i, children: (i["id"], children),
+        **kwargs,
+    )
+
+
+def test_nests_children_in_input_order():
+    items = [
+        {"id": 3, "parent": 1}, {"id": 1, "parent": 0},
+        {"id": 2, "parent": 1}, {"id": 4, "parent": 2},
+    ]
+    assert _tree(items) == [(1, [(3, []), (2, [(4, [])])])]
+
+
+def test_sort_key():
+    items = [{"id": 2, "parent": 0}, {"id": 1, "parent": 0}]
+    assert _tree(items, sort_key=lambda i: i["id"]) == [(1, []), (2, [])]
+
+
+def test_orphans_dropped_by_default():
+    # 5's parent is not in the list (e.g. filtered out by a search)
+    items = [{"id": 1, "parent": 0}, {"id": 5, "parent": 9}, {"id": 6, "parent": 5}]
+    assert _tree(items) == [(1, [])]
+
+
+def test_keep_orphans_makes_them_roots():
+    items = [{"id": 1, "parent": 0}, {"id": 5, "parent": 9}, {"id": 6, "parent": 5}]
+    assert _tree(items, keep_orphans=True) == [(1, []), (5, [(6, [])])]
+
+
+def test_cycles_and_duplicates_dropped():
+    items = [
+        {"id": 1, "parent": 0}, {"id": 1, "parent": 0},
+        {"id": 7, "parent": 8}, {"id": 8, "parent": 7},
+    ]
+    assert _tree(items, keep_orphans=True) == [(1, [])]
+
+
+def test_deep_tree_without_recursion():
+    items = [{"id": i, "parent": i - 1} for i in range(1, 5001)]
+    node = _tree(items)[0]
+    depth = 1
+    while node[1]:
+        node = node[1][0]
+        depth += 1
+    assert depth == 5000